@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the Excel → XML pipeline (month-close path) on synthetic Storyous exports
+
+Generates workbooks whose headers match header_map of the current config (1–366 days,
+4 payment methods, noise columns, totals row) and times every stage separately:
+open/parse, column matching + number parsing, sum validation, read_day, builders, dataPack wrapping,
+serialization, file write – plus the end-to-end generate_days(), the template renderer, zip output,
+every available Excel reader backend (excel.reader) and a workbook cache hit (excel.cache).
+Everything else runs with the workbook cache off, in a temporary CACHE_DIR.
+
+    python bench.py                           # 1, 31 and 366 days, results in bench_results.json
+    python bench.py --days 31 --repeat 5
+    python bench.py --compare baseline.json   # exit code 1 if a stage got slower than --threshold
+"""
+
+import argparse
+import json
+import platform
+import random
+import re
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import main as M
+
+RATE_PERCENT = {"high": 21, "low": 12, "none": 0}
+YEAR = 2024  # leap year, so 366 days fit
+READERS = ("pandas", "openpyxl") + (("calamine",) if M.calamine_available() else ())
+
+
+def literal_header(pattern):
+    """Column name matched by a header_map pattern such as '^Základ 21% \\(Hotově\\)$'."""
+    text = pattern
+    if text.startswith("^"):
+        text = text[1:]
+    if text.endswith("$") and not text.endswith("\\$"):
+        text = text[:-1]
+    if re.search(r"(?<!\\)[.*+?\[\]{}()|^$]", text):
+        raise ValueError(f"header_map pattern is not a plain literal: {pattern}")
+    return re.sub(r"\\(.)", r"\1", text)
+
+
+def czech_amount(value):
+    """'1 234,56 Kč' – how Storyous sometimes exports numbers as text."""
+    return f"{value:,.2f}".replace(",", " ").replace(".", ",") + " Kč"
+
+
+def make_workbook(path, cfg, n_days, noise_cols=10, seed=1):
+    """Write a synthetic export with n_days consecutive days starting on 1 January."""
+    import pandas as pd
+
+    rnd = random.Random(seed)
+    header_map = cfg["header_map"]
+    date_col = literal_header(header_map["date_col_candidates"][0])
+    sections = header_map["sections"]
+    rows = []
+    for i in range(n_days):
+        day = date(YEAR, 1, 1) + timedelta(days=i)
+        row = {date_col: f"{day.day}.{day.month}." if i % 3 else f"{day.day:02d}.{day.month:02d}."}
+        for n in range(noise_cols // 2):
+            row[f"Šum {n}"] = rnd.random()
+        totals = {"base": 0.0, "vat": 0.0, "gross": 0.0}
+        for method in M.METHOD_KEYS:
+            fields = sections.get(method, {})
+            active = rnd.random() > 0.1
+            for rk, pct in RATE_PERCENT.items():
+                base = round(rnd.uniform(0, 20000), 2) if active and rnd.random() > 0.2 else 0.0
+                vat = round(base * pct / 100, 2)
+                values = {"base": base, "vat": vat, "gross": round(base + vat, 2)}
+                for part, value in values.items():
+                    totals[part] += value
+                    key = f"{part}_{rk}"
+                    if key in fields:
+                        row[literal_header(fields[key])] = czech_amount(value) if i % 4 == 0 else value
+        # columns the adapter must ignore: "Celkem" totals and invoice/bank-transfer sales
+        for name, sec in sections.items():
+            if name in M.METHOD_KEYS:
+                continue
+            for j, pattern in enumerate(sec.get("any", [])):
+                col = literal_header(pattern)
+                if name.startswith("totals") and j < len(totals):
+                    row[col] = round(list(totals.values())[j], 2)
+                else:
+                    # invoice sales count in "Tržby s DPH Celkem", so the sum checks pass
+                    amount = round(rnd.uniform(0, 5000), 2)
+                    totals["gross"] += amount
+                    row[col if pattern.startswith("^") else f"Tržby s DPH 21% {col}"] = amount
+        for n in range(noise_cols // 2, noise_cols):
+            row[f"Šum {n}"] = "x"
+        rows.append(row)
+    rows.append({date_col: "Celkem"})
+    with pd.ExcelWriter(path) as writer:
+        pd.DataFrame({"Info": ["Storyous"]}).to_excel(writer, sheet_name="Info", index=False)
+        pd.DataFrame(rows).to_excel(writer, sheet_name="Přehled tržeb", index=False)
+
+
+class Stages:
+    """Accumulated wall time per stage."""
+
+    def __init__(self):
+        self.seconds = {}
+
+    def add(self, stage, t0):
+        t1 = time.perf_counter()
+        self.seconds[stage] = self.seconds.get(stage, 0.0) + (t1 - t0)
+        return t1
+
+
+def run_stages(path, cfg, outlet, out_dir):
+    """One pass over the workbook, stage by stage, the way generate_days() does it serially."""
+    st = Stages()
+    adapter = M.ExcelAdapter(cfg)
+    t = time.perf_counter()
+    wb = adapter.open(path)
+    t = st.add("open", t)
+    adapter.extract(wb)
+    t = st.add("extract", t)
+    days = [date(YEAR, m, d) for m in sorted(wb.month_days) for d in wb.month_days[m]]
+    t = st.add("day_index", t)
+    adapter.validate(wb, days)
+    st.add("validate", t)
+
+    docs = files = 0
+    for day in days:
+        t = time.perf_counter()
+        methods = adapter.read_day(wb, day)
+        t = st.add("read_day", t)
+        items = M.build_day_items(day, methods, outlet, cfg)
+        t = st.add("build", t)
+        trees = [(M.format_filename(naming, day, outlet, method_label=label, cfg=cfg),
+                  M.datapack_with(child, day, outlet, doc_type=doc_type, note_override=note, cfg=cfg))
+                 for (method, naming, doc_type, label), child, note in items]
+        t = st.add("datapack", t)
+        data = [(fname, M.serialize_tree(tree)) for fname, tree in trees]
+        t = st.add("serialize", t)
+        M.write_documents(out_dir, data)
+        st.add("write", t)
+        docs += len(items)
+        files += len(data)
+    return st.seconds, {"days": len(days), "documents": docs, "files": files}
+
+
+def run_end_to_end(path, cfg, outlet, out_dir):
+    """Wall time of open + generate_days() for every month of the workbook."""
+    adapter = M.ExcelAdapter(cfg)
+    t0 = time.perf_counter()
+    wb = adapter.open(path)
+    days = [date(YEAR, m, d) for m in sorted(wb.month_days) for d in wb.month_days[m]]
+    files = sum(len(r.files) for r in M.generate_days(adapter, wb, days, outlet, out_dir, cfg))
+    return time.perf_counter() - t0, files
+
+
+def bench_case(path, cfg, outlet, repeat):
+    """Best of `repeat` runs for every stage and the end-to-end variants."""
+    best = {}
+    counts = None
+    cfg = cfg.with_options("excel", cache=False)
+    variants = {
+        "end_to_end_lxml": cfg.with_options("output", renderer="lxml"),
+        "end_to_end_template": cfg.with_options("output", renderer="template"),
+        "end_to_end_month_pack": cfg.with_options("output", renderer="template", datapack="month"),
+        "end_to_end_zip": cfg.with_options("output", renderer="template", zip=True),
+        "end_to_end_zip_memory": cfg.with_options("output", renderer="template", zip="memory"),
+    }
+    for _ in range(repeat):
+        out_dir = Path(tempfile.mkdtemp(prefix="lgsxml-bench-"))
+        try:
+            seconds, counts = run_stages(path, variants["end_to_end_lxml"], outlet, out_dir)
+            for name, vcfg in variants.items():
+                shutil.rmtree(out_dir)
+                out_dir.mkdir()
+                seconds[name], _ = run_end_to_end(path, vcfg, outlet, out_dir)
+        finally:
+            shutil.rmtree(out_dir, ignore_errors=True)
+        for reader in READERS:
+            t = time.perf_counter()
+            M.ExcelAdapter(cfg.with_options("excel", reader=reader)).open(path)
+            seconds[f"open_{reader}"] = time.perf_counter() - t
+        cached = M.ExcelAdapter(cfg.with_options("excel", cache=True))
+        cached.extract(cached.open(path))
+        t = time.perf_counter()
+        cached.extract(cached.open(path))
+        seconds["open_cached"] = time.perf_counter() - t
+        for stage, sec in seconds.items():
+            best[stage] = min(best.get(stage, sec), sec)
+    return {
+        **counts,
+        "seconds": {k: round(v, 6) for k, v in best.items()},
+        "us_per_document": {k: round(best[k] / counts["documents"] * 1e6, 1)
+                            for k in ("build", "datapack", "serialize", "write") if counts["documents"]},
+    }
+
+
+def compare(results, baseline, threshold):
+    """Stages slower than threshold × baseline, as printable lines."""
+    slower = []
+    for case, res in results["cases"].items():
+        base = baseline.get("cases", {}).get(case)
+        if not base:
+            continue
+        for stage, sec in res["seconds"].items():
+            ref = base["seconds"].get(stage)
+            # ignore sub-millisecond stages, they are noise
+            if ref and sec > 0.001 and sec > ref * threshold:
+                slower.append(f"{case} {stage}: {ref:.4f}s -> {sec:.4f}s ({sec / ref:.2f}x)")
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LGS XML pipeline benchmark")
+    parser.add_argument("--days", type=int, nargs="+", default=[1, 31, 366], help="workbook sizes (1–366)")
+    parser.add_argument("--noise", type=int, default=10, help="extra non-matching columns")
+    parser.add_argument("--outlet", default=None, help="outlet from config (default: first)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case, best is reported")
+    parser.add_argument("--out", type=Path, default=Path("bench_results.json"), help="JSON results")
+    parser.add_argument("--compare", type=Path, help="baseline JSON from an earlier run")
+    parser.add_argument("--threshold", type=float, default=1.25, help="allowed slowdown against --compare")
+    args = parser.parse_args()
+
+    if any(not 1 <= n <= 366 for n in args.days):
+        parser.error("--days must be between 1 and 366")
+    cfg = M.config_snapshot()
+    outlet = args.outlet or next(iter(cfg["outlets"]))
+    results = {
+        "generated": datetime.now().isoformat(timespec="seconds"),
+        "app_version": M.APP_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pandas": M.pd.__version__,
+        "lxml": ".".join(map(str, M.ET.LXML_VERSION)),
+        "outlet": outlet,
+        "repeat": args.repeat,
+        "cases": {},
+    }
+    work = Path(tempfile.mkdtemp(prefix="lgsxml-bench-wb-"))
+    M.CACHE_DIR = work / "cache"
+    try:
+        for n_days in args.days:
+            path = work / f"bench_{n_days}.xlsx"
+            make_workbook(path, cfg, n_days, noise_cols=args.noise)
+            case = f"{n_days}_days"
+            results["cases"][case] = res = bench_case(path, cfg, outlet, args.repeat)
+            stages = ", ".join(f"{k} {v * 1000:.1f} ms" for k, v in res["seconds"].items())
+            print(f"{case}: {res['documents']} dokladů – {stages}")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    args.out.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"Results: {args.out}")
+
+    if args.compare:
+        slower = compare(results, json.loads(args.compare.read_text(encoding="utf-8")), args.threshold)
+        for line in slower:
+            print(f"SLOWER {line}")
+        if slower:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
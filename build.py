@@ -8,6 +8,9 @@ import sys
 import os
 from pathlib import Path
 
+# main.py imports these by name on first use (_LazyModule), so PyInstaller cannot see them
+HIDDEN_IMPORTS = ["pandas", "numpy", "lxml.etree", "openpyxl", "python_calamine"]
+
 def build_application():
     """Build the application using PyInstaller"""
     
@@ -18,6 +21,7 @@ def build_application():
         "--onedir", 
         "--windowed",
         "--name", "LGS XML",
+        *(arg for mod in HIDDEN_IMPORTS for arg in ("--hidden-import", mod)),
         "main.py"
     ]
     
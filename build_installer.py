@@ -11,6 +11,9 @@ import shutil
 import json
 from pathlib import Path
 
+# main.py imports these by name on first use (_LazyModule), so PyInstaller cannot see them
+HIDDEN_IMPORTS = ["pandas", "numpy", "lxml.etree", "openpyxl", "python_calamine"]
+
 def build_exe():
     """Build the application using PyInstaller"""
     print("🏗️  Building EXE with PyInstaller...")
@@ -21,6 +24,7 @@ def build_exe():
         "--onedir", 
         "--windowed",
         "--name", "LGS XML",
+        *(arg for mod in HIDDEN_IMPORTS for arg in ("--hidden-import", mod)),
         "main.py"
     ]
     
@@ -0,0 +1,1033 @@
+# -*- coding: utf-8 -*-
+"""
+Molo XML – Qt user interface
+----------------------------
+Main window, dropzone, day picker and the background generation worker.
+
+Imported lazily by main.main() when no CLI command is given, so the headless
+CLI never loads PySide6. All Excel/XML logic lives in main.py.
+"""
+
+from __future__ import annotations
+import os
+import sys
+import threading
+from collections.abc import Mapping
+from contextlib import nullcontext
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+# 3rd party
+from PySide6 import QtCore, QtGui, QtWidgets
+
+from main import (
+    APP_DATA_DIR, APP_NAME, APP_VERSION, OUTPUT_DIR,
+    DayResult, ExcelAdapter, SalesWorkbook, WorkbookInspection,
+    config_snapshot, generate_days, log, new_stage_timer,
+    report_stages, report_startup, save_config, suggest_outlet_from_filename, warm_imports, write_log,
+)
+
+# ============================================================================
+# MODERN UI STYLING - Minimalist White-Gray with Financial Green Theme
+# ============================================================================
+
+COLORS = {
+    "primary_green": "#10B981",      # Financial green (emerald)
+    "primary_green_hover": "#059669", # Darker green on hover  
+    "primary_green_light": "#D1FAE5", # Light green background
+    "primary_green_dark": "#047857",  # Even darker green for active states
+    "background": "#F8FAFC",         # Very light gray background
+    "card_bg": "#FFFFFF",            # Pure white cards
+    "border": "#E2E8F0",             # Light gray borders
+    "border_hover": "#CBD5E1",       # Slightly darker border on hover
+    "text_primary": "#1E293B",       # Dark gray text
+    "text_secondary": "#64748B",     # Medium gray text
+    "text_muted": "#94A3B8",         # Light gray text
+    "shadow": "rgba(0, 0, 0, 0.08)", # Subtle shadow
+    "shadow_hover": "rgba(0, 0, 0, 0.12)", # Stronger shadow on hover
+    "error": "#EF4444",              # Red for errors
+    "warning": "#F59E0B",            # Orange for warnings
+    "success": "#10B981",            # Green for success (same as primary)
+    "dropzone_bg": "#F1F5F9",        # Light gray for dropzone
+    "dropzone_border": "#CBD5E1",    # Border for dropzone
+    "dropzone_hover": "#E2E8F0",     # Hover state for dropzone
+}
+
+def get_professional_stylesheet() -> str:
+    """Return professional stylesheet inspired by modern file upload interfaces"""
+    return f"""
+    /* Main Application Window - Professional Background */
+    QMainWindow {{
+        background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
+            stop: 0 #FAFBFC, stop: 1 #F1F3F4);
+        font-family: 'Segoe UI', 'Inter', system-ui, sans-serif;
+        font-size: 10pt;
+        color: {COLORS['text_primary']};
+    }}
+    
+    /* Remove card styling for compact layout */
+    
+    /* Professional Dropzone - Compact */
+    DropFrame {{
+        background-color: #FAFBFF;
+        border: 2px dashed #D1D9E0;
+        border-radius: 12px;
+        min-height: 100px;
+        padding: 20px;
+        margin: 8px;
+    }}
+    
+    DropFrame:hover {{
+        background-color: #F0F7FF;
+        border-color: {COLORS['primary_green']};
+        border-width: 2px;
+        border-style: dashed;
+    }}
+    
+    /* Modern Button System */
+    QPushButton {{
+        background-color: white;
+        border: 1px solid #E8EAED;
+        border-radius: 12px;
+        padding: 12px 20px;
+        font-weight: 500;
+        font-size: 10pt;
+        color: {COLORS['text_primary']};
+        min-height: 20px;
+        min-width: 80px;
+    }}
+    
+    QPushButton:hover {{
+        background-color: #F8F9FA;
+        border-color: #DADCE0;
+    }}
+    
+    QPushButton:pressed {{
+        background-color: #F1F3F4;
+    }}
+    
+    /* Primary Action Button - Professional Green */
+    QPushButton#primary {{
+        background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
+            stop: 0 #16A085, stop: 1 #138D75);
+        color: white;
+        border: none;
+        font-weight: 600;
+        font-size: 11pt;
+        padding: 16px 32px;
+        min-height: 24px;
+        border-radius: 12px;
+    }}
+    
+    QPushButton#primary:hover {{
+        background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
+            stop: 0 #17A589, stop: 1 #148F77);
+    }}
+    
+    QPushButton#primary:pressed {{
+        background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
+            stop: 0 #138D75, stop: 1 #117A65);
+    }}
+    
+    /* Secondary Buttons */
+    QPushButton#secondary {{
+        background-color: {COLORS['primary_green_light']};
+        border: 1px solid {COLORS['primary_green']};
+        color: {COLORS['primary_green_dark']};
+        font-weight: 600;
+    }}
+    
+    QPushButton#secondary:hover {{
+        background-color: white;
+    }}
+    
+    /* Professional ComboBox */
+    QComboBox {{
+        background-color: white;
+        border: 1px solid #E8EAED;
+        border-radius: 12px;
+        padding: 12px 16px;
+        font-size: 11pt;
+        color: {COLORS['text_primary']};
+        min-height: 24px;
+        font-weight: 500;
+    }}
+    
+    QComboBox:hover {{
+        border-color: {COLORS['primary_green']};
+    }}
+    
+    QComboBox:focus {{
+        border-color: {COLORS['primary_green']};
+        border-width: 2px;
+    }}
+    
+    QComboBox::drop-down {{
+        border: none;
+        width: 30px;
+        padding-right: 8px;
+    }}
+    
+    QComboBox::down-arrow {{
+        image: none;
+        border-left: 5px solid transparent;
+        border-right: 5px solid transparent;
+        border-top: 7px solid #9AA0A6;
+        margin-right: 4px;
+    }}
+    
+    QComboBox QAbstractItemView {{
+        background-color: white;
+        color: {COLORS['text_primary']};
+        border: 1px solid #E8EAED;
+        border-radius: 8px;
+        padding: 4px;
+        selection-background-color: {COLORS['primary_green_light']};
+        selection-color: {COLORS['text_primary']};
+    }}
+
+    QComboBox QAbstractItemView::item {{
+        color: {COLORS['text_primary']};
+        padding: 6px 12px;
+        min-height: 24px;
+    }}
+
+    QComboBox QAbstractItemView::item:selected {{
+        background-color: {COLORS['primary_green_light']};
+        color: {COLORS['text_primary']};
+    }}
+    
+    /* Input Fields */
+    QLineEdit {{
+        background-color: white;
+        border: 1px solid #E8EAED;
+        border-radius: 12px;
+        padding: 12px 16px;
+        font-size: 10pt;
+        color: {COLORS['text_primary']};
+        min-height: 20px;
+    }}
+    
+    QLineEdit:focus {{
+        border-color: {COLORS['primary_green']};
+        border-width: 2px;
+    }}
+    
+    /* SpinBox */
+    QSpinBox {{
+        background-color: white;
+        color: {COLORS['text_primary']};
+        border: 1px solid #E8EAED;
+        border-radius: 12px;
+        padding: 8px 16px;
+        padding-right: 30px;
+        font-size: 11pt;
+        font-weight: 500;
+        min-height: 24px;
+    }}
+
+    QSpinBox:hover {{
+        border-color: {COLORS['primary_green']};
+    }}
+
+    QSpinBox::up-button, QSpinBox::down-button {{
+        width: 24px;
+        border: none;
+    }}
+
+    /* Professional Typography */
+    QLabel {{
+        color: {COLORS['text_primary']};
+        font-size: 10pt;
+        font-weight: 500;
+    }}
+    
+    QLabel#title {{
+        font-size: 18pt;
+        font-weight: 700;
+        color: #1A1B1F;
+        margin-bottom: 4px;
+    }}
+    
+    QLabel#section_header {{
+        font-size: 14pt;
+        font-weight: 600;
+        color: #1A1B1F;
+        margin-bottom: 12px;
+        margin-top: 8px;
+    }}
+    
+    QLabel#subtitle {{
+        color: #5F6368;
+        font-size: 9pt;
+        font-weight: 400;
+        margin-bottom: 16px;
+    }}
+    
+    QLabel#info {{
+        color: #5F6368;
+        font-size: 9pt;
+        font-weight: 400;
+        font-style: italic;
+    }}
+    
+    /* Modern Checkboxes */
+    QCheckBox {{
+        color: {COLORS['text_primary']};
+        font-size: 10pt;
+        spacing: 12px;
+        padding: 4px;
+    }}
+    
+    QCheckBox::indicator {{
+        width: 20px;
+        height: 20px;
+        border: 2px solid #DADCE0;
+        border-radius: 6px;
+        background-color: white;
+    }}
+    
+    QCheckBox::indicator:hover {{
+        border-color: {COLORS['primary_green']};
+        background-color: {COLORS['primary_green_light']};
+    }}
+    
+    QCheckBox::indicator:checked {{
+        background-color: {COLORS['primary_green']};
+        border-color: {COLORS['primary_green']};
+        image: none;
+    }}
+    
+    QCheckBox::indicator:checked:hover {{
+        background-color: {COLORS['primary_green_hover']};
+    }}
+    
+    /* Professional Text Areas */
+    QTextEdit {{
+        background-color: white;
+        border: 1px solid #E8EAED;
+        border-radius: 12px;
+        padding: 16px;
+        font-family: 'SF Mono', 'Monaco', 'Cascadia Code', monospace;
+        font-size: 9pt;
+        color: {COLORS['text_primary']};
+        line-height: 1.5;
+    }}
+    
+    /* Generation progress */
+    QProgressBar {{
+        background-color: white;
+        border: 1px solid #E8EAED;
+        border-radius: 8px;
+        min-height: 20px;
+        text-align: center;
+        color: {COLORS['text_primary']};
+    }}
+
+    QProgressBar::chunk {{
+        background-color: {COLORS['primary_green']};
+        border-radius: 7px;
+    }}
+
+    /* Custom Scrollbars */
+    QScrollBar:vertical {{
+        background-color: transparent;
+        width: 12px;
+        border-radius: 6px;
+        margin: 3px;
+    }}
+    
+    QScrollBar::handle:vertical {{
+        background-color: #DADCE0;
+        border-radius: 6px;
+        min-height: 30px;
+        margin: 2px;
+    }}
+    
+    QScrollBar::handle:vertical:hover {{
+        background-color: #BDC1C6;
+    }}
+    
+    QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {{
+        border: none;
+        background: none;
+    }}
+    
+    /* Professional Status Messages */
+    QLabel#status_success {{
+        color: #137333;
+        font-weight: 600;
+        background-color: #E8F5E8;
+        padding: 8px 12px;
+        border-radius: 8px;
+        border-left: 4px solid #137333;
+    }}
+    
+    QLabel#status_error {{
+        color: #D93025;
+        font-weight: 600;
+        background-color: #FCE8E6;
+        padding: 8px 12px;
+        border-radius: 8px;
+        border-left: 4px solid #D93025;
+    }}
+    
+    QLabel#status_warning {{
+        color: #E37400;
+        font-weight: 600;
+        background-color: #FEF7E0;
+        padding: 8px 12px;
+        border-radius: 8px;
+        border-left: 4px solid #E37400;
+    }}
+
+    /* Message Box - force light theme for readability */
+    QMessageBox {{
+        background-color: white;
+    }}
+    QMessageBox QLabel {{
+        color: {COLORS['text_primary']};
+        font-size: 10pt;
+    }}
+    QMessageBox QPushButton {{
+        background-color: white;
+        color: {COLORS['text_primary']};
+        border: 1px solid #E8EAED;
+        border-radius: 8px;
+        padding: 8px 24px;
+        min-width: 80px;
+    }}
+    QMessageBox QPushButton:hover {{
+        background-color: #F8F9FA;
+    }}
+    """
+
+# Animation and Effects Helper
+class ModernEffects:
+    @staticmethod
+    def add_hover_effect(widget):
+        """Add smooth hover effect to any widget"""
+        def on_enter(event):
+            widget.setProperty("hover", True)
+            widget.style().polish(widget)
+            
+        def on_leave(event):
+            widget.setProperty("hover", False) 
+            widget.style().polish(widget)
+            
+        widget.enterEvent = on_enter
+        widget.leaveEvent = on_leave
+    
+    @staticmethod
+    def add_click_effect(widget):
+        """Add click ripple effect"""
+        original_click = widget.mousePressEvent
+        
+        def enhanced_click(event):
+            # Create subtle flash effect
+            widget.setProperty("clicked", True)
+            widget.style().polish(widget)
+            QtCore.QTimer.singleShot(100, lambda: [
+                widget.setProperty("clicked", False),
+                widget.style().polish(widget)
+            ])
+            if original_click:
+                original_click(event)
+                
+        widget.mousePressEvent = enhanced_click
+
+
+class GenerateWorker(QtCore.QObject):
+    """Runs the day loop off the GUI thread; results come back through queued signals."""
+    progress = QtCore.Signal(int, int)       # days done, days total
+    dayDone = QtCore.Signal(object)          # DayResult
+    failed = QtCore.Signal(str)              # the run could not start (e.g. unreadable Excel) or broke off
+    finished = QtCore.Signal(bool)           # cancelled?
+    stages = QtCore.Signal(list)             # stage timing lines (diagnostics.stage_timing only)
+
+    def __init__(self, adapter: ExcelAdapter, source: Union[Path, SalesWorkbook], days: List[date], outlet: str, out_dir: Path, cfg: Mapping):
+        super().__init__()
+        self.adapter = adapter
+        # the workbook parsed when the file was dropped, or a path to parse here
+        self.source = source
+        self.days = days
+        self.outlet = outlet
+        self.out_dir = out_dir
+        self.cfg = cfg
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @QtCore.Slot()
+    def run(self):
+        timer = new_stage_timer(self.cfg)
+        try:
+            with timer.active() if timer is not None else nullcontext():
+                # parse the workbook once for the whole run, not once per selected day
+                try:
+                    workbook = self.source if isinstance(self.source, SalesWorkbook) else self.adapter.open(self.source)
+                except Exception as ex:
+                    log.exception("Chyba při čtení Excelu")
+                    self.failed.emit(f"Chyba při čtení: {ex}")
+                    return
+                try:
+                    results = generate_days(self.adapter, workbook, self.days, self.outlet, self.out_dir, self.cfg, cancel=self._cancel)
+                    for i, res in enumerate(results):
+                        self.dayDone.emit(res)
+                        self.progress.emit(i + 1, len(self.days))
+                except Exception as ex:
+                    # the run was rolled back: nothing of it is in the output folder
+                    log.exception("Chyba při generování")
+                    self.failed.emit(f"Chyba při generování, nic nebylo uloženo: {ex}")
+        finally:
+            if timer is not None:
+                self.stages.emit(report_stages(timer))
+            self.finished.emit(self._cancel.is_set())
+
+
+class InspectWorker(QtCore.QObject):
+    """Parses a dropped workbook off the GUI thread (ExcelAdapter.inspect)."""
+    done = QtCore.Signal(object, object)     # path, WorkbookInspection
+    failed = QtCore.Signal(object, object)   # path, exception
+
+    def __init__(self, adapter: ExcelAdapter, path: Path):
+        super().__init__()
+        self.adapter = adapter
+        self.path = path
+
+    @QtCore.Slot()
+    def run(self):
+        try:
+            result = self.adapter.inspect(self.path)
+        except Exception as ex:
+            log.exception("Chyba při čtení %s", self.path)
+            self.failed.emit(self.path, ex)
+            return
+        self.done.emit(self.path, result)
+
+
+class DropFrame(QtWidgets.QFrame):
+    fileDropped = QtCore.Signal(str)
+
+    def __init__(self):
+        super().__init__()
+        self.setAcceptDrops(True)
+        self.setMinimumHeight(100)
+        
+        # Create compact professional dropzone layout
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.setAlignment(QtCore.Qt.AlignCenter)
+        layout.setSpacing(8)
+        layout.setContentsMargins(16, 12, 16, 12)
+        
+        # Upload icon and text in horizontal layout for compactness
+        content_layout = QtWidgets.QHBoxLayout()
+        content_layout.setAlignment(QtCore.Qt.AlignCenter)
+        content_layout.setSpacing(12)
+        
+        # Upload icon (smaller)
+        icon_label = QtWidgets.QLabel("📁")
+        icon_label.setStyleSheet("font-size: 24px; color: #5F6368;")
+        content_layout.addWidget(icon_label)
+        
+        # Text container
+        text_layout = QtWidgets.QVBoxLayout()
+        text_layout.setSpacing(2)
+        
+        # Main text (smaller)
+        main_text = QtWidgets.QLabel("Přetáhněte Excel soubor sem")
+        main_text.setStyleSheet("font-size: 12px; font-weight: 600; color: #1A1B1F;")
+        text_layout.addWidget(main_text)
+        
+        # Sub text (smaller)
+        sub_text = QtWidgets.QLabel("nebo použijte tlačítko níže • .xlsx")
+        sub_text.setStyleSheet("font-size: 10px; color: #5F6368;")
+        text_layout.addWidget(sub_text)
+        
+        content_layout.addLayout(text_layout)
+        layout.addLayout(content_layout)
+
+    def dragEnterEvent(self, e: QtGui.QDragEnterEvent):
+        if e.mimeData().hasUrls():
+            e.acceptProposedAction()
+
+    def dropEvent(self, e: QtGui.QDropEvent):
+        urls = e.mimeData().urls()
+        if urls:
+            path = urls[0].toLocalFile()
+            self.fileDropped.emit(path)
+
+def format_czk(value: float) -> str:
+    return f"{value:,.2f}".replace(",", "\u00A0").replace(".", ",") + "\u00A0Kč"
+
+
+class DayPicker(QtWidgets.QWidget):
+    def __init__(self):
+        super().__init__()
+        self.grid = QtWidgets.QGridLayout(self)
+        self.grid.setHorizontalSpacing(6); self.grid.setVerticalSpacing(6)
+        self.checks: Dict[int, QtWidgets.QCheckBox] = {}
+
+    def set_days(self, days: List[int], totals: Optional[Dict[int, float]] = None):
+        # clear
+        for i in reversed(range(self.grid.count())):
+            w = self.grid.itemAt(i).widget()
+            if w: w.setParent(None)
+        self.checks.clear()
+        # layout 7 columns
+        row = 0; col = 0
+        for d in days:
+            cb = QtWidgets.QCheckBox(str(d))
+            if totals and d in totals:
+                cb.setToolTip(f"Tržby s DPH: {format_czk(totals[d])}")
+            self.checks[d] = cb
+            self.grid.addWidget(cb, row, col)
+            col += 1
+            if col >= 7:
+                col = 0; row += 1
+
+    def selected_days(self) -> List[int]:
+        return sorted([d for d, cb in self.checks.items() if cb.isChecked()])
+
+    def mark_all(self, checked: bool = True):
+        for cb in self.checks.values():
+            cb.setChecked(checked)
+
+    def mark_weekends(self, month: int, year: int):
+        for d, cb in self.checks.items():
+            wd = date(year, month, d).weekday()
+            cb.setChecked(wd >= 5)
+
+    def mark_workdays(self, month: int, year: int):
+        for d, cb in self.checks.items():
+            wd = date(year, month, d).weekday()
+            cb.setChecked(wd < 5)
+
+class MainWindow(QtWidgets.QMainWindow):
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle(f"{APP_NAME} v{APP_VERSION}")
+        self.resize(900, 600)
+        
+        # Apply professional styling
+        self.setStyleSheet(get_professional_stylesheet())
+        
+        self.cfg = config_snapshot()
+        self.adapter = ExcelAdapter(self.cfg)
+        self.xlsx_path: Optional[Path] = None
+        self.month_year: Optional[Tuple[int,int]] = None
+        # parsed on drop, reused by generate() while the file on disk is unchanged
+        self.workbook: Optional[SalesWorkbook] = None
+        self._worker: Optional[GenerateWorker] = None
+        self._worker_thread: Optional[QtCore.QThread] = None
+        self._inspections: Dict[QtCore.QThread, InspectWorker] = {}
+
+        # Create compact professional layout (original structure with modern styling)
+        central = QtWidgets.QWidget()
+        self.setCentralWidget(central)
+        main_layout = QtWidgets.QVBoxLayout(central)
+        main_layout.setSpacing(8)
+        main_layout.setContentsMargins(16, 16, 16, 16)
+        
+        # Top row: Outlet selection
+        top_layout = QtWidgets.QHBoxLayout()
+        outlet_lbl = QtWidgets.QLabel("Provoz:")
+        outlet_lbl.setObjectName("section_header")
+        self.outlet = QtWidgets.QComboBox()
+        self.outlet.addItems(["Bistro", "Restaurant", "CDL", "B&G", "Molo2"])
+        top_layout.addWidget(outlet_lbl)
+        top_layout.addWidget(self.outlet)
+        top_layout.addStretch()
+
+        # Year selector (dynamic range: this year -1 to +1)
+        year_lbl = QtWidgets.QLabel("Rok:")
+        year_lbl.setStyleSheet("font-size: 14pt; font-weight: 700;")
+        current_year = datetime.now().year
+        self.year_spin = QtWidgets.QSpinBox()
+        self.year_spin.setRange(current_year - 1, current_year + 1)
+        self.year_spin.setValue(current_year)
+        self.year_spin.setFixedWidth(120)
+        top_layout.addWidget(year_lbl)
+        top_layout.addWidget(self.year_spin)
+
+        main_layout.addLayout(top_layout)
+        
+        # Dropzone
+        self.drop = DropFrame()
+        self.drop.fileDropped.connect(self.on_file_dropped)
+        main_layout.addWidget(self.drop)
+        
+        # Browse button - compact, not full width
+        browse_layout = QtWidgets.QHBoxLayout()
+        pick_btn = QtWidgets.QPushButton("📁 Vybrat soubor...")
+        pick_btn.clicked.connect(self.pick_file)
+        pick_btn.setObjectName("secondary")
+        pick_btn.setMaximumWidth(150)
+        browse_layout.addWidget(pick_btn)
+        browse_layout.addStretch()
+        main_layout.addLayout(browse_layout)
+        
+        # Day info
+        self.day_info = QtWidgets.QLabel("Detekováno: —")
+        self.day_info.setObjectName("info")
+        main_layout.addWidget(self.day_info)
+        
+        # Day selection controls - compact row above picker
+        day_controls_layout = QtWidgets.QHBoxLayout()
+        day_controls_layout.addWidget(QtWidgets.QLabel("Vyberte dny:"))
+        day_controls_layout.addStretch()
+        
+        # Compact control buttons
+        btn_all = QtWidgets.QPushButton("✓ Vše")
+        btn_all.clicked.connect(lambda: self.picker.mark_all(True))
+        btn_all.setMaximumWidth(60)
+        btn_all.setMaximumHeight(28)
+        
+        btn_clear = QtWidgets.QPushButton("✗ Clear")
+        btn_clear.clicked.connect(lambda: self.picker.mark_all(False))
+        btn_clear.setMaximumWidth(60)
+        btn_clear.setMaximumHeight(28)
+        
+        day_controls_layout.addWidget(btn_all)
+        day_controls_layout.addWidget(btn_clear)
+        main_layout.addLayout(day_controls_layout)
+        
+        # Day picker grid (now without side controls)
+        self.picker = DayPicker()
+        main_layout.addWidget(self.picker)
+        
+        # Output row
+        output_layout = QtWidgets.QHBoxLayout()
+        output_layout.addWidget(QtWidgets.QLabel("Výstup:"))
+        # Load output directory from config, fallback to default
+        saved_output_dir = self.cfg.get("output_dir", str(OUTPUT_DIR))
+        self.out_dir = QtWidgets.QLineEdit(saved_output_dir)
+        output_layout.addWidget(self.out_dir, 1)
+        out_btn = QtWidgets.QPushButton("📁 Změnit...")
+        out_btn.clicked.connect(self.pick_output_dir)
+        output_layout.addWidget(out_btn)
+        main_layout.addLayout(output_layout)
+        
+        # Action buttons row
+        action_layout = QtWidgets.QHBoxLayout()
+        gen_btn = QtWidgets.QPushButton("🚀 Generovat XML")
+        gen_btn.clicked.connect(self.generate)
+        gen_btn.setObjectName("primary")
+        action_layout.addWidget(gen_btn)
+        self.gen_btn = gen_btn
+
+        cancel_btn = QtWidgets.QPushButton("⏹ Zrušit")
+        cancel_btn.clicked.connect(self.cancel_generate)
+        cancel_btn.setEnabled(False)
+        action_layout.addWidget(cancel_btn)
+        self.cancel_btn = cancel_btn
+
+        self.progress = QtWidgets.QProgressBar()
+        self.progress.setTextVisible(True)
+        self.progress.setVisible(False)
+        action_layout.addWidget(self.progress, 1)
+        action_layout.addStretch()
+        
+        open_btn = QtWidgets.QPushButton("📂 Otevřít složku")
+        open_btn.clicked.connect(self.open_output)
+        open_btn.setObjectName("secondary")
+        action_layout.addWidget(open_btn)
+        main_layout.addLayout(action_layout)
+        
+        # Status section
+        status_lbl = QtWidgets.QLabel("📋 Stav:")
+        status_lbl.setObjectName("section_header")
+        main_layout.addWidget(status_lbl)
+        
+        self.status = QtWidgets.QTextEdit()
+        self.status.setReadOnly(True)
+        self.status.setMaximumHeight(120)  # Compact height
+        main_layout.addWidget(self.status)
+
+        # Apply modern effects to interactive elements
+        ModernEffects.add_hover_effect(gen_btn)
+        ModernEffects.add_click_effect(gen_btn)
+        ModernEffects.add_hover_effect(pick_btn)
+        ModernEffects.add_hover_effect(out_btn)
+        ModernEffects.add_hover_effect(open_btn)
+        ModernEffects.add_hover_effect(btn_all)
+        ModernEffects.add_hover_effect(btn_clear)
+        
+        self.append_status("Připraveno.")
+        self.append_status(f"XML soubory se ukládají do: {OUTPUT_DIR}")
+        self.append_status(f"Konfigurace a logy: {APP_DATA_DIR}")
+
+    def append_status(self, msg: str, status_type: str = "info"):
+        """Add status message with color coding"""
+        # Color-coded status messages
+        if "Chyba" in msg or "Error" in msg:
+            color = COLORS["error"]
+        elif "Hotovo" in msg or "vytvořeno" in msg:
+            color = COLORS["success"]
+        elif "Varování" in msg or "Warning" in msg:
+            color = COLORS["warning"]
+        else:
+            color = COLORS["text_primary"]
+            
+        # Add with HTML formatting for color
+        self.status.append(f'<span style="color: {color};">• {msg}</span>')
+        write_log(msg)
+
+    def pick_file(self):
+        fn, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Vyber Excel", str(Path.home()), "Excel (*.xlsx)")
+        if fn:
+            self.on_file_selected(Path(fn))
+
+    def on_file_dropped(self, path: str):
+        p = Path(path)
+        if p.suffix.lower() != ".xlsx":
+            QtWidgets.QMessageBox.warning(self, APP_NAME, "Podporuji pouze .xlsx soubory.")
+            return
+        self.on_file_selected(p)
+
+    def on_file_selected(self, p: Path):
+        self.xlsx_path = p
+        self.month_year = None
+        self.workbook = None
+        self.setWindowTitle(f"{APP_NAME} v{APP_VERSION} — {p.name}")
+        self.day_info.setText(f"Načítám {p.name}…")
+
+        # one parse for month/year, days and totals, off the GUI thread
+        worker = InspectWorker(self.adapter, p)
+        thread = QtCore.QThread(self)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.done.connect(self._on_inspected)
+        worker.failed.connect(self._on_inspect_failed)
+        worker.done.connect(thread.quit)
+        worker.failed.connect(thread.quit)
+        thread.finished.connect(worker.deleteLater)
+        thread.finished.connect(lambda: self._inspections.pop(thread, None))
+        thread.finished.connect(thread.deleteLater)
+        self._inspections[thread] = worker
+        thread.start()
+
+    def _on_inspected(self, p: Path, res: WorkbookInspection):
+        if p != self.xlsx_path:
+            return  # another file was selected meanwhile
+        # Month/year from Excel content first, then from filename
+        my = res.month_year
+        if not my:
+            QtWidgets.QMessageBox.warning(self, APP_NAME, "Nelze odvodit měsíc/rok ani z obsahu Excelu ani z názvu souboru.\n\nUjisti se, že Excel obsahuje data ve formátu den.měsíc v prvním sloupci\nnebo má název ve formátu *_M_YYYY.xlsx")
+            self.day_info.setText("")
+            return
+        self.workbook = res.workbook
+        self.month_year = my
+        month, year = my
+        # Auto-set year spinner from detected year
+        self.year_spin.setValue(year)
+        # Offer auto-switch of outlet if filename suggests a different one
+        suggested = suggest_outlet_from_filename(p.name)
+        if suggested and suggested != self.outlet.currentText():
+            reply = QtWidgets.QMessageBox.question(
+                self, APP_NAME,
+                f"Zdá se, že soubor patří k provozu ‘{suggested}’, ale vybrán je ‘{self.outlet.currentText()}’.\nPřepnout na ‘{suggested}’?",
+                QtWidgets.QMessageBox.Yes | QtWidgets.QMessageBox.No,
+                QtWidgets.QMessageBox.Yes,
+            )
+            if reply == QtWidgets.QMessageBox.Yes:
+                self.outlet.setCurrentText(suggested)
+        days = res.days
+        self.picker.set_days(days, res.day_totals)
+        self.day_info.setText(f"Detekováno: Měsíc/Rok = {month:02d}/{year} | Dny: {', '.join(map(str, days)) if days else '—'}")
+        self.append_status(f"Načten soubor: {p}")
+        if res.day_totals:
+            self.append_status(f"Tržby s DPH za {len(res.day_totals)} dní: {format_czk(sum(res.day_totals.values()))}")
+        missing = res.unmatched_methods() if days else []
+        if missing:
+            self.append_status(f"Varování: v Excelu chybí sloupce pro: {', '.join(missing)}")
+        for issue in res.sum_issues[:10]:
+            self.append_status(f"Varování: nesedí součty {issue.day.day}.{issue.day.month}. – {issue.describe()}")
+        if len(res.sum_issues) > 10:
+            self.append_status(f"Varování: … a dalších {len(res.sum_issues) - 10} nesouladů součtů (viz log)")
+
+    def _on_inspect_failed(self, p: Path, ex: Exception):
+        if p != self.xlsx_path:
+            return
+        self.day_info.setText("")
+        if isinstance(ex, PermissionError):
+            QtWidgets.QMessageBox.warning(
+                self, APP_NAME,
+                "Soubor nelze otevřít (Permission denied).\n\nMožné příčiny:\n- Je otevřený v Excelu → zavřít\n- Je v OneDrive a není dostupný offline → v Průzkumníku zvol 'Vždy ponechat na tomto zařízení'\n- Zkopíruj soubor třeba do 'Dokumenty/' a načti znovu."
+            )
+            self.append_status(f"Permission denied: {p}")
+            return
+        QtWidgets.QMessageBox.warning(self, APP_NAME, f"Chyba při čtení Excelu: {ex}")
+        self.append_status(f"Chyba při čtení: {ex}")
+
+    def pick_output_dir(self):
+        d = QtWidgets.QFileDialog.getExistingDirectory(self, "Výstupní složka", self.out_dir.text())
+        if d:
+            self.out_dir.setText(d)
+            # Save the new output directory to config
+            cfg = self.cfg.to_dict()
+            cfg["output_dir"] = d
+            save_config(cfg)
+            self.cfg = config_snapshot()
+            self.append_status(f"Výstupní složka změněna na: {d}")
+
+    def open_output(self):
+        path = self.out_dir.text()
+        try:
+            os.startfile(path)  # Windows only
+        except Exception:
+            QtWidgets.QMessageBox.information(self, APP_NAME, f"Složku otevři ručně: {path}")
+
+    def mark_weekends(self):
+        if not self.month_year: return
+        m, y = self.month_year
+        self.picker.mark_weekends(m, y)
+
+    def mark_workdays(self):
+        if not self.month_year: return
+        m, y = self.month_year
+        self.picker.mark_workdays(m, y)
+
+    def generate(self):
+        if self._worker_thread is not None:
+            return
+        # Snapshot config once per run; it is reloaded only if config.json was edited since
+        # the last run, so edits (e.g., numberRequested) still apply without restarting the app
+        cfg = config_snapshot()
+        if cfg is not self.cfg:
+            self.cfg = cfg
+            self.adapter = ExcelAdapter(self.cfg)
+
+        if not self.xlsx_path or not self.month_year:
+            QtWidgets.QMessageBox.warning(self, APP_NAME, "Nahraj nejprve Excel.")
+            return
+        sel = self.picker.selected_days()
+        if not sel:
+            QtWidgets.QMessageBox.information(self, APP_NAME, "Nevybral jsi žádné dny.")
+            return
+        outlet = self.outlet.currentText()
+        log.debug("Selected outlet: %s", outlet)
+        log.debug("Available outlets in config: %s", list(self.cfg.get('outlets', {}).keys()))
+        log.debug("Outlet config loaded: %s", self.cfg["outlets"][outlet].get('centre', 'MISSING'))
+        out_dir = Path(self.out_dir.text()); out_dir.mkdir(parents=True, exist_ok=True)
+
+        # iterate days — use year from spinner (user can override for year-end edge cases)
+        month, _ = self.month_year
+        year = self.year_spin.value()
+        days = [date(year, month, d) for d in sel]
+
+        # DayResults of the run; commit failures are filled in before `finished` (DayResult.failed)
+        self._gen_results: List[DayResult] = []
+        self._gen_current = 0
+        self._gen_kept = 0
+        self._gen_failed = False
+        # reuse the workbook parsed on drop unless the file was saved again since
+        wb = self.workbook
+        source = wb if wb is not None and wb.path == self.xlsx_path and wb.is_current() else self.xlsx_path
+        worker = GenerateWorker(self.adapter, source, days, outlet, out_dir, self.cfg)
+        thread = QtCore.QThread(self)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.dayDone.connect(self._on_day_done)
+        worker.progress.connect(self._on_progress)
+        worker.failed.connect(self._on_generate_failed)
+        worker.stages.connect(self._on_stages)
+        worker.finished.connect(self._on_generate_finished)
+        worker.finished.connect(thread.quit)
+        thread.finished.connect(worker.deleteLater)
+        thread.finished.connect(thread.deleteLater)
+        self._worker, self._worker_thread = worker, thread
+
+        self.gen_btn.setEnabled(False)
+        self.cancel_btn.setEnabled(True)
+        self.progress.setRange(0, len(days))
+        self.progress.setValue(0)
+        self.progress.setVisible(True)
+        thread.start()
+
+    def cancel_generate(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            self.cancel_btn.setEnabled(False)
+            self.append_status("Ruším generování po dokončení aktuálního dne…")
+
+    def _on_progress(self, done: int, total: int):
+        self.progress.setValue(done)
+
+    def _on_day_done(self, res: DayResult):
+        if res.up_to_date:
+            self._gen_current += 1
+            self.append_status(f"{res.day.strftime('%d.%m.%Y')}: beze změny, přeskočeno")
+            return
+        # in output mode "month" the month's file comes with the last day, even if that day failed
+        self._gen_results.append(res)
+        self._gen_kept += len(res.kept)
+        if res.error is not None:
+            self.append_status(f"Chyba pro {res.day}: {res.error}")
+            return
+        self.append_status(f"{res.day.strftime('%d.%m.%Y')}: vytvořeno {sum(r.written for r in self._gen_results)} soubor(ů) zatím…")
+
+    def _on_stages(self, lines: list):
+        for line in lines:
+            self.append_status(line)
+
+    def _on_generate_failed(self, msg: str):
+        self._gen_failed = True
+        self.append_status(msg)
+        QtWidgets.QMessageBox.warning(self, APP_NAME, msg)
+
+    def _on_generate_finished(self, cancelled: bool):
+        self._worker = None
+        self._worker_thread = None
+        self.gen_btn.setEnabled(True)
+        self.cancel_btn.setEnabled(False)
+        self.progress.setVisible(False)
+        if self._gen_failed:
+            return
+        for res in self._gen_results:
+            if res.failed:
+                self.append_status(f"Chyba pro {res.day}: {res.error}")
+        success = sum(r.written for r in self._gen_results)
+        files = [f for r in self._gen_results for f in r.files if f not in r.kept]
+        if self._gen_kept:
+            self.append_status(f"Ponecháno {self._gen_kept} již existujících souborů (naming.existing = skip).")
+        if self._gen_current:
+            self.append_status(f"Beze změny od minulého generování: {self._gen_current} dní (output.incremental).")
+        if cancelled:
+            self.append_status(f"Varování: generování zrušeno. Vytvořeno {success} souborů.")
+            return
+        failed = list(dict.fromkeys(f for r in self._gen_results for f in r.failed))
+        if failed:
+            self.append_status(f"Hotovo s chybami. Vytvořeno {success} souborů, nelze uložit: {', '.join(failed)}")
+            QtWidgets.QMessageBox.warning(self, APP_NAME, f"Vytvořeno {success} souborů, {len(failed)} nelze uložit "
+                                                          "(otevřené v jiném programu?).")
+            return
+        if success:
+            self.append_status(f"Hotovo. Vytvořeno {success} souborů. Poslední: {files[-1] if files else ''}")
+            QtWidgets.QMessageBox.information(self, APP_NAME, f"Hotovo. Vytvořeno {success} souborů.")
+        elif self._gen_current or self._gen_kept:
+            QtWidgets.QMessageBox.information(self, APP_NAME, "Vše je aktuální, nebyl vygenerován žádný soubor.")
+        else:
+            self.append_status("Nic nebylo vygenerováno (součty nulové nebo nebyly vybrány dny).")
+            QtWidgets.QMessageBox.information(self, APP_NAME, "Nebyl vygenerován žádný soubor.")
+
+    def closeEvent(self, e: QtGui.QCloseEvent):
+        # let a running generation stop after the current day instead of killing the thread
+        if self._worker_thread is not None:
+            self._worker.cancel()
+            self._worker_thread.quit()
+            self._worker_thread.wait()
+        for thread in list(self._inspections):
+            thread.quit()
+            thread.wait()
+        super().closeEvent(e)
+
+
+def run_gui() -> int:
+    app = QtWidgets.QApplication(sys.argv)
+    w = MainWindow(); w.show()
+    # first event-loop turn = window painted; only then start loading pandas/lxml
+    QtCore.QTimer.singleShot(0, lambda: (report_startup(), warm_imports()))
+    return app.exec()
@@ -2,7 +2,9 @@
 """
 Molo XML – Desktop app (PySide6)
 ---------------------------------
-Single-file application implementing the PRD.
+Application core implementing the PRD: Excel adapter, XML builders, generation
+engine and the entry point. The Qt window lives in gui.py and is imported only
+when the app starts without a CLI command (see `main.py generate --help`).
 
 • OS: Windows 10/11 (offline)
 • UI: Dropzone + outlet select + days picker + Generate + Open Folder
@@ -19,421 +21,112 @@ Note: For packaging as MSI, wrap the PyInstaller onedir folder with WiX (outside
 """
 
 from __future__ import annotations
+import time
+_T_START = time.perf_counter()  # startup measurement (see report_startup)
 import os
 import re
 import sys
 import json
+import logging
+import threading
 import uuid
 import math
 import ctypes
-import traceback
+import io
+import zipfile
+import multiprocessing
+import argparse
+import calendar
+import functools
+import hashlib
+import copy
+import importlib
+import importlib.util
+import itertools
+from collections.abc import Iterator, Mapping
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager, nullcontext
+from contextvars import ContextVar
 from dataclasses import dataclass, field
 from datetime import date, datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from types import MappingProxyType
+from typing import Dict, List, Optional, Tuple, Union
 
-# 3rd party
-import pandas as pd
-from PySide6 import QtCore, QtGui, QtWidgets
-from lxml import etree as ET
 
-APP_NAME = "LGS XML"
-APP_VERSION = "2.0.2"
-TZ = "Europe/Prague"  # informational; Windows uses local time for yymmdd_hhmmss
 
-# ============================================================================
-# MODERN UI STYLING - Minimalist White-Gray with Financial Green Theme
-# ============================================================================
-
-COLORS = {
-    "primary_green": "#10B981",      # Financial green (emerald)
-    "primary_green_hover": "#059669", # Darker green on hover  
-    "primary_green_light": "#D1FAE5", # Light green background
-    "primary_green_dark": "#047857",  # Even darker green for active states
-    "background": "#F8FAFC",         # Very light gray background
-    "card_bg": "#FFFFFF",            # Pure white cards
-    "border": "#E2E8F0",             # Light gray borders
-    "border_hover": "#CBD5E1",       # Slightly darker border on hover
-    "text_primary": "#1E293B",       # Dark gray text
-    "text_secondary": "#64748B",     # Medium gray text
-    "text_muted": "#94A3B8",         # Light gray text
-    "shadow": "rgba(0, 0, 0, 0.08)", # Subtle shadow
-    "shadow_hover": "rgba(0, 0, 0, 0.12)", # Stronger shadow on hover
-    "error": "#EF4444",              # Red for errors
-    "warning": "#F59E0B",            # Orange for warnings
-    "success": "#10B981",            # Green for success (same as primary)
-    "dropzone_bg": "#F1F5F9",        # Light gray for dropzone
-    "dropzone_border": "#CBD5E1",    # Border for dropzone
-    "dropzone_hover": "#E2E8F0",     # Hover state for dropzone
-}
+class _LazyModule:
+    """Module proxy that imports on first attribute access.
 
-def get_professional_stylesheet() -> str:
-    """Return professional stylesheet inspired by modern file upload interfaces"""
-    return f"""
-    /* Main Application Window - Professional Background */
-    QMainWindow {{
-        background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
-            stop: 0 #FAFBFC, stop: 1 #F1F3F4);
-        font-family: 'Segoe UI', 'Inter', system-ui, sans-serif;
-        font-size: 10pt;
-        color: {COLORS['text_primary']};
-    }}
-    
-    /* Remove card styling for compact layout */
-    
-    /* Professional Dropzone - Compact */
-    DropFrame {{
-        background-color: #FAFBFF;
-        border: 2px dashed #D1D9E0;
-        border-radius: 12px;
-        min-height: 100px;
-        padding: 20px;
-        margin: 8px;
-    }}
-    
-    DropFrame:hover {{
-        background-color: #F0F7FF;
-        border-color: {COLORS['primary_green']};
-        border-width: 2px;
-        border-style: dashed;
-    }}
-    
-    /* Modern Button System */
-    QPushButton {{
-        background-color: white;
-        border: 1px solid #E8EAED;
-        border-radius: 12px;
-        padding: 12px 20px;
-        font-weight: 500;
-        font-size: 10pt;
-        color: {COLORS['text_primary']};
-        min-height: 20px;
-        min-width: 80px;
-    }}
-    
-    QPushButton:hover {{
-        background-color: #F8F9FA;
-        border-color: #DADCE0;
-    }}
-    
-    QPushButton:pressed {{
-        background-color: #F1F3F4;
-    }}
-    
-    /* Primary Action Button - Professional Green */
-    QPushButton#primary {{
-        background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
-            stop: 0 #16A085, stop: 1 #138D75);
-        color: white;
-        border: none;
-        font-weight: 600;
-        font-size: 11pt;
-        padding: 16px 32px;
-        min-height: 24px;
-        border-radius: 12px;
-    }}
-    
-    QPushButton#primary:hover {{
-        background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
-            stop: 0 #17A589, stop: 1 #148F77);
-    }}
-    
-    QPushButton#primary:pressed {{
-        background: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
-            stop: 0 #138D75, stop: 1 #117A65);
-    }}
-    
-    /* Secondary Buttons */
-    QPushButton#secondary {{
-        background-color: {COLORS['primary_green_light']};
-        border: 1px solid {COLORS['primary_green']};
-        color: {COLORS['primary_green_dark']};
-        font-weight: 600;
-    }}
-    
-    QPushButton#secondary:hover {{
-        background-color: white;
-    }}
-    
-    /* Professional ComboBox */
-    QComboBox {{
-        background-color: white;
-        border: 1px solid #E8EAED;
-        border-radius: 12px;
-        padding: 12px 16px;
-        font-size: 11pt;
-        color: {COLORS['text_primary']};
-        min-height: 24px;
-        font-weight: 500;
-    }}
-    
-    QComboBox:hover {{
-        border-color: {COLORS['primary_green']};
-    }}
-    
-    QComboBox:focus {{
-        border-color: {COLORS['primary_green']};
-        border-width: 2px;
-    }}
-    
-    QComboBox::drop-down {{
-        border: none;
-        width: 30px;
-        padding-right: 8px;
-    }}
-    
-    QComboBox::down-arrow {{
-        image: none;
-        border-left: 5px solid transparent;
-        border-right: 5px solid transparent;
-        border-top: 7px solid #9AA0A6;
-        margin-right: 4px;
-    }}
-    
-    QComboBox QAbstractItemView {{
-        background-color: white;
-        color: {COLORS['text_primary']};
-        border: 1px solid #E8EAED;
-        border-radius: 8px;
-        padding: 4px;
-        selection-background-color: {COLORS['primary_green_light']};
-        selection-color: {COLORS['text_primary']};
-    }}
-
-    QComboBox QAbstractItemView::item {{
-        color: {COLORS['text_primary']};
-        padding: 6px 12px;
-        min-height: 24px;
-    }}
-
-    QComboBox QAbstractItemView::item:selected {{
-        background-color: {COLORS['primary_green_light']};
-        color: {COLORS['text_primary']};
-    }}
-    
-    /* Input Fields */
-    QLineEdit {{
-        background-color: white;
-        border: 1px solid #E8EAED;
-        border-radius: 12px;
-        padding: 12px 16px;
-        font-size: 10pt;
-        color: {COLORS['text_primary']};
-        min-height: 20px;
-    }}
-    
-    QLineEdit:focus {{
-        border-color: {COLORS['primary_green']};
-        border-width: 2px;
-    }}
-    
-    /* SpinBox */
-    QSpinBox {{
-        background-color: white;
-        color: {COLORS['text_primary']};
-        border: 1px solid #E8EAED;
-        border-radius: 12px;
-        padding: 8px 16px;
-        padding-right: 30px;
-        font-size: 11pt;
-        font-weight: 500;
-        min-height: 24px;
-    }}
-
-    QSpinBox:hover {{
-        border-color: {COLORS['primary_green']};
-    }}
-
-    QSpinBox::up-button, QSpinBox::down-button {{
-        width: 24px;
-        border: none;
-    }}
-
-    /* Professional Typography */
-    QLabel {{
-        color: {COLORS['text_primary']};
-        font-size: 10pt;
-        font-weight: 500;
-    }}
-    
-    QLabel#title {{
-        font-size: 18pt;
-        font-weight: 700;
-        color: #1A1B1F;
-        margin-bottom: 4px;
-    }}
-    
-    QLabel#section_header {{
-        font-size: 14pt;
-        font-weight: 600;
-        color: #1A1B1F;
-        margin-bottom: 12px;
-        margin-top: 8px;
-    }}
-    
-    QLabel#subtitle {{
-        color: #5F6368;
-        font-size: 9pt;
-        font-weight: 400;
-        margin-bottom: 16px;
-    }}
-    
-    QLabel#info {{
-        color: #5F6368;
-        font-size: 9pt;
-        font-weight: 400;
-        font-style: italic;
-    }}
-    
-    /* Modern Checkboxes */
-    QCheckBox {{
-        color: {COLORS['text_primary']};
-        font-size: 10pt;
-        spacing: 12px;
-        padding: 4px;
-    }}
-    
-    QCheckBox::indicator {{
-        width: 20px;
-        height: 20px;
-        border: 2px solid #DADCE0;
-        border-radius: 6px;
-        background-color: white;
-    }}
-    
-    QCheckBox::indicator:hover {{
-        border-color: {COLORS['primary_green']};
-        background-color: {COLORS['primary_green_light']};
-    }}
-    
-    QCheckBox::indicator:checked {{
-        background-color: {COLORS['primary_green']};
-        border-color: {COLORS['primary_green']};
-        image: none;
-    }}
-    
-    QCheckBox::indicator:checked:hover {{
-        background-color: {COLORS['primary_green_hover']};
-    }}
-    
-    /* Professional Text Areas */
-    QTextEdit {{
-        background-color: white;
-        border: 1px solid #E8EAED;
-        border-radius: 12px;
-        padding: 16px;
-        font-family: 'SF Mono', 'Monaco', 'Cascadia Code', monospace;
-        font-size: 9pt;
-        color: {COLORS['text_primary']};
-        line-height: 1.5;
-    }}
-    
-    /* Custom Scrollbars */
-    QScrollBar:vertical {{
-        background-color: transparent;
-        width: 12px;
-        border-radius: 6px;
-        margin: 3px;
-    }}
-    
-    QScrollBar::handle:vertical {{
-        background-color: #DADCE0;
-        border-radius: 6px;
-        min-height: 30px;
-        margin: 2px;
-    }}
-    
-    QScrollBar::handle:vertical:hover {{
-        background-color: #BDC1C6;
-    }}
-    
-    QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {{
-        border: none;
-        background: none;
-    }}
-    
-    /* Professional Status Messages */
-    QLabel#status_success {{
-        color: #137333;
-        font-weight: 600;
-        background-color: #E8F5E8;
-        padding: 8px 12px;
-        border-radius: 8px;
-        border-left: 4px solid #137333;
-    }}
-    
-    QLabel#status_error {{
-        color: #D93025;
-        font-weight: 600;
-        background-color: #FCE8E6;
-        padding: 8px 12px;
-        border-radius: 8px;
-        border-left: 4px solid #D93025;
-    }}
-    
-    QLabel#status_warning {{
-        color: #E37400;
-        font-weight: 600;
-        background-color: #FEF7E0;
-        padding: 8px 12px;
-        border-radius: 8px;
-        border-left: 4px solid #E37400;
-    }}
-
-    /* Message Box - force light theme for readability */
-    QMessageBox {{
-        background-color: white;
-    }}
-    QMessageBox QLabel {{
-        color: {COLORS['text_primary']};
-        font-size: 10pt;
-    }}
-    QMessageBox QPushButton {{
-        background-color: white;
-        color: {COLORS['text_primary']};
-        border: 1px solid #E8EAED;
-        border-radius: 8px;
-        padding: 8px 24px;
-        min-width: 80px;
-    }}
-    QMessageBox QPushButton:hover {{
-        background-color: #F8F9FA;
-    }}
+    pandas/numpy/lxml are not needed to show the window; they load on the first file drop
+    (or earlier, in the background, via warm_imports()).
     """
 
-# Animation and Effects Helper
-class ModernEffects:
-    @staticmethod
-    def add_hover_effect(widget):
-        """Add smooth hover effect to any widget"""
-        def on_enter(event):
-            widget.setProperty("hover", True)
-            widget.style().polish(widget)
-            
-        def on_leave(event):
-            widget.setProperty("hover", False) 
-            widget.style().polish(widget)
-            
-        widget.enterEvent = on_enter
-        widget.leaveEvent = on_leave
-    
-    @staticmethod
-    def add_click_effect(widget):
-        """Add click ripple effect"""
-        original_click = widget.mousePressEvent
-        
-        def enhanced_click(event):
-            # Create subtle flash effect
-            widget.setProperty("clicked", True)
-            widget.style().polish(widget)
-            QtCore.QTimer.singleShot(100, lambda: [
-                widget.setProperty("clicked", False),
-                widget.style().polish(widget)
-            ])
-            if original_click:
-                original_click(event)
-                
-        widget.mousePressEvent = enhanced_click
+    def __init__(self, name: str):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+
+    def _load(self):
+        mod = self.__dict__["_module"]
+        if mod is None:
+            mod = importlib.import_module(self.__dict__["_name"])
+            self.__dict__["_module"] = mod
+        return mod
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+
+# 3rd party (lazy)
+np = _LazyModule("numpy")
+pd = _LazyModule("pandas")
+ET = _LazyModule("lxml.etree")
+
+
+def warm_imports() -> threading.Thread:
+    """Import the heavy modules in a background thread so the first drop does not wait for them."""
+    def _warm():
+        t = time.perf_counter()
+        for mod in (np, pd, ET):
+            mod._load()
+        importlib.import_module("openpyxl")
+        log.info("Startup: pandas/lxml/openpyxl loaded in background in %.0f ms", (time.perf_counter() - t) * 1000)
+
+    th = threading.Thread(target=_warm, name="warm-imports", daemon=True)
+    th.start()
+    return th
+
+
+def _process_age() -> Optional[float]:
+    """Seconds since the OS created this process (includes the PyInstaller bootloader), Windows only."""
+    if os.name != "nt":
+        return None
+    try:
+        ft = [ctypes.c_ulonglong() for _ in range(4)]  # creation, exit, kernel, user (FILETIME)
+        k32 = ctypes.windll.kernel32
+        if not k32.GetProcessTimes(k32.GetCurrentProcess(), *(ctypes.byref(x) for x in ft)):
+            return None
+        # FILETIME: 100 ns ticks since 1601-01-01
+        created = ft[0].value / 1e7 - 11644473600
+        return time.time() - created
+    except Exception:
+        return None
+
+
+def report_startup(what: str = "window shown") -> str:
+    """Log time from interpreter start (and process creation on Windows) until `what`."""
+    msg = f"Startup: {what} after {(time.perf_counter() - _T_START) * 1000:.0f} ms since main.py import"
+    age = _process_age()
+    if age is not None:
+        msg += f", {age * 1000:.0f} ms since process start"
+    loaded = [name for name in ("pandas", "lxml.etree", "PySide6") if name in sys.modules]
+    msg += f" (loaded: {', '.join(loaded) or '-'})"
+    log.info(msg)
+    return msg
+
+APP_NAME = "LGS XML"
+APP_VERSION = "2.0.2"
+TZ = "Europe/Prague"  # informational; Windows uses local time for yymmdd_hhmmss
 
 # --------------------------------------------------------------------------------------
 # Configuration (defaults) – mirrors PRD; can be overridden by external config.json
@@ -644,6 +337,7 @@ DEFAULT_CONFIG = {
 APP_DATA_DIR = Path.home() / "AppData" / "Local" / "MoloXML"
 CONFIG_DIR = APP_DATA_DIR / "Config"
 LOG_DIR = APP_DATA_DIR / "Logs"
+CACHE_DIR = APP_DATA_DIR / "Cache"
 
 # User output files in Documents (visible to user)
 OUTPUT_DIR = Path.home() / "Documents" / "Pohoda XML"
@@ -665,7 +359,7 @@ def ensure_dirs():
 
 def load_config() -> dict:
     ensure_dirs()
-    write_log(f"DEBUG: Loading config from {CONFIG_PATH}")
+    log.debug("Loading config from %s", CONFIG_PATH)
     
     # Migration: if config exists in old location, move it to new location
     if not CONFIG_PATH.exists() and OLD_CONFIG_PATH.exists():
@@ -676,7 +370,7 @@ def load_config() -> dict:
             # Log after directories are ensured
             write_log(f"Migrated config from old location to {CONFIG_PATH}")
         except Exception as e:
-            write_log(f"Config migration failed: {e}")
+            log.warning("Config migration failed: %s", e)
     
     # Load config from current location
     if CONFIG_PATH.exists():
@@ -687,10 +381,10 @@ def load_config() -> dict:
                 write_log(f"Config upgrade: {config.get('config_version', 'none')} → {DEFAULT_CONFIG['config_version']}")
                 CONFIG_PATH.write_text(json.dumps(DEFAULT_CONFIG, ensure_ascii=False, indent=2), encoding="utf-8")
                 return DEFAULT_CONFIG
-            write_log(f"DEBUG: Successfully loaded config with {len(config.get('outlets', {}))} outlets")
+            log.debug("Successfully loaded config with %d outlets", len(config.get('outlets', {})))
             return config
         except Exception as e:
-            write_log(f"DEBUG: Failed to load config: {e}")
+            log.warning("Failed to load config: %s", e)
             pass
 
     # write default if not exists
@@ -705,33 +399,285 @@ def save_config(config: dict):
         CONFIG_PATH.write_text(json.dumps(config, ensure_ascii=False, indent=2), encoding="utf-8")
         write_log(f"Config saved to {CONFIG_PATH}")
     except Exception as e:
-        write_log(f"Failed to save config: {e}")
+        log.error("Failed to save config: %s", e)
+
+
+def _freeze(obj):
+    if isinstance(obj, Mapping):
+        return MappingProxyType({k: _freeze(v) for k, v in obj.items()})
+    if isinstance(obj, (list, tuple)):
+        return tuple(_freeze(v) for v in obj)
+    return obj
+
+
+def _thaw(obj):
+    if isinstance(obj, Mapping):
+        return {k: _thaw(v) for k, v in obj.items()}
+    if isinstance(obj, tuple):
+        return [_thaw(v) for v in obj]
+    return obj
+
 
+class ConfigSnapshot(Mapping):
+    """Read-only config as loaded from config.json at `stamp` (nested dicts/lists frozen too)."""
 
-def log_path_today() -> Path:
-    now = datetime.now()
+    def __init__(self, data: Mapping, stamp: Optional[Tuple[int, int]] = None):
+        self._data = _freeze(data)
+        self.stamp = stamp
+        # values derived from this config only (e.g. compiled XML templates); dies with the snapshot
+        self.memo: dict = {}
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def to_dict(self) -> dict:
+        """Mutable deep copy, e.g. for save_config()."""
+        return _thaw(self._data)
+
+    def with_options(self, section: str, **values) -> "ConfigSnapshot":
+        """Copy with keys of one section (e.g. "output") overridden, for a single run."""
+        data = self.to_dict()
+        data.setdefault(section, {}).update(values)
+        return ConfigSnapshot(data, self.stamp)
+
+    def __reduce__(self):
+        # MappingProxyType does not pickle; ship plain data to worker processes
+        return (ConfigSnapshot, (self.to_dict(), self.stamp))
+
+
+_CONFIG_SNAPSHOT: Optional[ConfigSnapshot] = None
+
+
+def _config_stamp() -> Optional[Tuple[int, int]]:
+    try:
+        st = CONFIG_PATH.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def config_snapshot() -> ConfigSnapshot:
+    """Config for one generation run; reloaded only when config.json changed on disk."""
+    global _CONFIG_SNAPSHOT
+    snap = _CONFIG_SNAPSHOT
+    stamp = _config_stamp()
+    if snap is not None and stamp is not None and snap.stamp == stamp:
+        return snap
+    data = load_config()
+    # load_config() may have rewritten the file (first run, version upgrade) – stamp afterwards
+    snap = ConfigSnapshot(data, _config_stamp())
+    _CONFIG_SNAPSHOT = snap
+    if not os.environ.get("LGSXML_LOG_LEVEL"):
+        set_log_level(snap.get("log_level", "INFO"))
+    return snap
+
+
+def log_path_today(now: Optional[datetime] = None) -> Path:
+    now = now or datetime.now()
     p = LOG_DIR / f"{now:%Y-%m}"
     p.mkdir(parents=True, exist_ok=True)
     return p / f"app_{now:%Y%m%d}.txt"
 
 
+class _LevelPrefixFormatter(logging.Formatter):
+    """'[HH:MM:SS] message' as before; non-INFO records get a 'DEBUG: ' / 'ERROR: ' prefix."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        if record.levelno != logging.INFO:
+            line = line.replace("] ", f"] {record.levelname}: ", 1)
+        return line
+
+
+class DailyLogHandler(logging.Handler):
+    """Buffered writer for Logs/YYYY-MM/app_YYYYMMDD.txt.
+
+    The file stays open and is switched when the day changes. The buffer is flushed
+    on WARNING and above, at most `flush_interval` seconds after a write (a timer covers
+    a lone line with nothing logged after it), and at exit (logging.shutdown), instead
+    of open-append-close per line.
+    """
+
+    def __init__(self, flush_interval: float = 2.0):
+        super().__init__()
+        self.flush_interval = flush_interval
+        self._stream = None
+        self._day: Optional[date] = None
+        self._last_flush = 0.0
+        self._timer: Optional[threading.Timer] = None
+
+    def _open_for(self, now: datetime):
+        if self._stream is not None:
+            self._stream.close()
+        self._stream = log_path_today(now).open("a", encoding="utf-8")
+        self._day = now.date()
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            now = datetime.fromtimestamp(record.created)
+            with self.lock:
+                if self._stream is None or now.date() != self._day:
+                    self._open_for(now)
+                self._stream.write(self.format(record) + "\n")
+                if record.levelno >= logging.WARNING or record.created - self._last_flush >= self.flush_interval:
+                    self._stream.flush()
+                    self._last_flush = record.created
+                elif self._timer is None:
+                    self._timer = threading.Timer(self.flush_interval, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        with self.lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._stream is not None:
+                self._stream.flush()
+                self._last_flush = time.time()
+
+    def close(self):
+        with self.lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._stream is not None:
+                self._stream.close()
+                self._stream = None
+        super().close()
+
+
+log = logging.getLogger("lgsxml")
+
+
+def set_log_level(level) -> None:
+    """Accepts 'DEBUG'/'INFO'/... or a logging level number; unknown names fall back to INFO."""
+    if isinstance(level, str):
+        level = logging.getLevelName(level.upper())
+    log.setLevel(level if isinstance(level, int) else logging.INFO)
+
+
+def setup_logging(level=None) -> None:
+    # DEBUG is off unless config "log_level" or env LGSXML_LOG_LEVEL says otherwise
+    if not any(isinstance(h, DailyLogHandler) for h in log.handlers):
+        handler = DailyLogHandler()
+        handler.setFormatter(_LevelPrefixFormatter("[%(asctime)s] %(message)s", datefmt="%H:%M:%S"))
+        log.addHandler(handler)
+        log.propagate = False
+    set_log_level(level or os.environ.get("LGSXML_LOG_LEVEL") or "INFO")
+
+
 def write_log(line: str):
-    p = log_path_today()
-    with p.open("a", encoding="utf-8") as f:
-        f.write(f"[{datetime.now():%H:%M:%S}] {line}\n")
-
-
-def norm_number(x) -> float:
-    if pd.isna(x):
-        return 0.0
-    s = str(x)
-    s = s.replace("\u00A0", "").replace(" ", "")
-    s = s.replace("Kč", "").replace("CZK", "")
-    s = s.replace(",", ".")
-    try:
-        return float(s)
-    except Exception:
-        return 0.0
+    log.info(line)
+
+
+setup_logging()
+
+
+# --------------------------------------------------------------------------------------
+# Stage timing (config "diagnostics": {"stage_timing": true})
+# --------------------------------------------------------------------------------------
+
+class StageTimer:
+    """Wall time and call count per pipeline stage, summed over one run (all threads/workers)."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.seconds: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float, calls: int = 1):
+        with self._lock:
+            self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+            self.calls[stage] = self.calls.get(stage, 0) + calls
+
+    def merge(self, stages: Dict[str, Tuple[float, int]]):
+        """Add the snapshot() of another timer, e.g. from a pool worker."""
+        for stage, (seconds, calls) in stages.items():
+            self.add(stage, seconds, calls)
+
+    def snapshot(self) -> Dict[str, Tuple[float, int]]:
+        with self._lock:
+            return {k: (v, self.calls[k]) for k, v in self.seconds.items()}
+
+    @contextmanager
+    def active(self):
+        """Record the timed() stages of this thread into this timer."""
+        token = _STAGE_TIMER.set(self)
+        try:
+            yield self
+        finally:
+            _STAGE_TIMER.reset(token)
+
+    def summary(self) -> List[str]:
+        wall = time.perf_counter() - self.started
+        lines = [f"Časy fází (celkem {wall:.2f} s; součet přes vlákna/procesy, vnořené fáze se překrývají):"]
+        for stage, (seconds, calls) in sorted(self.snapshot().items(), key=lambda kv: -kv[1][0]):
+            lines.append(f"  {stage}: {seconds * 1000:.0f} ms ({calls}×, {seconds / calls * 1000:.2f} ms/volání)")
+        return lines
+
+
+_STAGE_TIMER: ContextVar[Optional[StageTimer]] = ContextVar("lgsxml_stage_timer", default=None)
+
+
+def stage_timing_enabled(cfg: Mapping) -> bool:
+    return bool((cfg.get("diagnostics", {}) or {}).get("stage_timing", False))
+
+
+def new_stage_timer(cfg: Mapping) -> Optional[StageTimer]:
+    """A timer for one run if enabled in config, else None."""
+    return StageTimer() if stage_timing_enabled(cfg) else None
+
+
+def report_stages(timer: StageTimer) -> List[str]:
+    """Log the breakdown and return its lines (for the UI status / CLI output)."""
+    lines = timer.summary()
+    for line in lines:
+        log.info(line)
+    return lines
+
+
+def timed(stage: str):
+    """Decorator: count the call's wall time under `stage` while a StageTimer is active (else ~free)."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            timer = _STAGE_TIMER.get()
+            if timer is None:
+                return fn(*args, **kwargs)
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                timer.add(stage, time.perf_counter() - t0)
+        return wrapper
+    return deco
+
+
+def norm_numbers(col: pd.Series) -> np.ndarray:
+    """Money column → floats: strips spaces, NBSP and Kč/CZK, decimal comma; empty or unparsable cells are 0."""
+    if pd.api.types.is_numeric_dtype(col) and not pd.api.types.is_bool_dtype(col):
+        return col.astype(float).fillna(0.0).to_numpy()
+    s = col.astype(str)
+    for token in ("\u00A0", " ", "Kč", "CZK"):
+        s = s.str.replace(token, "", regex=False)
+    s = s.str.replace(",", ".", regex=False)
+    return pd.to_numeric(s, errors="coerce").fillna(0.0).to_numpy(dtype=float)
+
+
+def round_money(a: np.ndarray) -> np.ndarray:
+    """Python round(x, 2) of every element. Not np.round: that scales by 100 and rounds half to even,
+    so 1234.565 would become 1234.56 instead of 1234.57."""
+    return np.fromiter((round(x, 2) for x in a.ravel().tolist()), dtype=float, count=a.size).reshape(a.shape)
 
 
 def yymmdd_hhmmss(now: Optional[datetime] = None) -> str:
@@ -767,96 +713,574 @@ def next_business_day(d: date) -> date:
 # Excel parsing → internal model
 # --------------------------------------------------------------------------------------
 
+METHOD_KEYS = ("cash", "card", "voucher", "cashless")
+RATE_KEYS = ("high", "low", "none")
+AMOUNT_PARTS = ("base", "vat", "gross")
+
+# "3.6.", "03.06." or "3.6" in the first column of the sheet
+DAY_RX = re.compile(r"(\d{1,2})\.(\d{1,2})\.?")
+
+
+@dataclass
+class SalesWorkbook:
+    """Storyous export parsed once; shared by all day lookups of one generation run."""
+    path: Path
+    sheet: str
+    # None when restored from the workbook cache (day index and matrix only)
+    df: Optional[pd.DataFrame]
+    # (month, day) -> first row position whose date cell is exactly D.M., DD.MM. or D.M; keyed without
+    # the year because the export does not contain it (row_for() takes a date)
+    day_rows: Dict[Tuple[int, int], int] = field(default_factory=dict)
+    # month -> days found in the date column (prefix match, as the picker always did)
+    month_days: Dict[int, List[int]] = field(default_factory=dict)
+    # amounts of all indexed days, filled by ExcelAdapter.extract()
+    matrix: Optional[SalesMatrix] = None
+    # sha256 of the file content, set when the workbook cache is enabled
+    digest: Optional[str] = None
+    # (mtime_ns, size) of the file when it was opened
+    stamp: Optional[Tuple[int, int]] = None
+
+    def __post_init__(self):
+        if not self.day_rows and not self.month_days:
+            self._index_days()
+
+    @property
+    def empty(self) -> bool:
+        # only sheets with rows are cached, so a restored workbook is never empty
+        return self.df is not None and self.df.empty
+
+    def _index_days(self):
+        if self.df is None or self.df.empty:
+            return
+        found: Dict[int, set] = {}
+        for pos, v in enumerate(self.df[self.df.columns[0]].astype(str).str.strip()):
+            m = DAY_RX.match(v)
+            if not m:
+                continue
+            d, mth = int(m.group(1)), int(m.group(2))
+            found.setdefault(mth, set()).add(d)
+            if v in (f"{d}.{mth}.", f"{d:02d}.{mth:02d}.", f"{d}.{mth}"):
+                self.day_rows.setdefault((mth, d), pos)
+        self.month_days = {mth: sorted(days) for mth, days in found.items()}
+
+    def row_for(self, day: date) -> Optional[int]:
+        return self.day_rows.get((day.month, day.day))
+
+    def is_current(self) -> bool:
+        """False once the file on disk changed (or vanished) since it was opened."""
+        return self.stamp is not None and _file_stamp(self.path) == self.stamp
+
+
+def _file_stamp(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = Path(path).stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+SUM_CHECKS = ("warn", "skip", "off")
+_METHOD_NAMES = {"cash": "hotově", "card": "kartou", "voucher": "voucherem", "cashless": "cashless"}
+_RATE_NAMES = {"high": "základní sazba", "low": "snížená sazba", "none": "nulová sazba"}
+_PART_NAMES = {"base": "Základ", "vat": "DPH", "gross": "Tržby s DPH"}
+
+
+def sum_check(cfg: Mapping) -> str:
+    """Config "validation": {"sums": "warn"|"skip"|"off"} – days whose amounts do not add up are
+    reported (default), reported and left out of the run, or not checked."""
+    policy = (cfg.get("validation", {}) or {}).get("sums", "warn")
+    if policy not in SUM_CHECKS:
+        log.warning("Neznámé validation.sums '%s', používám 'warn'", policy)
+        return "warn"
+    return policy
+
+
+def rounding_tolerance(cfg: Mapping) -> float:
+    return float((cfg.get("global_rules", {}) or {}).get("rounding_tolerance", 0.01))
+
+
+@dataclass(frozen=True)
+class SumIssue:
+    """One failed check of SalesMatrix.sum_issues()."""
+    day: date
+    # None = the day's "Celkem" columns against the sum of all methods
+    method: Optional[str]
+    # rate key (high/low/none) for a method, amount part (base/vat/gross) for the day total
+    field: str
+    expected: float
+    actual: float
+
+    def describe(self) -> str:
+        if self.method is None:
+            return (f"{_PART_NAMES[self.field]} Celkem {self.expected:.2f} ≠ součet metod {self.actual:.2f}"
+                    f" (rozdíl {self.actual - self.expected:.2f})")
+        return (f"{_METHOD_NAMES[self.method]}, {_RATE_NAMES[self.field]}: základ + DPH {self.expected:.2f}"
+                f" ≠ s DPH {self.actual:.2f}")
+
+
+@dataclass
+class SalesMatrix:
+    """Dense days × method × rate × (base, vat, gross) amounts, rounded to 2 decimals."""
+    header_key: str
+    # (month, day) -> position on the first axis of values
+    index: Dict[Tuple[int, int], int]
+    values: np.ndarray
+    # header_map section -> field (base_high, ...) -> matched Excel column name
+    columns: Dict[str, Dict[str, str]] = field(default_factory=dict)
+    # days × (base, vat, gross) of the "Celkem" columns, NaN where the export has none;
+    # None when it has no total column at all
+    totals: Optional[np.ndarray] = None
+    # days × (base, vat, gross) of ignored invoice/bank transfer sales included in the totals
+    ignored: Optional[np.ndarray] = None
+
+    def sum_issues(self, days: List[date], tolerance: float) -> List[SumIssue]:
+        """Checks all `days` at once: base + vat = gross for every method and rate, and the sum of
+        all methods plus ignored sales = the "Celkem" columns. A day total may be off by tolerance/2
+        per summed non-zero amount (each is rounded on its own), but at least by tolerance."""
+        picked = [d for d in days if (d.month, d.day) in self.index]
+        if not picked:
+            return []
+        rows = [self.index[(d.month, d.day)] for d in picked]
+        v = self.values[rows]
+        issues = []
+        diff = np.round(v[..., 0] + v[..., 1] - v[..., 2], 2)
+        for r, mi, ri in np.argwhere(np.abs(diff) > tolerance):
+            issues.append(SumIssue(picked[r], METHOD_KEYS[mi], RATE_KEYS[ri],
+                                   expected=round(float(v[r, mi, ri, 0] + v[r, mi, ri, 1]), 2),
+                                   actual=float(v[r, mi, ri, 2])))
+        if self.totals is not None:
+            totals = self.totals[rows]
+            sums = np.round(v.sum(axis=(1, 2)) + self.ignored[rows], 2)
+            allowed = np.maximum(tolerance, tolerance / 2 * (np.count_nonzero(v, axis=(1, 2)) + 1))
+            diff = np.where(np.isnan(totals), 0.0, np.round(sums - totals, 2))
+            for r, pi in np.argwhere(np.abs(diff) > allowed):
+                issues.append(SumIssue(picked[r], None, AMOUNT_PARTS[pi],
+                                       expected=float(totals[r, pi]), actual=float(sums[r, pi])))
+        issues.sort(key=lambda i: i.day)
+        return issues
+
+    def day_gross(self, day: date) -> Optional[float]:
+        """Gross sales of one day over all methods and rates."""
+        i = self.index.get((day.month, day.day))
+        if i is None:
+            return None
+        return round(float(self.values[i, :, :, 2].sum()), 2)
+
+    def amounts(self, day: date) -> Optional[Dict[str, Dict[str, float]]]:
+        i = self.index.get((day.month, day.day))
+        if i is None:
+            return None
+        row = self.values[i].tolist()
+        return {
+            method_key: {
+                f"{part}_{rate_key}": row[mi][ri][pi]
+                for ri, rate_key in enumerate(RATE_KEYS)
+                for pi, part in enumerate(AMOUNT_PARTS)
+            }
+            for mi, method_key in enumerate(METHOD_KEYS)
+        }
+
+
+@dataclass(frozen=True)
+class ColumnPlan:
+    """header_map sections resolved to column positions for one header signature."""
+    columns: Tuple[str, ...]
+    # section -> field (base_high, vat_low, ...) -> column position
+    sections: Dict[str, Dict[str, int]]
+
+    def names(self, section_key: str) -> Dict[str, str]:
+        return {k: self.columns[i] for k, i in self.sections.get(section_key, {}).items()}
+
+
+@functools.lru_cache(maxsize=None)
+def _compile(pattern: str) -> re.Pattern:
+    return re.compile(pattern)
+
+
+EXCEL_READERS = ("pandas", "openpyxl", "calamine", "auto")
+
+
+def calamine_available() -> bool:
+    return importlib.util.find_spec("python_calamine") is not None
+
+
+def excel_reader(cfg: Mapping) -> str:
+    """Config "excel": {"reader": ...}: "pandas" (pd.ExcelFile, default), "openpyxl" (read-only,
+    values only), "calamine" (python-calamine, if installed) or "auto" (calamine, else openpyxl)."""
+    name = (cfg.get("excel", {}) or {}).get("reader", "pandas")
+    if name not in EXCEL_READERS:
+        log.warning("Neznámý excel.reader '%s', používám 'pandas'", name)
+        return "pandas"
+    if name in ("calamine", "auto"):
+        if calamine_available():
+            return "calamine"
+        if name == "calamine":
+            log.warning("python-calamine není nainstalované, excel.reader = 'openpyxl'")
+        return "openpyxl"
+    return name
+
+
+def pandas_header(cells: tuple) -> List[str]:
+    """Column names as pd.read_excel() makes them: stripped, 'Unnamed: i' for empty cells,
+    duplicates renamed to 'name.1', 'name.2', ..."""
+    names, seen = [], {}
+    for i, c in enumerate(cells):
+        name = f"Unnamed: {i}" if c is None or c == "" else str(c)
+        if name in seen:
+            base = name
+            while name in seen:
+                seen[base] += 1
+                name = f"{base}.{seen[base]}"
+        seen[name] = 0
+        names.append(name.strip())
+    return names
+
+
+def _select_columns(rows: Iterator[tuple], pick_columns, empty=None) -> Tuple[List[str], List[tuple]]:
+    """Header names (pandas_header()) and body rows cut down to the positions `pick_columns(names)`
+    returns, row by row as the reader yields them; `empty` is the reader's value for a blank cell."""
+    header = next(rows, None)
+    if header is None:
+        return [], []
+    names = pandas_header(tuple(None if v == empty else v for v in header))
+    keep = [p for p in pick_columns(names) if p < len(names)]
+
+    def cell(row: tuple, p: int):
+        v = row[p] if p < len(row) else None
+        return None if v == empty else v
+
+    body = [tuple(cell(row, p) for p in keep) for row in rows]
+    # read_excel drops trailing empty rows
+    while body and all(v is None for v in body[-1]):
+        body.pop()
+    return [names[p] for p in keep], body
+
+
+def _rows_openpyxl(path: Path, pick_sheet, pick_columns) -> Tuple[str, List[str], List[tuple]]:
+    import openpyxl
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = pick_sheet(wb.sheetnames)
+        ws = wb[sheet]
+        # exporters do not always write a correct <dimension>; read what is really there
+        ws.reset_dimensions()
+        return (sheet, *_select_columns(ws.iter_rows(values_only=True), pick_columns))
+    finally:
+        wb.close()
+
+
+def _rows_calamine(path: Path, pick_sheet, pick_columns) -> Tuple[str, List[str], List[tuple]]:
+    from python_calamine import CalamineWorkbook
+    wb = CalamineWorkbook.from_path(str(path))
+    try:
+        sheet = pick_sheet(wb.sheet_names)
+        ws = wb.get_sheet_by_name(sheet)
+        # iter_rows() starts at the first used cell; pad back to A1 like to_python(skip_empty_area=False)
+        top, left = ws.start or (0, 0)
+        pad = ("",) * left
+        rows = itertools.chain(itertools.repeat(("",) * (left + ws.width), top), (pad + tuple(r) for r in ws.iter_rows()))
+        # calamine returns "" for empty cells and floats for whole numbers
+        return (sheet, *_select_columns(rows, pick_columns, empty=""))
+    finally:
+        close = getattr(wb, "close", None)
+        if close is not None:
+            close()
+
+
+_ROW_READERS = {"openpyxl": _rows_openpyxl, "calamine": _rows_calamine}
+
+# bump when the stored arrays or the meaning of the amounts change
+WORKBOOK_CACHE_FORMAT = 5
+
+
+def workbook_cache_limit(cfg: Mapping) -> int:
+    """Config "excel": {"cache": true, "cache_mb": 64} – size of CACHE_DIR in bytes, 0 = off."""
+    excel = cfg.get("excel", {}) or {}
+    if not excel.get("cache", True):
+        return 0
+    return max(0, int(float(excel.get("cache_mb", 64)) * 1024 * 1024))
+
+
+def file_digest(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class WorkbookCache:
+    """Day index and SalesMatrix of parsed exports, one compressed .npz per file content and
+    header_map. Hits refresh the file mtime; the least recently used entries are deleted once
+    the directory grows over `limit` bytes."""
+
+    def __init__(self, root: Path, limit: int):
+        self.root = Path(root)
+        self.limit = limit
+
+    @staticmethod
+    def key(digest: str, header_key: str) -> str:
+        raw = f"{WORKBOOK_CACHE_FORMAT}\0{digest}\0{header_key}".encode("utf-8")
+        return hashlib.sha256(raw).hexdigest()[:32]
+
+    def _entry(self, key: str) -> Path:
+        return self.root / f"{key}.npz"
+
+    def load(self, key: str, path: Path, header_key: str, digest: str) -> Optional[SalesWorkbook]:
+        entry = self._entry(key)
+        try:
+            with np.load(entry, allow_pickle=False) as z:
+                sheet = str(z["sheet"])
+                day_rows = {(m, d): pos for m, d, pos in z["day_rows"].tolist()}
+                pairs = z["month_days"].tolist()
+                values = z["values"]
+                columns = json.loads(str(z["columns"]))
+                totals = z["totals"]
+                ignored = z["ignored"]
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            log.warning("Poškozená cache %s (%s), mažu ji", entry.name, e)
+            entry.unlink(missing_ok=True)
+            return None
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+        month_days: Dict[int, List[int]] = {}
+        for m, d in pairs:
+            month_days.setdefault(m, []).append(d)
+        has_totals = len(totals) == len(values)  # stored empty when the export has no totals
+        matrix = SalesMatrix(header_key=header_key, index={k: i for i, k in enumerate(day_rows)},
+                             values=values, columns=columns, totals=totals if has_totals else None,
+                             ignored=ignored if has_totals else None)
+        return SalesWorkbook(path=Path(path), sheet=sheet, df=None, day_rows=day_rows,
+                             month_days=month_days, matrix=matrix, digest=digest, stamp=_file_stamp(path))
+
+    def store(self, key: str, wb: SalesWorkbook) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / f"{key}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                np.savez_compressed(
+                    f,
+                    sheet=np.array(wb.sheet),
+                    day_rows=np.array([(m, d, pos) for (m, d), pos in wb.day_rows.items()], dtype=np.int64).reshape(-1, 3),
+                    month_days=np.array([(m, d) for m, days in wb.month_days.items() for d in days], dtype=np.int64).reshape(-1, 2),
+                    values=wb.matrix.values,
+                    columns=np.array(json.dumps(wb.matrix.columns, ensure_ascii=False)),
+                    totals=wb.matrix.totals if wb.matrix.totals is not None else np.zeros((0, len(AMOUNT_PARTS))),
+                    ignored=wb.matrix.ignored if wb.matrix.ignored is not None else np.zeros((0, len(AMOUNT_PARTS))),
+                )
+            os.replace(tmp, self._entry(key))
+        except OSError as e:
+            log.warning("Nelze uložit cache sešitu %s: %s", wb.path.name, e)
+            tmp.unlink(missing_ok=True)
+            return
+        self.evict()
+
+    def evict(self) -> None:
+        entries = []
+        for p in self.root.glob("*.npz"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+        total = sum(size for _, size, _ in entries)
+        for _, size, p in sorted(entries):
+            if total <= self.limit:
+                break
+            p.unlink(missing_ok=True)
+            total -= size
+
+
 class ExcelAdapter:
     def __init__(self, cfg: dict):
         self.cfg = cfg
         self.header_map = cfg.get("header_map", {})
-        write_log(f"DEBUG: ExcelAdapter initialized with header_map keys: {list(self.header_map.keys())}")
-
-    def _pick_sheet(self, xl: pd.ExcelFile) -> str:
+        self._header_key = json.dumps(_thaw(self.header_map.get("sections", {})), sort_keys=True, ensure_ascii=False)
+        # column names -> plan; repeated exports with the same layout skip matching
+        self._plans: Dict[Tuple[str, ...], ColumnPlan] = {}
+        limit = workbook_cache_limit(cfg)
+        self._cache = WorkbookCache(CACHE_DIR, limit) if limit else None
+        log.debug("ExcelAdapter initialized with header_map keys: %s", list(self.header_map.keys()))
+
+    def _pick_sheet(self, sheet_names: List[str]) -> str:
         # choose sheet containing 'přehled' and 'tržeb'
-        for s in xl.sheet_names:
+        for s in sheet_names:
             low = s.lower()
             if "přehled" in low or "prehled" in low:
                 if "trž" in low or "trz" in low or "trzeb" in low or "tržeb" in low:
                     return s
-        return xl.sheet_names[0]
-
-    def _match_cols(self, columns: List[str], pattern: str) -> Optional[str]:
-        rx = re.compile(pattern)
-        for c in columns:
+        return sheet_names[0]
+
+    @timed("excel.open")
+    def open(self, xlsx_path: Path) -> SalesWorkbook:
+        """Parse the workbook once; pass the result to read_day/available_days instead of a path.
+
+        With the workbook cache on, an export seen before (same content and header_map) comes
+        back without parsing: day index and amounts only, df is None.
+        """
+        digest = None
+        if self._cache is not None:
+            digest = file_digest(xlsx_path)
+            wb = self._cache.load(WorkbookCache.key(digest, self._header_key), xlsx_path, self._header_key, digest)
+            if wb is not None:
+                log.debug("Workbook cache hit for %s", xlsx_path)
+                return wb
+        reader = excel_reader(self.cfg)
+        if reader == "pandas":
+            xl = pd.ExcelFile(xlsx_path)
+            sheet = self._pick_sheet(xl.sheet_names)
+            df = xl.parse(sheet)
+            df.columns = [str(c).strip() for c in df.columns]
+        else:
+            sheet, columns, rows = _ROW_READERS[reader](xlsx_path, self._pick_sheet, self._needed_columns)
+            df = pd.DataFrame.from_records(rows, columns=columns)
+        log.debug("Parsed %s (sheet '%s', %d rows, %s)", xlsx_path, sheet, len(df), reader)
+        return SalesWorkbook(path=Path(xlsx_path), sheet=sheet, df=df, digest=digest, stamp=_file_stamp(xlsx_path))
+
+    def _needed_columns(self, names: List[str]) -> List[int]:
+        """Positions of the date column (first), of the columns some header_map pattern
+        matches and of the "Celkem"/ignored columns the sum checks read (total_columns())
+        – all the non-pandas readers keep of a row."""
+        keep = {0}
+        for sec in self.header_map.get("sections", {}).values():
+            for pat in sec.values():
+                if isinstance(pat, str):
+                    pos = self._match_cols(names, pat)
+                    if pos is not None:
+                        keep.add(pos)
+        for pos, ignored in self.total_columns(names).values():
+            keep.add(pos)
+            keep.update(ignored)
+        return sorted(keep)
+
+    def _workbook(self, source: Union[Path, SalesWorkbook]) -> SalesWorkbook:
+        # accept either an already parsed workbook or a path (parsed on the spot)
+        if isinstance(source, SalesWorkbook):
+            return source
+        return self.open(source)
+
+    def _match_cols(self, columns: List[str], pattern: str) -> Optional[int]:
+        rx = _compile(pattern)
+        for i, c in enumerate(columns):
             if rx.fullmatch(str(c)):
-                return c
+                return i
         return None
 
-    def _section_values(self, df: pd.DataFrame, section_key: str) -> Dict[str, str]:
-        sec = self.header_map.get("sections", {}).get(section_key, {})
-        write_log(f"DEBUG: Looking for {section_key} section: {sec}")
+    @timed("excel.columns")
+    def column_plan(self, columns) -> ColumnPlan:
+        """Resolve every header_map pattern to a column position once per header signature."""
+        cols = tuple(str(c) for c in columns)
+        plan = self._plans.get(cols)
+        if plan is not None:
+            return plan
+        sections: Dict[str, Dict[str, int]] = {}
+        for section_key, sec in self.header_map.get("sections", {}).items():
+            out = {}
+            for k, pat in sec.items():
+                if not isinstance(pat, str):
+                    continue
+                pos = self._match_cols(cols, pat)
+                log.debug("Pattern '%s' -> column '%s'", pat, cols[pos] if pos is not None else None)
+                if pos is not None:
+                    out[k] = pos
+            sections[section_key] = out
+        plan = ColumnPlan(columns=cols, sections=sections)
+        self._plans[cols] = plan
+        return plan
+
+    def total_columns(self, columns) -> Dict[int, Tuple[int, List[int]]]:
+        """Amount part → position of its "Celkem" column and of the ignored invoice/bank transfer
+        columns it includes. Patterns come from the totals_ignore/invoice_ignore sections (defaults
+        when header_map has none); an ignored column belongs to the total with the same label,
+        e.g. "DPH 21% (Faktura)" → "DPH Celkem"."""
+        cols = [str(c) for c in columns]
+        sections = self.header_map.get("sections", {})
+        defaults = DEFAULT_CONFIG["header_map"]["sections"]
+        total_pats = (sections.get("totals_ignore") or defaults["totals_ignore"]).get("any", [])
+        ignore_pats = [_compile(p) for p in (sections.get("invoice_ignore") or defaults["invoice_ignore"]).get("any", [])]
         out = {}
-        for k, pat in sec.items():
-            if not isinstance(pat, str):
+        for pi, pat in enumerate(total_pats[:len(AMOUNT_PARTS)]):
+            pos = self._match_cols(cols, pat)
+            if pos is None:
                 continue
-            col = self._match_cols(list(df.columns), pat)
-            write_log(f"DEBUG: Pattern '{pat}' -> column '{col}'")
-            if col:
-                out[k] = col
-        write_log(f"DEBUG: Section {section_key} columns: {out}")
+            label = cols[pos].replace("Celkem", "").strip() + " "
+            out[pi] = (pos, [i for i, c in enumerate(cols)
+                             if c.startswith(label) and any(rx.search(c) for rx in ignore_pats)])
         return out
 
-    def read_day(self, xlsx_path: Path, target_day: date) -> Dict[str, Dict[str, float]]:
-        xl = pd.ExcelFile(xlsx_path)
-        sheet = self._pick_sheet(xl)
-        df = xl.parse(sheet)
-        df.columns = [str(c).strip() for c in df.columns]
-        if df.empty:
+    def extract(self, source: Union[Path, SalesWorkbook]) -> SalesMatrix:
+        """Normalize the money columns header_map needs for all days at once."""
+        wb = self._workbook(source)
+        if wb.matrix is not None and wb.matrix.header_key == self._header_key:
+            return wb.matrix
+        if wb.df is None:
+            # restored from the cache under another header_map – parse the file again
+            return self.extract(self.open(wb.path))
+        matrix = self._extract(wb)
+        if self._cache is not None and wb.digest is not None and not wb.empty:
+            self._cache.store(WorkbookCache.key(wb.digest, self._header_key), wb)
+        return matrix
+
+    @timed("excel.extract")
+    def _extract(self, wb: SalesWorkbook) -> SalesMatrix:
+        df = wb.df
+        plan = self.column_plan(df.columns)
+        index = {key: i for i, key in enumerate(wb.day_rows)}
+        sub = df.iloc[list(wb.day_rows.values())]
+        values = np.zeros((len(index), len(METHOD_KEYS), len(RATE_KEYS), len(AMOUNT_PARTS)))
+        normalized: Dict[int, np.ndarray] = {}
+        for mi, method_key in enumerate(METHOD_KEYS):
+            cols = plan.sections.get(method_key, {})
+            for ri, rate_key in enumerate(RATE_KEYS):
+                for pi, part in enumerate(AMOUNT_PARTS):
+                    pos = cols.get(f"{part}_{rate_key}")
+                    if pos is None:
+                        continue
+                    if pos not in normalized:
+                        normalized[pos] = norm_numbers(sub.iloc[:, pos])
+                    values[:, mi, ri, pi] = normalized[pos]
+                # no gross column → base + vat
+                if cols.get(f"gross_{rate_key}") is None:
+                    values[:, mi, ri, 2] = values[:, mi, ri, 0] + values[:, mi, ri, 1]
+        totals = ignored = None
+        total_cols = self.total_columns(plan.columns)
+        if total_cols:
+            totals = np.full((len(index), len(AMOUNT_PARTS)), np.nan)
+            ignored = np.zeros((len(index), len(AMOUNT_PARTS)))
+            for pi, (pos, extra) in total_cols.items():
+                totals[:, pi] = norm_numbers(sub.iloc[:, pos])
+                for e in extra:
+                    ignored[:, pi] += norm_numbers(sub.iloc[:, e])
+            totals, ignored = round_money(totals), round_money(ignored)
+        wb.matrix = SalesMatrix(header_key=self._header_key, index=index, values=round_money(values),
+                                columns={k: plan.names(k) for k in plan.sections}, totals=totals, ignored=ignored)
+        log.debug("Extracted %d days × %d methods from %s", len(index), len(METHOD_KEYS), wb.path.name)
+        return wb.matrix
+
+    @timed("excel.read_day")
+    def read_day(self, source: Union[Path, SalesWorkbook], target_day: date) -> Dict[str, Dict[str, float]]:
+        wb = self._workbook(source)
+        if wb.empty:
             raise ValueError("Prázdný list v Excelu.")
-
-        # date column is first column
-        day_col = df.columns[0]
-        day_str = df[day_col].astype(str).str.strip()
-        candidates = [
-            f"{target_day.day}.{target_day.month}.",          # 3.6.
-            f"{target_day.day:02d}.{target_day.month:02d}.",  # 03.06.
-            f"{target_day.day}.{target_day.month}"            # 3.6 (bez tečky)
-        ]
-        mask = day_str.isin(candidates)
-        if not mask.any():
+        methods = self.extract(wb).amounts(target_day)
+        if methods is None:
             raise ValueError(f"Den {target_day.isoformat()} v Excelu nenalezen.")
-        row = df.loc[mask].iloc[0]
-
-        # build values
-        methods = {"cash": {}, "card": {}, "voucher": {}, "cashless": {}}
-        for method_key in ["cash", "card", "voucher", "cashless"]:
-            cols = self._section_values(df, method_key)
-            for rate_key in ["high", "low", "none"]:
-                base = norm_number(row.get(cols.get(f"base_{rate_key}", ""))) if cols.get(f"base_{rate_key}") else 0.0
-                vat  = norm_number(row.get(cols.get(f"vat_{rate_key}", ""))) if cols.get(f"vat_{rate_key}") else 0.0
-                gross= norm_number(row.get(cols.get(f"gross_{rate_key}", ""))) if cols.get(f"gross_{rate_key}") else round(base+vat, 2)
-                methods[method_key][f"base_{rate_key}"] = round(base, 2)
-                methods[method_key][f"vat_{rate_key}"]  = round(vat, 2)
-                methods[method_key][f"gross_{rate_key}"] = round(gross, 2)
         return methods
 
-    def detect_month_year_from_excel(self, xlsx_path: Path) -> Optional[Tuple[int, int]]:
+    def detect_month_year_from_excel(self, source: Union[Path, SalesWorkbook]) -> Optional[Tuple[int, int]]:
         """Detect month and year from dates in the first column of Excel file."""
         try:
-            xl = pd.ExcelFile(xlsx_path)
-            sheet = self._pick_sheet(xl)
-            df = xl.parse(sheet)
-            if df.empty:
+            wb = self._workbook(source)
+            xlsx_path = wb.path
+            if wb.empty:
                 return None
-            day_col = df.columns[0]
-            
-            # Look for dates in format d.m. or dd.mm.
-            months_years = set()
-            for v in df[day_col].dropna().astype(str).str.strip():
-                m = re.match(r"(\d{1,2})\.(\d{1,2})\.?", v)
-                if not m:
-                    continue
-                mth = int(m.group(2))
-                # Try to detect year - could be current year or from filename
-                current_year = datetime.now().year
-                months_years.add((mth, current_year))
+            # Dates in format d.m. or dd.mm. are indexed once when the workbook is opened
+            current_year = datetime.now().year
+            months_years = set((mth, current_year) for mth in wb.month_days)
             
             if not months_years:
                 return None
@@ -881,23 +1305,57 @@ class ExcelAdapter:
         except Exception:
             return None
 
-    def available_days(self, xlsx_path: Path, month: int, year: int) -> List[int]:
-        xl = pd.ExcelFile(xlsx_path)
-        sheet = self._pick_sheet(xl)
-        df = xl.parse(sheet)
-        if df.empty:
+    def available_days(self, source: Union[Path, SalesWorkbook], month: int, year: int) -> List[int]:
+        return list(self._workbook(source).month_days.get(month, []))
+
+    def validate(self, source: Union[Path, SalesWorkbook], days: List[date],
+                 tolerance: Optional[float] = None) -> List[SumIssue]:
+        """Sum checks of SalesMatrix.sum_issues() for `days`; tolerance defaults to
+        global_rules.rounding_tolerance."""
+        wb = self._workbook(source)
+        if wb.empty:
             return []
-        day_col = df.columns[0]
-        days = []
-        for v in df[day_col].dropna().astype(str).str.strip():
-            m = re.match(r"(\d{1,2})\.(\d{1,2})\.?", v)
-            if not m:
+        return self.extract(wb).sum_issues(days, rounding_tolerance(self.cfg) if tolerance is None else tolerance)
+
+    def inspect(self, source: Union[Path, SalesWorkbook]) -> "WorkbookInspection":
+        """Everything shown after a file drop from a single parse: month/year (content, then
+        filename), days of that month, matched columns and gross total per day. Errors opening
+        the file propagate; pass `.workbook` on to generate_days(). Sum checks run unless
+        validation.sums is "off"."""
+        wb = self._workbook(source)
+        my = self.detect_month_year_from_excel(wb) or parse_month_year_from_filename(wb.path)
+        if my is None or wb.empty:
+            return WorkbookInspection(workbook=wb, month_year=my)
+        month, year = my
+        matrix = self.extract(wb)
+        days = self.available_days(wb, month, year)
+        totals = {}
+        for d in days:
+            try:
+                gross = matrix.day_gross(date(year, month, d))
+            except ValueError:  # 30.2. etc.
                 continue
-            d = int(m.group(1))
-            mth = int(m.group(2))
-            if mth == month:
-                days.append(d)
-        return sorted(set(days))
+            if gross is not None:
+                totals[d] = gross
+        issues = self.validate(wb, [date(year, month, d) for d in totals]) if sum_check(self.cfg) != "off" else []
+        return WorkbookInspection(workbook=wb, month_year=my, days=days, columns=matrix.columns, day_totals=totals,
+                                  sum_issues=issues)
+
+
+@dataclass
+class WorkbookInspection:
+    """Result of ExcelAdapter.inspect()."""
+    workbook: SalesWorkbook
+    month_year: Optional[Tuple[int, int]]
+    days: List[int] = field(default_factory=list)
+    columns: Dict[str, Dict[str, str]] = field(default_factory=dict)
+    # day of month -> gross sales over all methods
+    day_totals: Dict[int, float] = field(default_factory=dict)
+    sum_issues: List[SumIssue] = field(default_factory=list)
+
+    def unmatched_methods(self) -> List[str]:
+        """Payment methods none of whose header_map columns were found."""
+        return [m for m in METHOD_KEYS if not self.columns.get(m)]
 
 # --------------------------------------------------------------------------------------
 # XML builders (Pohoda)
@@ -914,6 +1372,7 @@ NS = {
     "lst": "http://www.stormware.cz/schema/version_2/list.xsd",
 }
 # lxml handles namespaces via nsmap on elements; no global registration needed.
+XML_ENCODING = DEFAULT_CONFIG["global_rules"]["encoding"]
 
 
 def E(tag: str, text: Optional[str] = None, ns: str = "", attrib: Optional[Dict[str, str]] = None, nsmap: Optional[Dict[str,str]] = None) -> ET.Element:
@@ -953,39 +1412,23 @@ def add_sum_home_currency(parent: ET.Element, amounts: Dict[str, float], ns: str
     parent.append(home)
 
 
-def build_invoice(method: str, amounts: Dict[str, float], day: date, outlet_cfg: dict) -> ET.Element:
-    cfg = load_config()
-    # Declare explicit namespace prefix on <inv:invoice>
-    inv = E("invoice", ns="inv", attrib={"version": "2.0"}, nsmap={"inv": NS["inv"]})
-
-    # Header with namespace declarations; order mirrors golden XML
-    hdr = E("invoiceHeader", ns="inv", nsmap={"rsp": NS["rsp"], "rdc": NS["rdc"], "typ": NS["typ"], "ftr": NS["ftr"], "lst": NS["lst"]})
-    hdr.append(E("invoiceType", "receivable", ns="inv"))
-
-    # number - use {YY}OP template for year-aware numbering (Pohoda assigns sequence)
-    yy = str(day.year)[-2:]
-    nr_template = cfg.get("number_series", {}).get("invoice_prefix", "{YY}OP")
-    nr = nr_template.replace("{YY}", yy)
-    num = E("number", ns="inv"); num.append(E("ids", nr, "typ")); hdr.append(num)
-
-    # dates
-    dt_txt = day.strftime("%Y-%m-%d")
-    for nm in ("date", "dateTax", "dateAccounting", "dateDue"):
-        hdr.append(E(nm, dt_txt, "inv"))
-
-    # header accounting (can differ from item accounts)
-    hdr_acc_id = outlet_cfg.get("accounts", {}).get("inv_header") or outlet_cfg["accounts"]["inv"]["high"]
-    acc = E("accounting", ns="inv"); acc.append(E("ids", hdr_acc_id, "typ")); hdr.append(acc)
+def static_fragment(cfg: Mapping, outlet_cfg: Mapping, name: str, build) -> List[ET.Element]:
+    """Copy of the elements `build()` returns – subtrees that depend only on config and outlet.
 
-    # VAT class
-    clv = E("classificationVAT", ns="inv"); clv.append(E("ids", "UDA5", "typ")); hdr.append(clv)
+    They are built once per config snapshot (cfg.memo, so a changed config.json rebuilds them)
+    and deep-copied into each document; deepcopy is much cheaper than building through E().
+    """
+    memo = getattr(cfg, "memo", None)
+    if memo is None:
+        return build()
+    key = ("fragment", id(outlet_cfg), name)
+    hit = memo.get(key)
+    if hit is None or hit[0] is not outlet_cfg:
+        hit = memo[key] = (outlet_cfg, build())
+    return copy.deepcopy(hit[1])
 
-    # header text (overrideable by config)
-    header_texts = outlet_cfg.get("invoice_header_texts", {})
-    header_text = header_texts.get(method) or outlet_cfg.get("invoice_header_text") or f"Tržby {method}"
-    hdr.append(E("text", header_text, "inv"))
 
-    # myIdentity (company)
+def _identity_address(cfg: Mapping, ns: str) -> ET.Element:
     ident = cfg.get("company_identity", {
         "company": "Lipno Gastro Services s.r.o.",
         "city": "Praha",
@@ -995,7 +1438,7 @@ def build_invoice(method: str, amounts: Dict[str, float], day: date, outlet_cfg:
         "ico": "17126240",
         "dic": "CZ17126240"
     })
-    my = E("myIdentity", ns="inv")
+    my = E("myIdentity", ns=ns)
     addr = E("address", ns="typ")
     addr.append(E("company", ident.get("company", ""), "typ"))
     addr.append(E("city", ident.get("city", ""), "typ"))
@@ -1005,37 +1448,108 @@ def build_invoice(method: str, amounts: Dict[str, float], day: date, outlet_cfg:
     addr.append(E("ico", ident.get("ico", ""), "typ"))
     addr.append(E("dic", ident.get("dic", ""), "typ"))
     my.append(addr)
-    hdr.append(my)
-
-    # payment type
-    pay = E("paymentType", ns="inv")
-    if method == "card":
-        pay.append(E("ids", cfg["payment_ids"]["card"]["ids"], "typ"))
-        pay.append(E("paymentType", cfg["payment_ids"]["card"]["paymentType"], "typ"))
-        liq = next_business_day(day)
-    elif method == "cashless":
-        pay.append(E("ids", cfg["payment_ids"]["cashless"]["ids"], "typ"))
-        liq = day
-    else:  # voucher
-        pay.append(E("ids", cfg["payment_ids"]["voucher"]["ids"], "typ"))
-        pay.append(E("paymentType", cfg["payment_ids"]["voucher"]["paymentType"], "typ"))
-        liq = day
-    hdr.append(pay)
-
-    # bank account and symConst
-    bank = cfg.get("bank", {"ids": "RBCZ", "accountNo": "7415855002", "bankCode": "5500", "symConst": "0308"})
-    acc_el = E("account", ns="inv")
-    acc_el.append(E("ids", bank.get("ids", "RBCZ"), "typ"))
-    acc_el.append(E("accountNo", bank.get("accountNo", ""), "typ"))
-    acc_el.append(E("bankCode", bank.get("bankCode", ""), "typ"))
-    hdr.append(acc_el)
-    hdr.append(E("symConst", bank.get("symConst", "0308"), "inv"))
-
-    # centre, activity, liquidation, locks
-    centre = E("centre", ns="inv"); centre.append(E("ids", outlet_cfg["centre"], "typ")); hdr.append(centre)
-    activity_id = outlet_cfg.get("activity_id")
-    if activity_id:
-        act = E("activity", ns="inv"); act.append(E("ids", activity_id, "typ")); hdr.append(act)
+    return my
+
+
+# position of homeCurrency among the children of invoiceItem / voucherItem
+ITEM_HOME_CURRENCY_POS = 6
+
+
+def _static_item(tag: str, ns: str, item_text: str, rate_key: str, account: str) -> ET.Element:
+    """invoiceItem / voucherItem without its homeCurrency (inserted at ITEM_HOME_CURRENCY_POS)."""
+    it = E(tag, ns=ns)
+    it.append(E("text", item_text, ns))
+    it.append(E("quantity", "1.0", ns))
+    it.append(E("coefficient", "1.0", ns))
+    it.append(E("payVAT", "false", ns))
+    it.append(E("rateVAT", rate_key, ns))
+    it.append(E("discountPercentage", "0.0", ns))
+    acc = E("accounting", ns=ns); acc.append(E("ids", account, "typ")); it.append(acc)
+    if rate_key == "none":
+        cl = E("classificationVAT", ns=ns); cl.append(E("ids", "UN", "typ")); cl.append(E("classificationVATType", "nonSubsume", "typ")); it.append(cl)
+    it.append(E("PDP", "false", ns))
+    return it
+
+
+def _item_home_currency(ns: str, base: float, vat: float) -> ET.Element:
+    cur = E("homeCurrency", ns=ns)
+    cur.append(E("unitPrice", _fmt(base), "typ"))
+    cur.append(E("price", _fmt(base), "typ"))
+    cur.append(E("priceVAT", _fmt(vat), "typ"))
+    cur.append(E("priceSum", _fmt(base+vat), "typ"))
+    return cur
+
+
+@timed("xml.build")
+def build_invoice(method: str, amounts: Dict[str, float], day: date, outlet_cfg: dict, cfg: Optional[Mapping] = None) -> ET.Element:
+    cfg = cfg if cfg is not None else config_snapshot()
+    # Declare explicit namespace prefix on <inv:invoice>
+    inv = E("invoice", ns="inv", attrib={"version": "2.0"}, nsmap={"inv": NS["inv"]})
+
+    # Header with namespace declarations; order mirrors golden XML
+    hdr = E("invoiceHeader", ns="inv", nsmap={"rsp": NS["rsp"], "rdc": NS["rdc"], "typ": NS["typ"], "ftr": NS["ftr"], "lst": NS["lst"]})
+    hdr.append(E("invoiceType", "receivable", ns="inv"))
+
+    # number - use {YY}OP template for year-aware numbering (Pohoda assigns sequence)
+    yy = str(day.year)[-2:]
+    nr_template = cfg.get("number_series", {}).get("invoice_prefix", "{YY}OP")
+    nr = nr_template.replace("{YY}", yy)
+    num = E("number", ns="inv"); num.append(E("ids", nr, "typ")); hdr.append(num)
+
+    # dates
+    dt_txt = day.strftime("%Y-%m-%d")
+    for nm in ("date", "dateTax", "dateAccounting", "dateDue"):
+        hdr.append(E(nm, dt_txt, "inv"))
+
+    def header_static() -> List[ET.Element]:
+        els = []
+        # header accounting (can differ from item accounts)
+        hdr_acc_id = outlet_cfg.get("accounts", {}).get("inv_header") or outlet_cfg["accounts"]["inv"]["high"]
+        acc = E("accounting", ns="inv"); acc.append(E("ids", hdr_acc_id, "typ")); els.append(acc)
+
+        # VAT class
+        clv = E("classificationVAT", ns="inv"); clv.append(E("ids", "UDA5", "typ")); els.append(clv)
+
+        # header text (overrideable by config)
+        header_texts = outlet_cfg.get("invoice_header_texts", {})
+        header_text = header_texts.get(method) or outlet_cfg.get("invoice_header_text") or f"Tržby {method}"
+        els.append(E("text", header_text, "inv"))
+
+        # myIdentity (company)
+        els.append(_identity_address(cfg, "inv"))
+
+        # payment type
+        pay = E("paymentType", ns="inv")
+        if method == "card":
+            pay.append(E("ids", cfg["payment_ids"]["card"]["ids"], "typ"))
+            pay.append(E("paymentType", cfg["payment_ids"]["card"]["paymentType"], "typ"))
+        elif method == "cashless":
+            pay.append(E("ids", cfg["payment_ids"]["cashless"]["ids"], "typ"))
+        else:  # voucher
+            pay.append(E("ids", cfg["payment_ids"]["voucher"]["ids"], "typ"))
+            pay.append(E("paymentType", cfg["payment_ids"]["voucher"]["paymentType"], "typ"))
+        els.append(pay)
+
+        # bank account and symConst
+        bank = cfg.get("bank", {"ids": "RBCZ", "accountNo": "7415855002", "bankCode": "5500", "symConst": "0308"})
+        acc_el = E("account", ns="inv")
+        acc_el.append(E("ids", bank.get("ids", "RBCZ"), "typ"))
+        acc_el.append(E("accountNo", bank.get("accountNo", ""), "typ"))
+        acc_el.append(E("bankCode", bank.get("bankCode", ""), "typ"))
+        els.append(acc_el)
+        els.append(E("symConst", bank.get("symConst", "0308"), "inv"))
+
+        # centre, activity
+        centre = E("centre", ns="inv"); centre.append(E("ids", outlet_cfg["centre"], "typ")); els.append(centre)
+        activity_id = outlet_cfg.get("activity_id")
+        if activity_id:
+            act = E("activity", ns="inv"); act.append(E("ids", activity_id, "typ")); els.append(act)
+        return els
+
+    hdr.extend(static_fragment(cfg, outlet_cfg, f"inv.header.{method}", header_static))
+
+    # liquidation, locks
+    liq = next_business_day(day) if method == "card" else day
     liq_el = E("liquidation", ns="inv"); liq_el.append(E("date", liq.strftime("%Y-%m-%d"), "typ")); hdr.append(liq_el)
     hdr.append(E("lock2", "false", "inv")); hdr.append(E("markRecord", "false", "inv"))
     inv.append(hdr)
@@ -1043,34 +1557,15 @@ def build_invoice(method: str, amounts: Dict[str, float], day: date, outlet_cfg:
     # Detail (use _fmt for numbers to match samples)
     det = E("invoiceDetail", ns="inv", nsmap={"rsp": NS["rsp"], "rdc": NS["rdc"], "typ": NS["typ"], "ftr": NS["ftr"], "lst": NS["lst"]})
 
-    def add_item(rate_key: str):
-        base = amounts.get(f"base_{rate_key}", 0.0)
-        vat  = amounts.get(f"vat_{rate_key}", 0.0)
-        # Always include all VAT sections (high, low, none) even if amounts are zero
-        it = E("invoiceItem", ns="inv")
-        # Use specific item texts for detail items
-        item_text = outlet_cfg["item_texts"][method][rate_key]
-        it.append(E("text", item_text, "inv"))
-        it.append(E("quantity", "1.0", "inv"))
-        it.append(E("coefficient", "1.0", "inv"))
-        it.append(E("payVAT", "false", "inv"))
-        it.append(E("rateVAT", rate_key, "inv"))
-        it.append(E("discountPercentage", "0.0", "inv"))
-        cur = E("homeCurrency", ns="inv")
-        cur.append(E("unitPrice", _fmt(base), "typ"))
-        cur.append(E("price", _fmt(base), "typ"))
-        cur.append(E("priceVAT", _fmt(vat), "typ"))
-        cur.append(E("priceSum", _fmt(base+vat), "typ"))
-        it.append(cur)
-        # Each item uses its specific account based on rate
-        acc = E("accounting", ns="inv"); acc.append(E("ids", outlet_cfg["accounts"]["inv"][rate_key], "typ")); it.append(acc)
-        if rate_key == "none":
-            cl = E("classificationVAT", ns="inv"); cl.append(E("ids", "UN", "typ")); cl.append(E("classificationVATType", "nonSubsume", "typ")); it.append(cl)
-        it.append(E("PDP", "false", "inv"))
-        det.append(it)
+    def items_static() -> List[ET.Element]:
+        # specific item texts; each item uses its specific account based on rate
+        return [_static_item("invoiceItem", "inv", outlet_cfg["item_texts"][method][rk], rk, outlet_cfg["accounts"]["inv"][rk])
+                for rk in RATE_KEYS]
 
-    for rk in ("high","low","none"):
-        add_item(rk)
+    # Always include all VAT sections (high, low, none) even if amounts are zero
+    for rk, it in zip(RATE_KEYS, static_fragment(cfg, outlet_cfg, f"inv.items.{method}", items_static)):
+        it.insert(ITEM_HOME_CURRENCY_POS, _item_home_currency("inv", amounts.get(f"base_{rk}", 0.0), amounts.get(f"vat_{rk}", 0.0)))
+        det.append(it)
     inv.append(det)
 
     # Summary
@@ -1085,7 +1580,8 @@ def build_invoice(method: str, amounts: Dict[str, float], day: date, outlet_cfg:
     return inv
 
 
-def build_voucher(amounts: Dict[str, float], day: date, outlet_cfg: dict, outlet_name: Optional[str] = None) -> ET.Element:
+@timed("xml.build")
+def build_voucher(amounts: Dict[str, float], day: date, outlet_cfg: dict, outlet_name: Optional[str] = None, cfg: Optional[Mapping] = None) -> ET.Element:
     # vch ns declared on <vch:voucher> element (to match samples)
     v = E("voucher", ns="vch", attrib={"version": "2.0"}, nsmap={"vch": NS["vch"]})
 
@@ -1095,7 +1591,7 @@ def build_voucher(amounts: Dict[str, float], day: date, outlet_cfg: dict, outlet
     cash = E("cashAccount", ns="vch"); cash.append(E("ids", outlet_cfg["cashAccount_ids"], "typ")); hdr.append(cash)
 
     # Number generation – use {YY} template for year-aware numbering (Pohoda assigns sequence)
-    cfg = load_config()
+    cfg = cfg if cfg is not None else config_snapshot()
     yy = str(day.year)[-2:]
     prefix_map = cfg.get("number_series", {}).get("voucher_prefix_by_outlet", {})
     nr_template = prefix_map.get(outlet_name or "", "X{YY}P")
@@ -1110,81 +1606,48 @@ def build_voucher(amounts: Dict[str, float], day: date, outlet_cfg: dict, outlet
     for nm in ("date", "datePayment", "dateTax"):
         hdr.append(E(nm, dt_txt, "vch"))
 
-    vch_hdr_acc = outlet_cfg["accounts"].get("vch_header") or outlet_cfg["accounts"]["vch"]["high"]
-    acc = E("accounting", ns="vch"); acc.append(E("ids", vch_hdr_acc, "typ")); hdr.append(acc)
-    clv = E("classificationVAT", ns="vch"); clv.append(E("ids", "UD", "typ")); hdr.append(clv)
-
-    # header text – keep minimal; can be overridden by config
-    header_text = outlet_cfg.get("voucher_header_text", "Tržby hotově")
-    hdr.append(E("text", header_text, "vch"))
-
-    # myIdentity (company) – to replicate sample structure
-    ident = cfg.get("company_identity", {
-        "company": "Lipno Gastro Services s.r.o.",
-        "city": "Praha",
-        "street": "Radlická",
-        "number": "751/113e",
-        "zip": "158 00",
-        "ico": "17126240",
-        "dic": "CZ17126240"
-    })
-    my = E("myIdentity", ns="vch")
-    addr = E("address", ns="typ")
-    addr.append(E("company", ident.get("company",""), "typ"))
-    addr.append(E("city", ident.get("city",""), "typ"))
-    addr.append(E("street", ident.get("street",""), "typ"))
-    addr.append(E("number", ident.get("number",""), "typ"))
-    addr.append(E("zip", ident.get("zip",""), "typ"))
-    addr.append(E("ico", ident.get("ico",""), "typ"))
-    addr.append(E("dic", ident.get("dic",""), "typ"))
-    my.append(addr)
-    hdr.append(my)
-
-    centre = E("centre", ns="vch"); centre.append(E("ids", outlet_cfg["centre"], "typ")); hdr.append(centre)
-    activity_id = outlet_cfg.get("activity_id")
-    if activity_id:
-        act = E("activity", ns="vch"); act.append(E("ids", activity_id, "typ")); hdr.append(act)
-    hdr.append(E("lock2", "false", "vch")); hdr.append(E("markRecord", "false", "vch"))
-
-    # labels (e.g., Zelená)
-    labels = cfg.get("labels", ["Zelená"]) or []
-    if labels:
-        labs = E("labels", ns="vch")
-        for lb in labels:
-            lab = E("label", ns="typ"); lab.append(E("ids", lb, "typ")); labs.append(lab)
-        hdr.append(labs)
-
+    def header_static() -> List[ET.Element]:
+        els = []
+        vch_hdr_acc = outlet_cfg["accounts"].get("vch_header") or outlet_cfg["accounts"]["vch"]["high"]
+        acc = E("accounting", ns="vch"); acc.append(E("ids", vch_hdr_acc, "typ")); els.append(acc)
+        clv = E("classificationVAT", ns="vch"); clv.append(E("ids", "UD", "typ")); els.append(clv)
+
+        # header text – keep minimal; can be overridden by config
+        header_text = outlet_cfg.get("voucher_header_text", "Tržby hotově")
+        els.append(E("text", header_text, "vch"))
+
+        # myIdentity (company) – to replicate sample structure
+        els.append(_identity_address(cfg, "vch"))
+
+        centre = E("centre", ns="vch"); centre.append(E("ids", outlet_cfg["centre"], "typ")); els.append(centre)
+        activity_id = outlet_cfg.get("activity_id")
+        if activity_id:
+            act = E("activity", ns="vch"); act.append(E("ids", activity_id, "typ")); els.append(act)
+        els.append(E("lock2", "false", "vch")); els.append(E("markRecord", "false", "vch"))
+
+        # labels (e.g., Zelená)
+        labels = cfg.get("labels", ["Zelená"]) or []
+        if labels:
+            labs = E("labels", ns="vch")
+            for lb in labels:
+                lab = E("label", ns="typ"); lab.append(E("ids", lb, "typ")); labs.append(lab)
+            els.append(labs)
+        return els
+
+    hdr.extend(static_fragment(cfg, outlet_cfg, "vch.header", header_static))
     v.append(hdr)
 
     # detail
     det = E("voucherDetail", ns="vch", nsmap={"rsp": NS["rsp"], "rdc": NS["rdc"], "typ": NS["typ"], "ftr": NS["ftr"], "lst": NS["lst"]})
 
-    def add_item(rate_key: str):
-        base = amounts.get(f"base_{rate_key}", 0.0)
-        vat  = amounts.get(f"vat_{rate_key}", 0.0)
-        # Always include all VAT sections (high, low, none) even if amounts are zero
-        it = E("voucherItem", ns="vch")
-        item_text = outlet_cfg["item_texts"]["cash"][rate_key]
-        it.append(E("text", item_text, "vch"))
-        it.append(E("quantity", "1.0", "vch"))
-        it.append(E("coefficient", "1.0", "vch"))
-        it.append(E("payVAT", "false", "vch"))
-        it.append(E("rateVAT", rate_key, "vch"))
-        it.append(E("discountPercentage", "0.0", "vch"))
-        cur = E("homeCurrency", ns="vch")
-        cur.append(E("unitPrice", _fmt(base), "typ"))
-        cur.append(E("price", _fmt(base), "typ"))
-        cur.append(E("priceVAT", _fmt(vat), "typ"))
-        cur.append(E("priceSum", _fmt(base+vat), "typ"))
-        it.append(cur)
-        acc = E("accounting", ns="vch"); acc.append(E("ids", outlet_cfg["accounts"]["vch"][rate_key], "typ")); it.append(acc)
-        if rate_key == "none":
-            cl = E("classificationVAT", ns="vch"); cl.append(E("ids", "UN", "typ")); cl.append(E("classificationVATType", "nonSubsume", "typ")); it.append(cl)
-        it.append(E("PDP", "false", "vch"))
-        det.append(it)
+    def items_static() -> List[ET.Element]:
+        return [_static_item("voucherItem", "vch", outlet_cfg["item_texts"]["cash"][rk], rk, outlet_cfg["accounts"]["vch"][rk])
+                for rk in RATE_KEYS]
 
-    for rk in ("high","low","none"):
-        add_item(rk)
+    # Always include all VAT sections (high, low, none) even if amounts are zero
+    for rk, it in zip(RATE_KEYS, static_fragment(cfg, outlet_cfg, "vch.items", items_static)):
+        it.insert(ITEM_HOME_CURRENCY_POS, _item_home_currency("vch", amounts.get(f"base_{rk}", 0.0), amounts.get(f"vat_{rk}", 0.0)))
+        det.append(it)
     v.append(det)
 
     # summary
@@ -1198,36 +1661,6 @@ def build_voucher(amounts: Dict[str, float], day: date, outlet_cfg: dict, outlet
     return v
 
 
-def build_datapack(day: date, methods: Dict[str, Dict[str, float]], outlet_cfg: dict) -> ET.ElementTree:
-    root = E("dataPack", ns="dat", attrib={
-        "version": "2.0",
-        "id": "Usr01",
-        "ico": "",
-        "key": str(uuid.uuid4()),
-        "programVersion": "MoloXML 1.0",
-        "application": "Molo XML Generator",
-        "note": f"Uživatelský export, Datum = {day.strftime('%d.%m.%Y')}"
-    })
-
-    def add_item(child: ET.Element):
-        dpi = E("dataPackItem", ns="dat", attrib={"version": "2.0", "id": "Usr01 (001)"})
-        dpi.append(child)
-        root.append(dpi)
-
-    # cash → voucher
-    if any(methods.get("cash", {}).get(k, 0.0) for k in ["base_high","vat_high","base_low","vat_low","base_none","vat_none"]):
-        add_item(build_voucher(methods.get("cash", {}), day, outlet_cfg))
-
-    # card → invoice
-    if any(methods.get("card", {}).get(k, 0.0) for k in ["base_high","vat_high","base_low","vat_low","base_none","vat_none"]):
-        add_item(build_invoice("card", methods.get("card", {}), day, outlet_cfg))
-
-    # voucher → invoice
-    if any(methods.get("voucher", {}).get(k, 0.0) for k in ["base_high","vat_high","base_low","vat_low","base_none","vat_none"]):
-        add_item(build_invoice("voucher", methods.get("voucher", {}), day, outlet_cfg))
-
-    return ET.ElementTree(root)
-
 # --------------------------------------------------------------------------------------
 # Naming & datapack wrapper
 # --------------------------------------------------------------------------------------
@@ -1239,7 +1672,7 @@ def _compute_datapack_key(day: date, outlet: str, doc_type: str, cfg: dict) -> s
         return fixed
     # 2) mapping by outlet in config
     by_outlet = cfg.get("datapack_key_by_outlet", {}) or {}
-    if isinstance(by_outlet, dict):
+    if isinstance(by_outlet, Mapping):
         val = by_outlet.get(outlet)
         if isinstance(val, str) and val:
             return val
@@ -1249,24 +1682,28 @@ def _compute_datapack_key(day: date, outlet: str, doc_type: str, cfg: dict) -> s
     return str(uuid.uuid5(uuid.NAMESPACE_URL, name))
 
 
-def datapack_with(child: ET.Element, day: date, outlet: str, doc_type: str, note_override: Optional[str] = None) -> ET.ElementTree:
-    cfg = load_config()
-    # Build note text
-    if note_override is not None:
-        note = note_override
+def datapack_note(day: date, outlet: str, cfg: Mapping, whole_month: bool = False) -> str:
+    """Default dataPack note: "Datum = {měsíc_cz}, Datum = DD/MM/YYYY, Text = {outlet_note}".
+
+    For a whole-month pack the date part is "Datum = {měsíc_cz} YYYY".
+    """
+    by_outlet = cfg.get("note_text_by_outlet", {}) or {}
+    outlet_text = by_outlet.get(outlet)
+    if not outlet_text and outlet == "B&G":
+        outlet_text = "bar"
+    note_extra = outlet_text or cfg.get("note_text", None)
+    month_cz = CZ_MONTHS.get(day.month, "")
+    if whole_month:
+        note = f"Uživatelský export, Datum = {month_cz} {day.year}"
     else:
-        # Default note for vouchers: "Datum = {měsíc_cz}, Datum = DD/MM/YYYY, Text = {outlet_note}"
-        by_outlet = cfg.get("note_text_by_outlet", {}) or {}
-        outlet_text = by_outlet.get(outlet)
-        if not outlet_text and outlet == "B&G":
-            outlet_text = "bar"
-        note_extra = outlet_text or cfg.get("note_text", None)
-        month_cz = CZ_MONTHS.get(day.month, "")
         note = f"Uživatelský export, Datum = {month_cz}, Datum = {day.strftime('%d/%m/%Y')}"
-        if note_extra:
-            note += f", Text = {note_extra}"
+    if note_extra:
+        note += f", Text = {note_extra}"
+    return note
+
 
-    root = E("dataPack", ns="dat", attrib={
+def datapack_attrib(day: date, outlet: str, doc_type: str, note: str, cfg: Mapping) -> Dict[str, str]:
+    return {
         "version": "2.0",
         "id": "Usr01",
         "ico": cfg.get("ico", ""),
@@ -1274,25 +1711,1127 @@ def datapack_with(child: ET.Element, day: date, outlet: str, doc_type: str, note
         "programVersion": cfg.get("programVersion", "MoloXML 1.0"),
         "application": cfg.get("application", "Molo XML Generator"),
         "note": note
-    }, nsmap={"dat": NS["dat"]})
-    dpi = E("dataPackItem", ns="dat", attrib={"version": "2.0", "id": "Usr01 (001)"})
-    dpi.append(child)
-    root.append(dpi)
+    }
+
+
+def datapack_item_id(n: int) -> str:
+    """Id of the n-th (1-based) dataPackItem: "Usr01 (001)", "Usr01 (002)", ..."""
+    return f"Usr01 ({n:03d})"
+
+
+def datapack_item_attrib(n: int, note: Optional[str] = None) -> Dict[str, str]:
+    attrib = {"version": "2.0", "id": datapack_item_id(n)}
+    if note is not None:
+        attrib["note"] = note
+    return attrib
+
+
+def document_note(note: Optional[str], day: date, outlet: str, cfg: Mapping) -> str:
+    """Note a document carries as a dataPack of its own (output mode "document"): the invoice note
+    from build_day_items(), or the default day note. Combined packs put it on its dataPackItem,
+    so Pohoda imports the same text in every output mode."""
+    return note if note is not None else datapack_note(day, outlet, cfg)
+
+
+@timed("xml.datapack")
+def datapack_with_items(children: List[ET.Element], day: date, outlet: str, doc_type: str,
+                        note_override: Optional[str] = None, cfg: Optional[Mapping] = None,
+                        item_notes: Optional[List[str]] = None) -> ET.ElementTree:
+    """One dataPack holding every document of `children` as its own, numbered dataPackItem
+    (with the matching `item_notes` entry as its note)."""
+    cfg = cfg if cfg is not None else config_snapshot()
+    note = note_override if note_override is not None else datapack_note(day, outlet, cfg)
+    root = E("dataPack", ns="dat", attrib=datapack_attrib(day, outlet, doc_type, note, cfg), nsmap={"dat": NS["dat"]})
+    for n, child in enumerate(children, 1):
+        dpi = E("dataPackItem", ns="dat", attrib=datapack_item_attrib(n, item_notes[n - 1] if item_notes else None))
+        dpi.append(child)
+        root.append(dpi)
     return ET.ElementTree(root)
 
-def format_filename(doc_type: str, day: date, outlet: str, method_label: Optional[str] = None) -> str:
-    cfg = load_config()
+
+def datapack_with(child: ET.Element, day: date, outlet: str, doc_type: str, note_override: Optional[str] = None, cfg: Optional[Mapping] = None) -> ET.ElementTree:
+    return datapack_with_items([child], day, outlet, doc_type, note_override=note_override, cfg=cfg)
+
+
+class DataPackWriter:
+    """Streams one dataPack to `path` (lxml xmlfile): the root is written on open and every document
+    as its own numbered dataPackItem as soon as it is added, so memory does not grow with the pack.
+
+    Documents must be standalone elements (not attached to another tree); the output is then
+    byte-identical to serialize_tree(datapack_with_items(...)).
+    """
+
+    def __init__(self, path: Path, attrib: Dict[str, str], part: Optional[Path] = None, fsync: bool = False,
+                 stream: Optional[io.BufferedIOBase] = None):
+        self.path = path
+        # the file actually written: `path`, or a temp file OutputBatch.commit() renames to `path`;
+        # with `stream` (zip output) nothing is written to disk here and the caller owns the stream
+        self.part = part or path
+        self.count = 0
+        self.aborted = False
+        self._owns_file = stream is None
+        self._stack = ExitStack()
+        self._f = stream if stream is not None else self._stack.enter_context(open(self.part, "wb"))
+        if fsync and self._owns_file:
+            # runs after the closing tags are written, before the file is closed
+            self._stack.callback(self._sync)
+        try:
+            # upper case to match the declaration ElementTree.write() produces
+            self._xf = self._stack.enter_context(ET.xmlfile(self._f, encoding=XML_ENCODING.upper()))
+            self._xf.write_declaration()
+            self._stack.enter_context(self._xf.element(f"{{{NS['dat']}}}dataPack", attrib, nsmap={"dat": NS["dat"]}))
+        except BaseException:
+            self.abort()
+            raise
+
+    @timed("write")
+    def add(self, child: ET.Element, note: Optional[str] = None):
+        self.count += 1
+        with self._xf.element(f"{{{NS['dat']}}}dataPackItem", datapack_item_attrib(self.count, note)):
+            self._xf.write(child)
+
+    @timed("write")
+    def add_raw(self, data: bytes, note: Optional[str] = None):
+        """Add a document already serialized in the pack's encoding, without XML declaration."""
+        self.count += 1
+        with self._xf.element(f"{{{NS['dat']}}}dataPackItem", datapack_item_attrib(self.count, note)):
+            self._xf.flush()
+            self._f.write(data)
+
+    def close(self):
+        """Write the closing tags and close the file."""
+        self._stack.close()
+
+    def abort(self):
+        """Drop the partial file (cancelled or failed run)."""
+        self.aborted = True
+        try:
+            self._stack.close()
+        except Exception:
+            pass  # the file goes away anyway
+        if self._owns_file:
+            self.part.unlink(missing_ok=True)
+
+    def _sync(self):
+        if not self.aborted:
+            self._f.flush()
+            os.fsync(self._f.fileno())
+
+
+# file name templates of combined dataPacks, used when config "naming" has no such key
+COMBINED_NAMING = {
+    "den": "Pohoda {DD.M.YYYY} - {OUTLET} - {ID}.xml",
+    "mesic": "Pohoda {M.YYYY} - {OUTLET} - {ID}.xml",
+    "zip": "Pohoda {M.YYYY} - {OUTLET} - {ID}.zip",
+}
+
+
+ID_FORMATS = ("yymmdd_hhmmss", "key")
+EXISTING_POLICIES = ("overwrite", "skip")
+
+
+def document_id(doc_type: str, day: date, outlet: str, method_label: Optional[str], cfg: Mapping) -> str:
+    """{ID} per config "naming": {"id_format": ...}: "yymmdd_hhmmss" = time of the run (default),
+    "key" = 12 hex digits of a UUIDv5 over the dataPack key inputs (day/outlet/doc_type), so a rerun
+    produces the same file name."""
+    fmt = cfg["naming"].get("id_format", "yymmdd_hhmmss")
+    if fmt == "key":
+        seed = cfg.get("datapack_key_seed", "MoloXML-datapack-key")
+        name = f"{seed}|{day.isoformat()}|{outlet}|{doc_type}|{method_label or ''}"
+        return uuid.uuid5(uuid.NAMESPACE_URL, name).hex[:12]
+    if fmt not in ID_FORMATS:
+        log.warning("Neznámý naming.id_format '%s', používám 'yymmdd_hhmmss'", fmt)
+    return yymmdd_hhmmss()
+
+
+def existing_policy(cfg: Mapping) -> str:
+    """Config "naming": {"existing": "overwrite"|"skip"} – an output file of the same name is
+    replaced (default) or left untouched."""
+    policy = (cfg.get("naming", {}) or {}).get("existing", "overwrite")
+    if policy not in EXISTING_POLICIES:
+        log.warning("Neznámý naming.existing '%s', používám 'overwrite'", policy)
+        return "overwrite"
+    return policy
+
+
+def format_filename(doc_type: str, day: date, outlet: str, method_label: Optional[str] = None, cfg: Optional[Mapping] = None) -> str:
+    cfg = cfg if cfg is not None else config_snapshot()
     naming = cfg["naming"]
-    ident = yymmdd_hhmmss()
+    ident = document_id(doc_type, day, outlet, method_label, cfg)
     date_label = f"{day.day}.{day.month}.{day.year}"
     if doc_type == "pokladna":
         patt = naming["pokladna"]
         return patt.replace("{DD.M.YYYY}", date_label).replace("{OUTLET}", outlet).replace("{ID}", ident)
+    elif doc_type in COMBINED_NAMING:
+        patt = naming.get(doc_type) or COMBINED_NAMING[doc_type]
+        return patt.replace("{DD.M.YYYY}", date_label).replace("{M.YYYY}", f"{day.month}.{day.year}").replace("{OUTLET}", outlet).replace("{ID}", ident)
     else:
         patt = naming["ostatni"]
         return patt.replace("{DD.M.YYYY}", date_label).replace("{METHOD_LABEL}", method_label or "").replace("{OUTLET}", outlet).replace("{ID}", ident)
 
 
+# --------------------------------------------------------------------------------------
+# Template renderer: build_invoice / build_voucher as pre-serialized byte templates
+# --------------------------------------------------------------------------------------
+# Per outlet × method × year only the dates and amounts change. A template is the builder's
+# output for that combination with those texts replaced by slot markers, serialized once and
+# split at the markers; rendering is then a bytes join. tests/test_template_renderer.py proves
+# the output is byte-identical to the lxml path.
+
+RENDERERS = ("lxml", "template")
+_SLOT = "LGSXMLSLOT{}Z"
+_SLOT_RX = re.compile(rb"LGSXMLSLOT(\d+)Z")
+SUMMARY_FIELDS = ("priceNone", "priceLow", "priceLowVAT", "priceLowSum", "priceHigh", "priceHighVAT", "priceHighSum")
+ITEM_PRICE_FIELDS = ("unitPrice", "price", "priceVAT", "priceSum")
+
+
+def renderer(cfg: Mapping) -> str:
+    """Config "output": {"renderer": "lxml"|"template"}."""
+    name = (cfg.get("output", {}) or {}).get("renderer", "lxml")
+    if name not in RENDERERS:
+        log.warning("Neznámý output.renderer '%s', používám 'lxml'", name)
+        return "lxml"
+    return name
+
+
+@dataclass(frozen=True)
+class DocTemplate:
+    """Serialized document split at its variable texts: parts[0] + value(slots[0]) + parts[1] + ..."""
+    parts: Tuple[bytes, ...]
+    slots: Tuple[str, ...]
+
+    def render(self, values: Mapping[str, str]) -> bytes:
+        out = [self.parts[0]]
+        for slot, part in zip(self.slots, self.parts[1:]):
+            out.append(values[slot].encode("ascii"))
+            out.append(part)
+        return b"".join(out)
+
+
+def _slot_paths(method: str) -> List[Tuple[str, str]]:
+    """(path from the document element, slot name) of every text that depends on day or amounts."""
+    if method == "cash":
+        p, kind, dates = "vch", "voucher", ("date", "datePayment", "dateTax")
+    else:
+        p, kind, dates = "inv", "invoice", ("date", "dateTax", "dateAccounting", "dateDue")
+    paths = [(f"{p}:{kind}Header/{p}:{nm}", "date") for nm in dates]
+    if method != "cash":
+        paths.append(("inv:invoiceHeader/inv:liquidation/typ:date", "liquidation"))
+    for i, rk in enumerate(RATE_KEYS, 1):
+        for nm in ITEM_PRICE_FIELDS:
+            paths.append((f"{p}:{kind}Detail/{p}:{kind}Item[{i}]/{p}:homeCurrency/typ:{nm}", f"{rk}.{nm}"))
+    paths.extend((f"{p}:{kind}Summary/{p}:homeCurrency/typ:{nm}", nm) for nm in SUMMARY_FIELDS)
+    return paths
+
+
+def _slot_values(method: str, amounts: Dict[str, float], day: date) -> Dict[str, str]:
+    """Slot texts exactly as build_invoice / build_voucher format them."""
+    get = amounts.get
+    liq = next_business_day(day) if method == "card" else day
+    vals = {"date": day.strftime("%Y-%m-%d"), "liquidation": liq.strftime("%Y-%m-%d")}
+    for rk in RATE_KEYS:
+        base, vat = get(f"base_{rk}", 0.0), get(f"vat_{rk}", 0.0)
+        vals[f"{rk}.unitPrice"] = vals[f"{rk}.price"] = _fmt(base)
+        vals[f"{rk}.priceVAT"] = _fmt(vat)
+        vals[f"{rk}.priceSum"] = _fmt(base + vat)
+    vals["priceNone"] = _fmt(get("base_none", 0.0))
+    for rk, nm in (("low", "priceLow"), ("high", "priceHigh")):
+        base, vat = get(f"base_{rk}", 0.0), get(f"vat_{rk}", 0.0)
+        vals[nm], vals[f"{nm}VAT"], vals[f"{nm}Sum"] = _fmt(base), _fmt(vat), _fmt(base + vat)
+    return vals
+
+
+def compile_template(method: str, outlet: str, year: int, cfg: Mapping) -> DocTemplate:
+    outlet_cfg = cfg["outlets"][outlet]
+    day = date(year, 1, 1)
+    if method == "cash":
+        doc = build_voucher({}, day, outlet_cfg, outlet_name=outlet, cfg=cfg)
+    else:
+        doc = build_invoice(method, {}, day, outlet_cfg, cfg=cfg)
+    names = []
+    for n, (path, slot) in enumerate(_slot_paths(method)):
+        doc.find(path, namespaces=NS).text = _SLOT.format(n)
+        names.append(slot)
+    pieces = _SLOT_RX.split(ET.tostring(doc, encoding=XML_ENCODING, xml_declaration=False))
+    slots = tuple(names[int(n)] for n in pieces[1::2])
+    if len(slots) != len(names):
+        raise ValueError(f"Šablona {outlet}/{method}: nečekaný počet slotů ({len(slots)} místo {len(names)})")
+    return DocTemplate(tuple(pieces[0::2]), slots)
+
+
+def doc_template(method: str, outlet: str, year: int, cfg: Mapping) -> DocTemplate:
+    """Compiled template, cached on the config snapshot (a changed config.json means new templates)."""
+    memo = getattr(cfg, "memo", None)
+    if memo is None:
+        return compile_template(method, outlet, year, cfg)
+    key = ("template", outlet, method, year)
+    tpl = memo.get(key)
+    if tpl is None:
+        tpl = memo[key] = compile_template(method, outlet, year, cfg)
+    return tpl
+
+
+@timed("xml.build")
+def render_document(method: str, amounts: Dict[str, float], day: date, outlet: str, cfg: Mapping) -> bytes:
+    """Template equivalent of ET.tostring(build_invoice / build_voucher(...), encoding=XML_ENCODING)."""
+    return doc_template(method, outlet, day.year, cfg).render(_slot_values(method, amounts, day))
+
+
+def _attr_bytes(value: str) -> bytes:
+    """Attribute value escaped and encoded the way lxml serializes it in XML_ENCODING."""
+    for ch, ref in (("&", "&amp;"), ("<", "&lt;"), (">", "&gt;"), ('"', "&quot;"),
+                    ("\n", "&#10;"), ("\r", "&#13;"), ("\t", "&#9;")):
+        value = value.replace(ch, ref)
+    return value.encode(XML_ENCODING, "xmlcharrefreplace")
+
+
+@timed("xml.datapack")
+def datapack_bytes(docs: List[bytes], day: date, outlet: str, doc_type: str,
+                   note_override: Optional[str] = None, cfg: Optional[Mapping] = None,
+                   item_notes: Optional[List[str]] = None) -> bytes:
+    """serialize_tree(datapack_with_items(...)) for documents that are already serialized."""
+    cfg = cfg if cfg is not None else config_snapshot()
+    note = note_override if note_override is not None else datapack_note(day, outlet, cfg)
+    root = E("dataPack", ns="dat", attrib=datapack_attrib(day, outlet, doc_type, note, cfg), nsmap={"dat": NS["dat"]})
+    root.text = _SLOT.format(0)
+    head, tail = serialize_tree(ET.ElementTree(root)).split(root.text.encode("ascii"))
+    items = []
+    for n, data in enumerate(docs, 1):
+        note_attr = b' note="%s"' % _attr_bytes(item_notes[n - 1]) if item_notes else b""
+        items.append(b'<dat:dataPackItem version="2.0" id="%s"%s>%s</dat:dataPackItem>'
+                     % (datapack_item_id(n).encode("ascii"), note_attr, data))
+    return head + b"".join(items) + tail
+
+
+# --------------------------------------------------------------------------------------
+# Generation (one day → up to four XML files, or one combined dataPack per day/month)
+# --------------------------------------------------------------------------------------
+
+# method -> (naming template, datapack doc_type, METHOD_LABEL); order = order of files per day
+DOC_SPECS = (
+    ("cash", "pokladna", "voucher", None),
+    ("card", "ostatni", "invoice_card", "kartou"),
+    ("voucher", "ostatni", "invoice_voucher", "voucherem"),
+    ("cashless", "ostatni", "invoice_cashless", "cashless"),
+)
+AMOUNT_KEYS = ("base_high", "vat_high", "base_low", "vat_low", "base_none", "vat_none")
+
+
+@dataclass
+class DayResult:
+    day: date
+    files: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+    # output mode "month" or output.zip: the month dataPack / archive the day's documents went into
+    pack: Optional[str] = None
+    # output.incremental: nothing rebuilt, `files` are the ones generated earlier
+    up_to_date: bool = False
+    # naming.existing = "skip": files of `files` that already existed and were left untouched
+    kept: List[str] = field(default_factory=list)
+    # files (or the pack) built for the day that OutputBatch.commit() could not put in place
+    failed: List[str] = field(default_factory=list)
+
+    @property
+    def written(self) -> int:
+        """Number of files this run actually wrote for the day."""
+        return 0 if self.up_to_date else len(self.files) - len(self.kept)
+
+
+OUTPUT_MODES = ("document", "day", "month")
+
+
+def output_mode(cfg: Mapping) -> str:
+    """Config "output": {"datapack": "document"|"day"|"month"} – one dataPack per document (default),
+    per day, or per outlet-month."""
+    mode = (cfg.get("output", {}) or {}).get("datapack", "document")
+    if mode not in OUTPUT_MODES:
+        log.warning("Neznámý output.datapack '%s', používám 'document'", mode)
+        return "document"
+    return mode
+
+
+def invoice_note(day: date, outlet: str, cfg: Mapping) -> str:
+    # Invoice note format: "Zd.plnění = DD/MM/YYYY, Text = {outlet_note}"
+    outlet_note = cfg.get("note_text_by_outlet", {}).get(outlet, "")
+    inv_note = f"Uživatelský export, Zd.plnění = {day.strftime('%d/%m/%Y')}"
+    if outlet_note:
+        inv_note += f", Text = {outlet_note}"
+    return inv_note
+
+
+def day_specs(methods: Dict[str, Dict[str, float]]) -> Iterator[Tuple[tuple, Dict[str, float]]]:
+    """(DOC_SPECS entry, amounts) of every payment method with non-zero amounts, in file order."""
+    for spec in DOC_SPECS:
+        amounts = methods.get(spec[0], {})
+        if any(amounts.get(k, 0.0) for k in AMOUNT_KEYS):
+            yield spec, amounts
+
+
+def build_day_items(day: date, methods: Dict[str, Dict[str, float]], outlet: str, cfg: Mapping) -> List[Tuple[tuple, ET.Element, Optional[str]]]:
+    """(DOC_SPECS entry, document element, note override) for every payment method of the day with non-zero amounts."""
+    outlet_cfg = cfg["outlets"][outlet]
+    inv_note = invoice_note(day, outlet, cfg)
+    items = []
+    for spec, amounts in day_specs(methods):
+        if spec[0] == "cash":
+            items.append((spec, build_voucher(amounts, day, outlet_cfg, outlet_name=outlet, cfg=cfg), None))
+        else:
+            items.append((spec, build_invoice(spec[0], amounts, day, outlet_cfg, cfg=cfg), inv_note))
+    return items
+
+
+def day_document_bytes(day: date, methods: Dict[str, Dict[str, float]], outlet: str, cfg: Mapping) -> List[Tuple[tuple, bytes, Optional[str]]]:
+    """Like build_day_items(), with each document serialized in XML_ENCODING by the configured renderer."""
+    if renderer(cfg) == "template":
+        inv_note = invoice_note(day, outlet, cfg)
+        return [(spec, render_document(spec[0], amounts, day, outlet, cfg), None if spec[0] == "cash" else inv_note)
+                for spec, amounts in day_specs(methods)]
+    return [(spec, ET.tostring(child, encoding=XML_ENCODING, xml_declaration=False), note)
+            for spec, child, note in build_day_items(day, methods, outlet, cfg)]
+
+
+def build_day_documents(day: date, methods: Dict[str, Dict[str, float]], outlet: str, cfg: Mapping) -> List[Tuple[str, ET.ElementTree]]:
+    """(filename, dataPack tree) of the day: one per document, or a single combined one in output mode "day"."""
+    items = build_day_items(day, methods, outlet, cfg)
+    if output_mode(cfg) == "day":
+        if not items:
+            return []
+        tree = datapack_with_items([child for _, child, _ in items], day, outlet, doc_type="day", cfg=cfg,
+                                   item_notes=[document_note(note, day, outlet, cfg) for _, _, note in items])
+        return [(format_filename("den", day, outlet, cfg=cfg), tree)]
+    docs = []
+    for (method, naming, doc_type, method_label), child, note in items:
+        tree = datapack_with(child, day, outlet, doc_type=doc_type, note_override=note, cfg=cfg)
+        docs.append((format_filename(naming, day, outlet, method_label=method_label, cfg=cfg), tree))
+    return docs
+
+
+def render_day_files(day: date, methods: Dict[str, Dict[str, float]], outlet: str, cfg: Mapping) -> List[Tuple[str, bytes]]:
+    """(filename, file bytes) of the day – the serialized build_day_documents() without building trees."""
+    items = day_document_bytes(day, methods, outlet, cfg)
+    if output_mode(cfg) == "day":
+        if not items:
+            return []
+        return [(format_filename("den", day, outlet, cfg=cfg),
+                 datapack_bytes([data for _, data, _ in items], day, outlet, doc_type="day", cfg=cfg,
+                                item_notes=[document_note(note, day, outlet, cfg) for _, _, note in items]))]
+    return [(format_filename(naming, day, outlet, method_label=method_label, cfg=cfg),
+             datapack_bytes([data], day, outlet, doc_type=doc_type, note_override=note, cfg=cfg))
+            for (method, naming, doc_type, method_label), data, note in items]
+
+
+def open_month_writer(out_dir: Path, month_day: date, outlet: str, cfg: Mapping,
+                      output: Optional["OutputBatch"] = None) -> Union[DataPackWriter, Path]:
+    """Streaming dataPack for all documents of an outlet-month (output mode "month"), or just the
+    path of the existing month file with naming.existing = "skip"."""
+    first = month_day.replace(day=1)
+    path = out_dir / format_filename("mesic", first, outlet, cfg=cfg)
+    if existing_policy(cfg) == "skip" and path.exists():
+        return path
+    note = datapack_note(first, outlet, cfg, whole_month=True)
+    attrib = datapack_attrib(first, outlet, "month", note, cfg)
+    if output is not None:
+        return output.open_pack(path, attrib, outlet, first)
+    return DataPackWriter(path, attrib)
+
+
+@timed("xml.serialize")
+def serialize_tree(tree: ET.ElementTree) -> bytes:
+    buf = io.BytesIO()
+    tree.write(buf, encoding=XML_ENCODING, xml_declaration=True)
+    return buf.getvalue()
+
+
+def _write_file(path: Path, data: bytes, fsync: bool = False):
+    # straight on the descriptor: open/write/close without the extra fstat/ioctl/lseek calls of a
+    # buffered file object
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o666)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+        if fsync:
+            os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _discard(path: Path):
+    """Best-effort removal of a temp file that will not be renamed into place."""
+    try:
+        path.unlink(missing_ok=True)
+    except OSError as e:
+        log.warning("Soubor %s nelze smazat: %s", path.name, e)
+
+
+def _fsync_dir(path: Path):
+    if os.name == "nt":
+        return  # directories cannot be opened for fsync on Windows; NTFS journals the renames
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@timed("write")
+def write_documents(out_dir: Path, docs: List[Tuple[str, bytes]], fsync: bool = False) -> List[str]:
+    files = []
+    for fname, data in docs:
+        _write_file(out_dir / fname, data, fsync)
+        files.append(fname)
+    return files
+
+
+FSYNC_POLICIES = ("none", "files", "all")
+ZIP_MODES = ("off", "file", "memory")
+
+
+def atomic_output(cfg: Mapping) -> bool:
+    """Config "output": {"atomic": true} – files appear under their final names only when the run commits."""
+    return bool((cfg.get("output", {}) or {}).get("atomic", True))
+
+
+def fsync_policy(cfg: Mapping) -> str:
+    """Config "output": {"fsync": "none"|"files"|"all"} – fsync nothing, every file, or every file
+    and the output folder after the renames."""
+    policy = (cfg.get("output", {}) or {}).get("fsync", "none")
+    if policy not in FSYNC_POLICIES:
+        log.warning("Neznámý output.fsync '%s', používám 'none'", policy)
+        return "none"
+    return policy
+
+
+def zip_output(cfg: Mapping) -> str:
+    """Config "output": {"zip": false|true|"memory"} – loose files (default), one .zip per outlet-month
+    streamed to disk, or the same archive built in memory and written in one go."""
+    value = (cfg.get("output", {}) or {}).get("zip", False)
+    if value is True or value == "file":
+        return "file"
+    if value == "memory":
+        return "memory"
+    if value not in (False, None, "off"):
+        log.warning("Neznámý output.zip '%s', zapisuji soubory", value)
+    return "off"
+
+
+class OutputBatch:
+    """Output files of one run (generate_days / run_batch).
+
+    With output.atomic (default) documents are kept in memory, written in groups of about
+    FLUSH_BYTES to `~$<name>.<run>.tmp` files next to their final names (OneDrive does not sync
+    such names, collect_exports() skips them) and renamed into place by commit() at the end of
+    the run, so Pohoda or a sync client never sees a half-written .xml and a crash leaves none.
+    Without it every file is written under its final name at once, as before.
+
+    With output.zip the files become members of one archive per outlet-month (naming "zip"),
+    compressed as they arrive; in "memory" mode the archive is built in a BytesIO and written by
+    commit() with a single write, without temp files.
+    """
+
+    FLUSH_BYTES = 1 << 20
+    # temp files of crashed runs older than this are removed when the next run starts
+    STALE_SECONDS = 24 * 3600
+
+    def __init__(self, out_dir: Path, cfg: Mapping):
+        self.out_dir = Path(out_dir)
+        self.atomic = atomic_output(cfg)
+        policy = fsync_policy(cfg)
+        self.fsync_files = policy != "none"
+        self.fsync_dir = policy == "all"
+        self.token = uuid.uuid4().hex[:8]
+        self.zip = zip_output(cfg)
+        self.cfg = cfg
+        # (outlet, year, month) -> final path, ZipFile, file object or BytesIO under it
+        self._archives: Dict[Tuple[str, int, int], Tuple[Path, zipfile.ZipFile, io.BufferedIOBase]] = {}
+        # naming.existing = "skip": archives that existed before the run, left untouched
+        self._kept_archives: Dict[Tuple[str, int, int], Path] = {}
+        # month dataPacks bound for an archive: writer, its buffer, archive key
+        self._packs: List[Tuple[DataPackWriter, io.BytesIO, Tuple[str, int, int]]] = []
+        self._buffer: List[Tuple[str, bytes]] = []
+        self._buffered = 0
+        # final name -> temp file written but not renamed yet
+        self._parts: Dict[str, Path] = {}
+        # final names whose temp file could not be written (flush()); reported by commit()
+        self._failed: List[str] = []
+        if self.atomic:
+            self._remove_stale()
+
+    def _part(self, fname: str) -> Path:
+        return self.out_dir / f"~${fname}.{self.token}.tmp"
+
+    def archive(self, outlet: str, day: date) -> Path:
+        """Final path of the outlet-month archive (output.zip), created on first use – unless it
+        already exists and naming.existing = "skip" (see archive_kept())."""
+        key = (outlet, day.year, day.month)
+        if key in self._kept_archives:
+            return self._kept_archives[key]
+        entry = self._archives.get(key)
+        if entry is None:
+            path = self.out_dir / format_filename("zip", day.replace(day=1), outlet, cfg=self.cfg)
+            if existing_policy(self.cfg) == "skip" and path.exists():
+                self._kept_archives[key] = path
+                return path
+            if self.zip == "memory":
+                f = io.BytesIO()
+            elif self.atomic:
+                f = open(self._part(path.name), "wb")
+                self._parts[path.name] = self._part(path.name)
+            else:
+                f = open(path, "wb")
+            entry = self._archives[key] = (path, zipfile.ZipFile(f, "w", zipfile.ZIP_DEFLATED), f)
+        return entry[0]
+
+    def archive_kept(self, outlet: str, day: date) -> bool:
+        """True if the outlet-month archive existed before the run and is left as it is
+        (naming.existing = "skip", the same rule as open_month_writer())."""
+        self.archive(outlet, day)
+        return (outlet, day.year, day.month) in self._kept_archives
+
+    @timed("write")
+    def _write_zip(self, docs: List[Tuple[str, bytes]], outlet: str, day: date):
+        self.archive(outlet, day)
+        zf = self._archives[(outlet, day.year, day.month)][1]
+        for fname, data in docs:
+            zf.writestr(fname, data)
+
+    def write(self, docs: List[Tuple[str, bytes]], outlet: Optional[str] = None, day: Optional[date] = None) -> List[str]:
+        if self.zip != "off":
+            if docs:
+                self._write_zip(docs, outlet, day)
+            return [fname for fname, _ in docs]
+        if not self.atomic:
+            return write_documents(self.out_dir, docs, self.fsync_files)
+        for fname, data in docs:
+            self._buffer.append((fname, data))
+            self._buffered += len(data)
+        if self._buffered >= self.FLUSH_BYTES:
+            self.flush()
+        return [fname for fname, _ in docs]
+
+    def fail(self, fname: str):
+        """Report `fname` as not put in place by the next commit() (e.g. a month pack that failed to close)."""
+        self._failed.append(fname)
+
+    @timed("write")
+    def flush(self):
+        """Write the buffered documents to their temp files. A file that cannot be written (disk
+        full, access denied) is left for commit() to report instead of failing the day being added."""
+        for fname, data in self._buffer:
+            part = self._part(fname)
+            try:
+                _write_file(part, data, self.fsync_files)
+            except OSError as e:
+                log.error("Soubor %s nelze zapsat: %s", part.name, e)
+                _discard(part)
+                self._failed.append(fname)
+                continue
+            self._parts[fname] = part
+        self._buffer.clear()
+        self._buffered = 0
+
+    def open_pack(self, path: Path, attrib: Dict[str, str], outlet: str, day: date) -> DataPackWriter:
+        if self.zip != "off":
+            self.archive(outlet, day)
+            buf = io.BytesIO()
+            writer = DataPackWriter(path, attrib, stream=buf)
+            self._packs.append((writer, buf, (outlet, day.year, day.month)))
+            return writer
+        if not self.atomic:
+            return DataPackWriter(path, attrib, fsync=self.fsync_files)
+        part = self._part(path.name)
+        writer = DataPackWriter(path, attrib, part=part, fsync=self.fsync_files)
+        self._parts[path.name] = part
+        return writer
+
+    @timed("write")
+    def commit(self) -> List[str]:
+        """Rename everything written so far into place. Returns the final names that could not
+        be written or renamed (e.g. open in another program); see mark_failed()."""
+        self.flush()
+        failed, self._failed = self._failed, []
+        broken = set()
+        for writer, buf, key in self._packs:
+            if writer.aborted or key in broken:
+                continue
+            try:
+                self._archives[key][1].writestr(writer.path.name, buf.getvalue())
+            except OSError as e:
+                log.error("Měsíční pack %s nelze přidat do archivu: %s", writer.path.name, e)
+                broken.add(key)
+        self._packs.clear()
+        for key, (path, zf, f) in self._archives.items():
+            try:
+                try:
+                    zf.close()
+                    if isinstance(f, io.BytesIO):
+                        if key not in broken:
+                            _write_file(path, f.getvalue(), self.fsync_files)
+                    elif self.fsync_files:
+                        f.flush()
+                        os.fsync(f.fileno())
+                finally:
+                    f.close()
+            except OSError as e:
+                log.error("Soubor %s nelze zapsat: %s", path.name, e)
+                broken.add(key)
+            if key in broken:
+                failed.append(path.name)
+                part = self._parts.pop(path.name, None)
+                if part is not None:
+                    _discard(part)
+        self._archives.clear()
+        for fname, part in self._parts.items():
+            if not part.exists():
+                continue  # aborted month pack, removed by DataPackWriter.abort()
+            try:
+                os.replace(part, self.out_dir / fname)
+            except OSError as e:
+                log.error("Soubor %s nelze přejmenovat na %s: %s", part.name, fname, e)
+                failed.append(fname)
+        self._parts.clear()
+        if self.fsync_dir:
+            _fsync_dir(self.out_dir)
+        return failed
+
+    @staticmethod
+    def mark_failed(results: List[DayResult], failed: List[str]):
+        """Move the files commit() could not put in place out of `files` and into the day's error.
+        A failed month pack or archive takes every day whose documents went into it."""
+        if not failed:
+            return
+        missing = set(failed)
+        for res in results:
+            if res.pack in missing:
+                res.failed = [res.pack]
+                lost = [f for f in res.files if f not in res.kept]
+            else:
+                res.failed = lost = [f for f in res.files if f in missing]
+            if not res.failed:
+                continue
+            res.files = [f for f in res.files if f not in lost]
+            msg = f"soubor nelze uložit: {', '.join(res.failed)}"
+            res.error = f"{res.error}; {msg}" if res.error else msg
+
+    def rollback(self):
+        """Forget buffered documents and delete the temp files (failed run)."""
+        self._buffer.clear()
+        self._buffered = 0
+        self._failed.clear()
+        self._packs.clear()
+        for _, zf, f in self._archives.values():
+            try:
+                zf.close()
+            finally:
+                f.close()
+        self._archives.clear()
+        for part in self._parts.values():
+            part.unlink(missing_ok=True)
+        self._parts.clear()
+
+    def _remove_stale(self):
+        cutoff = time.time() - self.STALE_SECONDS
+        for p in self.out_dir.glob("~$*.tmp"):
+            try:
+                if p.stat().st_mtime < cutoff:
+                    p.unlink()
+            except OSError:
+                pass
+
+
+# config of a pool worker, set once per worker by the executor initializer
+_POOL_CFG: Optional[Mapping] = None
+
+
+def _pool_init(cfg: Mapping):
+    global _POOL_CFG
+    _POOL_CFG = cfg
+
+
+def _build_day_job(day: date, methods: Dict[str, Dict[str, float]], outlet: str, cfg: Optional[Mapping] = None) -> List[Tuple[str, bytes]]:
+    """Pool task: build and serialize one day's documents (picklable in and out).
+
+    In output mode "month" the day's bare documents are returned as (dataPackItem note, document bytes)
+    instead; collect_days() streams them into the month's dataPack.
+    """
+    cfg = cfg if cfg is not None else _POOL_CFG
+    if output_mode(cfg) == "month":
+        return [(document_note(note, day, outlet, cfg), data) for _, data, note in day_document_bytes(day, methods, outlet, cfg)]
+    if renderer(cfg) == "template":
+        return render_day_files(day, methods, outlet, cfg)
+    return [(fname, serialize_tree(tree)) for fname, tree in build_day_documents(day, methods, outlet, cfg)]
+
+
+def _pool_day_job(day: date, methods: Dict[str, Dict[str, float]], outlet: str):
+    """Pool task: (_build_day_job() result, the worker's stage timings or None)."""
+    if not stage_timing_enabled(_POOL_CFG):
+        return _build_day_job(day, methods, outlet), None
+    timer = StageTimer()
+    with timer.active():
+        docs = _build_day_job(day, methods, outlet)
+    return docs, timer.snapshot()
+
+
+def make_executor(cfg: Mapping, n_jobs: int) -> Optional[Executor]:
+    """Pool per config "parallel": {"executor": "process"|"thread"|"none", "workers": 0 (= CPU count),
+    "min_days": 64}. Small runs stay serial – spawning processes costs more than a month of XML."""
+    par = cfg.get("parallel", {}) or {}
+    kind = par.get("executor", "process")
+    if kind not in ("process", "thread") or n_jobs < int(par.get("min_days", 64)):
+        return None
+    workers = min(int(par.get("workers") or os.cpu_count() or 1), n_jobs)
+    if workers <= 1:
+        return None
+    pool_cls = ProcessPoolExecutor if kind == "process" else ThreadPoolExecutor
+    log.debug("Starting %s pool with %d workers for %d days", kind, workers, n_jobs)
+    return pool_cls(max_workers=workers, initializer=_pool_init, initargs=(cfg,))
+
+
+def check_sums(adapter: ExcelAdapter, workbook: SalesWorkbook, days: List[date], outlet: str,
+               cfg: Mapping) -> Dict[date, Exception]:
+    """Sum validation of all `days` before anything is written; discrepancies are logged. With
+    validation.sums = "skip" the failing days map to the error their DayResult reports."""
+    policy = sum_check(cfg)
+    if policy == "off" or not days:
+        return {}
+    try:
+        issues = adapter.validate(workbook, days, rounding_tolerance(cfg))
+    except Exception:
+        return {}  # unreadable sheet – reported per day by submit_days()
+    failed: Dict[date, List[str]] = {}
+    for issue in issues:
+        log.warning("Nesedí součty %s %s: %s", outlet, issue.day.strftime("%d.%m.%Y"), issue.describe())
+        failed.setdefault(issue.day, []).append(issue.describe())
+    if policy != "skip":
+        return {}
+    return {day: ValueError("Nesedí součty: " + "; ".join(texts)) for day, texts in failed.items()}
+
+
+def submit_days(adapter: ExcelAdapter, workbook: SalesWorkbook, days: List[date], outlet: str,
+                pool: Optional[Executor], blocked: Optional[Dict[date, Exception]] = None) -> List[Tuple[date, object]]:
+    """Read the amounts of every day and queue its build on `pool` (None = build later, serially).
+
+    Returns (day, job) pairs for collect_days(); a job is a Future, the day's amounts, or the
+    exception raised while reading the day (or given for it in `blocked`, see check_sums()).
+    """
+    jobs: List[Tuple[date, object]] = []
+    for day in days:
+        if blocked and day in blocked:
+            jobs.append((day, blocked[day]))
+            continue
+        try:
+            methods = adapter.read_day(workbook, day)
+        except Exception as ex:
+            log.exception("Chyba při čtení dne %s", day.isoformat())
+            jobs.append((day, ex))
+            continue
+        jobs.append((day, pool.submit(_pool_day_job, day, methods, outlet) if pool is not None else methods))
+    return jobs
+
+
+def collect_days(jobs: List[Tuple[date, object]], outlet: str, out_dir: Path, cfg: Mapping,
+                 cancel: Optional[threading.Event] = None, output: Optional[OutputBatch] = None) -> Iterator[DayResult]:
+    """Write the files of submitted days in submission order, one DayResult per day.
+
+    In output mode "month" each day's documents are streamed into the month's dataPack as they
+    arrive; the month file(s) are reported on the last DayResult. A cancelled run leaves no month file.
+    Files go through `output`, which the caller commits; without one they are committed here.
+    """
+    own_output = output is None
+    output = output if output is not None else OutputBatch(out_dir, cfg)
+    per_month = output_mode(cfg) == "month"
+    skip_existing = existing_policy(cfg) == "skip"
+    # a Path instead of a writer = month file (or its archive) kept as it is (naming.existing = "skip")
+    writers: Dict[Tuple[int, int], Union[DataPackWriter, Path]] = {}
+    held: Optional[DayResult] = None
+    # cancelled: month packs are dropped; crashed (exception, abandoned generator): own output rolled back
+    cancelled = crashed = False
+    # what was yielded before an own commit, for mark_failed()
+    done: List[DayResult] = []
+    try:
+        for day, job in jobs:
+            if cancel is not None and cancel.is_set():
+                cancelled = True
+                break
+            res = DayResult(day)
+            try:
+                if isinstance(job, Exception):
+                    raise job
+                if isinstance(job, Future):
+                    docs, stages = job.result()
+                    timer = _STAGE_TIMER.get()
+                    if stages and timer is not None:
+                        timer.merge(stages)
+                else:
+                    docs = _build_day_job(day, job, outlet, cfg)
+                if per_month:
+                    if docs and (day.year, day.month) not in writers:
+                        if output.zip != "off" and output.archive_kept(outlet, day):
+                            writers[(day.year, day.month)] = output.archive(outlet, day)
+                        else:
+                            writers[(day.year, day.month)] = open_month_writer(out_dir, day, outlet, cfg, output)
+                    writer = writers.get((day.year, day.month))
+                    if isinstance(writer, DataPackWriter):
+                        for note, data in docs:
+                            writer.add_raw(data, note)
+                    if docs:
+                        res.pack = writer.name if isinstance(writer, Path) else writer.path.name
+                else:
+                    if not skip_existing:
+                        kept = set()
+                    elif output.zip == "off":
+                        kept = {f for f, _ in docs if (out_dir / f).exists()}
+                    else:
+                        # an existing archive is left as it is, with every document of the day
+                        kept = {f for f, _ in docs} if docs and output.archive_kept(outlet, day) else set()
+                    output.write([d for d in docs if d[0] not in kept], outlet, day)
+                    res.files = [f for f, _ in docs]
+                    res.kept = [f for f in res.files if f in kept]
+                if docs and output.zip != "off":
+                    res.pack = output.archive(outlet, day).name
+            except Exception as ex:
+                if not isinstance(job, Exception):
+                    log.exception("Chyba při generování dne %s", day.isoformat())
+                res.error = str(ex)
+            if per_month:
+                if held is not None:
+                    done.append(held)
+                    yield held
+                held = res
+            else:
+                done.append(res)
+                yield res
+    except BaseException:
+        cancelled = crashed = True
+        raise
+    finally:
+        for writer in writers.values():
+            if isinstance(writer, Path):
+                if not cancelled:
+                    held.files.append(writer.name)
+                    held.kept.append(writer.name)
+                continue
+            if cancelled:
+                writer.abort()
+                continue
+            try:
+                writer.close()
+                held.files.append(writer.path.name)
+            except Exception as ex:
+                log.exception("Chyba při uzavírání %s", writer.path.name)
+                # a half-written pack is never renamed into place; every day that went into it fails
+                writer.abort()
+                output.fail(writer.path.name)
+                held.error = str(ex)
+        # after the writers: a month pack's temp file must be closed before rollback() deletes it
+        if own_output and crashed:
+            output.rollback()
+        elif own_output:
+            OutputBatch.mark_failed(done + ([held] if held is not None else []), output.commit())
+    if held is not None:
+        yield held
+
+
+def generate_days(adapter: ExcelAdapter, workbook: SalesWorkbook, days: List[date], outlet: str, out_dir: Path, cfg: Mapping,
+                  executor: Optional[Executor] = None, cancel: Optional[threading.Event] = None) -> Iterator[DayResult]:
+    """Build days (in a pool if configured) and write their files; yields DayResults in the order of `days`.
+
+    A failing day yields a DayResult with `error` set and does not affect the others. Pass a shared
+    `executor` (from make_executor) to reuse one pool across several calls; it is not shut down here.
+    With output.incremental, days unchanged since the last run come back with `up_to_date` set.
+    Sums are checked before the first file is written (check_sums()). Files are put in place when
+    the generator finishes; those that cannot be are moved into the error of their (already
+    yielded) DayResult, with `failed` set.
+    """
+    manifest = OutputManifest(out_dir) if incremental_output(cfg) else None
+    fresh = manifest.fresh_days(adapter, workbook, days, outlet, cfg) if manifest is not None else {}
+    todo = [d for d in days if d not in fresh]
+    blocked = check_sums(adapter, workbook, todo, outlet, cfg)
+    output = OutputBatch(out_dir, cfg)
+    pool = executor if executor is not None else make_executor(cfg, len(todo) - len(blocked))
+    done: List[DayResult] = []
+    results: Optional[Iterator[DayResult]] = None
+    try:
+        results = collect_days(submit_days(adapter, workbook, todo, outlet, pool, blocked), outlet, out_dir, cfg, cancel, output)
+        if manifest is not None:
+            results = manifest.track(adapter, workbook, days, outlet, cfg, fresh, results)
+        for res in results:
+            done.append(res)
+            yield res
+    except BaseException:
+        # also KeyboardInterrupt and GeneratorExit (caller stopped iterating): nothing is put in place;
+        # close the days first so an open month pack releases its temp file
+        if results is not None:
+            results.close()
+        output.rollback()
+        raise
+    else:
+        # also after a cancel: the days reported so far are complete. Files that cannot be
+        # renamed turn into errors of the DayResults already yielded (the caller still holds them).
+        OutputBatch.mark_failed(done, output.commit())
+        if manifest is not None:
+            manifest.commit()
+    finally:
+        if pool is not None and executor is None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+# --------------------------------------------------------------------------------------
+# Incremental output: manifest of what was generated into an output folder
+# --------------------------------------------------------------------------------------
+
+MANIFEST_NAME = "lgsxml_manifest.json"
+
+# config keys that do not change the documents (amounts are hashed on their own)
+_CONFIG_DIGEST_SKIP = ("config_version", "output_dir", "log_level", "header_map", "parallel", "excel", "diagnostics",
+                       "validation")
+
+
+def incremental_output(cfg: Mapping) -> bool:
+    """Config "output": {"incremental": true} – rebuild only days whose amounts or config changed."""
+    return bool((cfg.get("output", {}) or {}).get("incremental", False))
+
+
+def config_digest(cfg: Mapping, outlet: str) -> str:
+    """Hash of the config that goes into the outlet's documents (other outlets, paths, pool and
+    renderer settings left out)."""
+    memo = getattr(cfg, "memo", None)
+    key = ("config_digest", outlet)
+    if memo is not None and key in memo:
+        return memo[key]
+    data = {k: v for k, v in _thaw(cfg).items() if k not in _CONFIG_DIGEST_SKIP}
+    data["outlets"] = data.get("outlets", {}).get(outlet)
+    data["output"] = [output_mode(cfg), zip_output(cfg)]
+    digest = hashlib.sha256(json.dumps(data, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+    if memo is not None:
+        memo[key] = digest
+    return digest
+
+
+def amounts_digest(amounts: Dict[str, float]) -> str:
+    return hashlib.sha256(json.dumps(amounts, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+class OutputManifest:
+    """`MANIFEST_NAME` in the output folder: outlet × day × payment method → hash of the extracted
+    amounts, config_digest() and the file holding the document (None = zero amounts, no document)."""
+
+    VERSION = 1
+
+    def __init__(self, out_dir: Path):
+        self.path = Path(out_dir) / MANIFEST_NAME
+        self.entries: Dict[str, dict] = {}
+        self.dirty = False
+        # days rebuilt by track() whose files are not in place yet: (outlet, day, amounts, result, cfg)
+        self._pending: List[Tuple[str, date, Dict[str, Dict[str, float]], DayResult, Mapping]] = []
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            if data.get("version") == self.VERSION:
+                self.entries = data.get("entries", {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            log.warning("Manifest %s nelze přečíst (%s), generuji vše znovu", self.path, e)
+
+    @staticmethod
+    def _key(outlet: str, day: date, method: str) -> str:
+        return f"{outlet}|{day.isoformat()}|{method}"
+
+    def current_files(self, outlet: str, day: date, methods: Dict[str, Dict[str, float]], config_hash: str) -> Optional[List[str]]:
+        """Files of a day generated from the same amounts and config that all still exist, else None."""
+        files: List[str] = []
+        for method in METHOD_KEYS:
+            e = self.entries.get(self._key(outlet, day, method))
+            if not e or e.get("config") != config_hash or e.get("amounts") != amounts_digest(methods.get(method, {})):
+                return None
+            if e.get("file") and e["file"] not in files:
+                files.append(e["file"])
+        if not all((self.path.parent / f).is_file() for f in files):
+            return None
+        return files
+
+    def fresh_days(self, adapter: ExcelAdapter, workbook: SalesWorkbook, days: List[date], outlet: str,
+                   cfg: Mapping) -> Dict[date, List[str]]:
+        """Up-to-date days → their files. In output mode "month" or with output.zip a month is skipped
+        only as a whole, its file is rewritten with every day."""
+        config_hash = config_digest(cfg, outlet)
+        fresh = {}
+        for day in days:
+            try:
+                methods = adapter.read_day(workbook, day)
+            except Exception:
+                continue  # reported by the normal run
+            files = self.current_files(outlet, day, methods, config_hash)
+            if files is not None:
+                fresh[day] = files
+        if output_mode(cfg) == "month" or zip_output(cfg) != "off":
+            stale = {(d.year, d.month) for d in days if d not in fresh}
+            fresh = {d: f for d, f in fresh.items() if (d.year, d.month) not in stale}
+        return fresh
+
+    def record(self, outlet: str, day: date, methods: Dict[str, Dict[str, float]], res: DayResult, cfg: Mapping):
+        produced = [spec[0] for spec, _ in day_specs(methods)]
+        mode = output_mode(cfg)
+        if res.pack:  # month dataPack or zip archive
+            files = [res.pack] * len(produced)
+        elif mode == "day":
+            files = res.files[:1] * len(produced)
+        else:
+            files = res.files
+        by_method = dict(zip(produced, files))
+        config_hash = config_digest(cfg, outlet)
+        stamp = datetime.now().isoformat(timespec="seconds")
+        for method in METHOD_KEYS:
+            self.entries[self._key(outlet, day, method)] = {
+                "amounts": amounts_digest(methods.get(method, {})),
+                "config": config_hash,
+                "file": by_method.get(method),
+                "generated": stamp,
+            }
+        self.dirty = True
+
+    def track(self, adapter: ExcelAdapter, workbook: SalesWorkbook, days: List[date], outlet: str, cfg: Mapping,
+              fresh: Dict[date, List[str]], results: Iterator[DayResult]) -> Iterator[DayResult]:
+        """Results of the rebuilt days (collect_days() over the days not in `fresh`) interleaved with
+        up-to-date DayResults in the order of `days`. Written days are recorded only by commit(), once
+        OutputBatch.commit() put their files in place."""
+        try:
+            for day in days:
+                if day in fresh:
+                    yield DayResult(day, files=fresh[day], up_to_date=True)
+                    continue
+                res = next(results, None)
+                if res is None:
+                    return  # cancelled
+                if res.error is None:
+                    self._pending.append((outlet, day, adapter.read_day(workbook, day), res, cfg))
+                yield res
+        finally:
+            results.close()
+
+    def commit(self):
+        """Record the tracked days whose files are in place (no error, nothing in `failed` after
+        OutputBatch.mark_failed()) and save. A rolled back run never calls this, so its days are
+        not recorded and the next run rebuilds them."""
+        for outlet, day, methods, res, cfg in self._pending:
+            if res.error is None and not res.failed:
+                self.record(outlet, day, methods, res, cfg)
+        self._pending.clear()
+        self.save()
+
+    def save(self):
+        if not self.dirty:
+            return
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        try:
+            tmp.write_text(json.dumps({"version": self.VERSION, "entries": self.entries}, ensure_ascii=False, indent=1),
+                           encoding="utf-8")
+            os.replace(tmp, self.path)
+            self.dirty = False
+        except OSError as e:
+            log.warning("Manifest %s nelze uložit: %s", self.path, e)
+
+
 # --------------------------------------------------------------------------------------
 # Helper: suggest outlet from filename
 # --------------------------------------------------------------------------------------
@@ -1317,427 +2856,317 @@ def suggest_outlet_from_filename(filename: str) -> Optional[str]:
     return None
 
 # --------------------------------------------------------------------------------------
-# GUI
+# Batch: many exports (outlets × months) in one pass
 # --------------------------------------------------------------------------------------
 
-class DropFrame(QtWidgets.QFrame):
-    fileDropped = QtCore.Signal(str)
+@dataclass
+class BatchJob:
+    path: Path
+    outlet: Optional[str] = None
+    month: Optional[int] = None
+    year: Optional[int] = None
+    days: List[int] = field(default_factory=list)
+    workbook: Optional[SalesWorkbook] = None
+    error: Optional[str] = None  # why the whole file was skipped
+    results: List[DayResult] = field(default_factory=list)
+
+    @property
+    def label(self) -> str:
+        if self.month and self.year:
+            return f"{self.outlet} {self.month:02d}/{self.year} ({self.path.name})"
+        return self.path.name
+
+
+def collect_exports(inputs: List[Path]) -> List[Path]:
+    """Expand directories to their .xlsx files (skipping Excel '~$' lock files), keep order, drop duplicates."""
+    found: List[Path] = []
+    for p in inputs:
+        p = Path(p)
+        found.extend(sorted(f for f in p.glob("*.xlsx") if not f.name.startswith("~$")) if p.is_dir() else [p])
+    return list(dict.fromkeys(found))
+
+
+def plan_batch(adapter: ExcelAdapter, paths: List[Path], cfg: Mapping, outlet: Optional[str] = None,
+               month: Optional[int] = None, year: Optional[int] = None, days: Optional[List[int]] = None) -> List[BatchJob]:
+    """Open every export once and assign outlet (from the file name) and month/year (content, then file name).
+
+    Explicit outlet/month/year/days override the detection for all files.
+    """
+    jobs = []
+    for path in paths:
+        job = BatchJob(path, outlet=outlet or suggest_outlet_from_filename(path.name))
+        jobs.append(job)
+        if job.outlet is None:
+            job.error = "provoz nelze odvodit z názvu souboru"
+            continue
+        if job.outlet not in cfg.get("outlets", {}):
+            job.error = f"neznámý provoz '{job.outlet}'"
+            continue
+        try:
+            job.workbook = adapter.open(path)
+        except Exception as ex:
+            log.exception("Chyba při čtení %s", path)
+            job.error = f"chyba při čtení: {ex}"
+            continue
+        my = adapter.detect_month_year_from_excel(job.workbook) or parse_month_year_from_filename(path)
+        job.month = month or (my[0] if my else None)
+        job.year = year or (my[1] if my else None)
+        if not job.month or not job.year:
+            job.error = "nelze odvodit měsíc/rok"
+            continue
+        if days is None:
+            job.days = adapter.available_days(job.workbook, job.month, job.year)
+            continue
+        last = calendar.monthrange(job.year, job.month)[1]
+        bad = [d for d in days if not 1 <= d <= last]
+        if bad:
+            job.error = f"dny mimo {job.month:02d}/{job.year}: {', '.join(map(str, bad))}"
+            continue
+        job.days = list(days)
+    return jobs
+
+
+def run_batch(adapter: ExcelAdapter, jobs: List[BatchJob], out_dir: Path, cfg: Mapping,
+              cancel: Optional[threading.Event] = None, on_day=None) -> List[BatchJob]:
+    """Generate every outlet × day of the planned jobs with one shared worker pool.
+
+    All days are queued before the first file is written, so the pool stays busy across file
+    boundaries; results are still written and reported in job/day order. `on_day(job, result)`
+    is called after each day. All files of the batch are committed together at the end (OutputBatch);
+    files that cannot be put in place then become errors of their days (DayResult.failed).
+    Sums of every job are checked (check_sums()) before the first file is written.
+    """
+    runnable = [j for j in jobs if j.error is None]
+    manifest = OutputManifest(out_dir) if incremental_output(cfg) else None
+    planned = []
+    for job in runnable:
+        days = [date(job.year, job.month, d) for d in job.days]
+        fresh = manifest.fresh_days(adapter, job.workbook, days, job.outlet, cfg) if manifest is not None else {}
+        planned.append((job, days, fresh))
+    output = OutputBatch(out_dir, cfg)
+    pool = make_executor(cfg, sum(len(days) - len(fresh) for _, days, fresh in planned))
+    results: Optional[Iterator[DayResult]] = None
+    try:
+        queued = []
+        for job, days, fresh in planned:
+            write_log(f"Batch: {job.path} → {job.outlet} {job.month:02d}/{job.year}, dny {job.days}")
+            todo = [d for d in days if d not in fresh]
+            blocked = check_sums(adapter, job.workbook, todo, job.outlet, cfg)
+            queued.append((job, days, fresh, submit_days(adapter, job.workbook, todo, job.outlet, pool, blocked)))
+        for job, days, fresh, submitted in queued:
+            results = collect_days(submitted, job.outlet, out_dir, cfg, cancel, output)
+            if manifest is not None:
+                results = manifest.track(adapter, job.workbook, days, job.outlet, cfg, fresh, results)
+            for res in results:
+                job.results.append(res)
+                if on_day is not None:
+                    on_day(job, res)
+    except BaseException:
+        if results is not None:
+            results.close()
+        output.rollback()
+        raise
+    else:
+        OutputBatch.mark_failed([res for job in runnable for res in job.results], output.commit())
+        if manifest is not None:
+            manifest.commit()
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+    return jobs
+
+
+def batch_report(jobs: List[BatchJob]) -> dict:
+    """JSON-serializable summary of a batch run."""
+    entries = []
+    for job in jobs:
+        entries.append({
+            "file": str(job.path),
+            "outlet": job.outlet,
+            "month": job.month,
+            "year": job.year,
+            "skipped": job.error,
+            "days": len(job.results),
+            "files": sum(r.written for r in job.results),
+            "kept": sum(len(r.kept) for r in job.results),
+            "up_to_date": sum(1 for r in job.results if r.up_to_date),
+            "errors": {r.day.isoformat(): r.error for r in job.results if r.error is not None},
+        })
+    return {
+        "generated": datetime.now().isoformat(timespec="seconds"),
+        "exports": len(jobs),
+        "skipped": sum(1 for e in entries if e["skipped"]),
+        "files": sum(e["files"] for e in entries),
+        "kept": sum(e["kept"] for e in entries),
+        "up_to_date": sum(e["up_to_date"] for e in entries),
+        "day_errors": sum(len(e["errors"]) for e in entries),
+        "entries": entries,
+    }
+
 
-    def __init__(self):
-        super().__init__()
-        self.setAcceptDrops(True)
-        self.setMinimumHeight(100)
-        
-        # Create compact professional dropzone layout
-        layout = QtWidgets.QVBoxLayout(self)
-        layout.setAlignment(QtCore.Qt.AlignCenter)
-        layout.setSpacing(8)
-        layout.setContentsMargins(16, 12, 16, 12)
-        
-        # Upload icon and text in horizontal layout for compactness
-        content_layout = QtWidgets.QHBoxLayout()
-        content_layout.setAlignment(QtCore.Qt.AlignCenter)
-        content_layout.setSpacing(12)
-        
-        # Upload icon (smaller)
-        icon_label = QtWidgets.QLabel("📁")
-        icon_label.setStyleSheet("font-size: 24px; color: #5F6368;")
-        content_layout.addWidget(icon_label)
-        
-        # Text container
-        text_layout = QtWidgets.QVBoxLayout()
-        text_layout.setSpacing(2)
-        
-        # Main text (smaller)
-        main_text = QtWidgets.QLabel("Přetáhněte Excel soubor sem")
-        main_text.setStyleSheet("font-size: 12px; font-weight: 600; color: #1A1B1F;")
-        text_layout.addWidget(main_text)
-        
-        # Sub text (smaller)
-        sub_text = QtWidgets.QLabel("nebo použijte tlačítko níže • .xlsx")
-        sub_text.setStyleSheet("font-size: 10px; color: #5F6368;")
-        text_layout.addWidget(sub_text)
-        
-        content_layout.addLayout(text_layout)
-        layout.addLayout(content_layout)
-
-    def dragEnterEvent(self, e: QtGui.QDragEnterEvent):
-        if e.mimeData().hasUrls():
-            e.acceptProposedAction()
-
-    def dropEvent(self, e: QtGui.QDropEvent):
-        urls = e.mimeData().urls()
-        if urls:
-            path = urls[0].toLocalFile()
-            self.fileDropped.emit(path)
-
-class DayPicker(QtWidgets.QWidget):
-    def __init__(self):
-        super().__init__()
-        self.grid = QtWidgets.QGridLayout(self)
-        self.grid.setHorizontalSpacing(6); self.grid.setVerticalSpacing(6)
-        self.checks: Dict[int, QtWidgets.QCheckBox] = {}
-
-    def set_days(self, days: List[int]):
-        # clear
-        for i in reversed(range(self.grid.count())):
-            w = self.grid.itemAt(i).widget()
-            if w: w.setParent(None)
-        self.checks.clear()
-        # layout 7 columns
-        row = 0; col = 0
-        for d in days:
-            cb = QtWidgets.QCheckBox(str(d))
-            self.checks[d] = cb
-            self.grid.addWidget(cb, row, col)
-            col += 1
-            if col >= 7:
-                col = 0; row += 1
-
-    def selected_days(self) -> List[int]:
-        return sorted([d for d, cb in self.checks.items() if cb.isChecked()])
-
-    def mark_all(self, checked: bool = True):
-        for cb in self.checks.values():
-            cb.setChecked(checked)
-
-    def mark_weekends(self, month: int, year: int):
-        for d, cb in self.checks.items():
-            wd = date(year, month, d).weekday()
-            cb.setChecked(wd >= 5)
-
-    def mark_workdays(self, month: int, year: int):
-        for d, cb in self.checks.items():
-            wd = date(year, month, d).weekday()
-            cb.setChecked(wd < 5)
-
-class MainWindow(QtWidgets.QMainWindow):
-    def __init__(self):
-        super().__init__()
-        self.setWindowTitle(f"{APP_NAME} v{APP_VERSION}")
-        self.resize(900, 600)
-        
-        # Apply professional styling
-        self.setStyleSheet(get_professional_stylesheet())
-        
-        self.cfg = load_config()
-        self.adapter = ExcelAdapter(self.cfg)
-        self.xlsx_path: Optional[Path] = None
-        self.month_year: Optional[Tuple[int,int]] = None
-
-        # Create compact professional layout (original structure with modern styling)
-        central = QtWidgets.QWidget()
-        self.setCentralWidget(central)
-        main_layout = QtWidgets.QVBoxLayout(central)
-        main_layout.setSpacing(8)
-        main_layout.setContentsMargins(16, 16, 16, 16)
-        
-        # Top row: Outlet selection
-        top_layout = QtWidgets.QHBoxLayout()
-        outlet_lbl = QtWidgets.QLabel("Provoz:")
-        outlet_lbl.setObjectName("section_header")
-        self.outlet = QtWidgets.QComboBox()
-        self.outlet.addItems(["Bistro", "Restaurant", "CDL", "B&G", "Molo2"])
-        top_layout.addWidget(outlet_lbl)
-        top_layout.addWidget(self.outlet)
-        top_layout.addStretch()
-
-        # Year selector (dynamic range: this year -1 to +1)
-        year_lbl = QtWidgets.QLabel("Rok:")
-        year_lbl.setStyleSheet("font-size: 14pt; font-weight: 700;")
-        current_year = datetime.now().year
-        self.year_spin = QtWidgets.QSpinBox()
-        self.year_spin.setRange(current_year - 1, current_year + 1)
-        self.year_spin.setValue(current_year)
-        self.year_spin.setFixedWidth(120)
-        top_layout.addWidget(year_lbl)
-        top_layout.addWidget(self.year_spin)
-
-        main_layout.addLayout(top_layout)
-        
-        # Dropzone
-        self.drop = DropFrame()
-        self.drop.fileDropped.connect(self.on_file_dropped)
-        main_layout.addWidget(self.drop)
-        
-        # Browse button - compact, not full width
-        browse_layout = QtWidgets.QHBoxLayout()
-        pick_btn = QtWidgets.QPushButton("📁 Vybrat soubor...")
-        pick_btn.clicked.connect(self.pick_file)
-        pick_btn.setObjectName("secondary")
-        pick_btn.setMaximumWidth(150)
-        browse_layout.addWidget(pick_btn)
-        browse_layout.addStretch()
-        main_layout.addLayout(browse_layout)
-        
-        # Day info
-        self.day_info = QtWidgets.QLabel("Detekováno: —")
-        self.day_info.setObjectName("info")
-        main_layout.addWidget(self.day_info)
-        
-        # Day selection controls - compact row above picker
-        day_controls_layout = QtWidgets.QHBoxLayout()
-        day_controls_layout.addWidget(QtWidgets.QLabel("Vyberte dny:"))
-        day_controls_layout.addStretch()
-        
-        # Compact control buttons
-        btn_all = QtWidgets.QPushButton("✓ Vše")
-        btn_all.clicked.connect(lambda: self.picker.mark_all(True))
-        btn_all.setMaximumWidth(60)
-        btn_all.setMaximumHeight(28)
-        
-        btn_clear = QtWidgets.QPushButton("✗ Clear")
-        btn_clear.clicked.connect(lambda: self.picker.mark_all(False))
-        btn_clear.setMaximumWidth(60)
-        btn_clear.setMaximumHeight(28)
-        
-        day_controls_layout.addWidget(btn_all)
-        day_controls_layout.addWidget(btn_clear)
-        main_layout.addLayout(day_controls_layout)
-        
-        # Day picker grid (now without side controls)
-        self.picker = DayPicker()
-        main_layout.addWidget(self.picker)
-        
-        # Output row
-        output_layout = QtWidgets.QHBoxLayout()
-        output_layout.addWidget(QtWidgets.QLabel("Výstup:"))
-        # Load output directory from config, fallback to default
-        saved_output_dir = self.cfg.get("output_dir", str(OUTPUT_DIR))
-        self.out_dir = QtWidgets.QLineEdit(saved_output_dir)
-        output_layout.addWidget(self.out_dir, 1)
-        out_btn = QtWidgets.QPushButton("📁 Změnit...")
-        out_btn.clicked.connect(self.pick_output_dir)
-        output_layout.addWidget(out_btn)
-        main_layout.addLayout(output_layout)
-        
-        # Action buttons row
-        action_layout = QtWidgets.QHBoxLayout()
-        gen_btn = QtWidgets.QPushButton("🚀 Generovat XML")
-        gen_btn.clicked.connect(self.generate)
-        gen_btn.setObjectName("primary")
-        action_layout.addWidget(gen_btn)
-        action_layout.addStretch()
-        
-        open_btn = QtWidgets.QPushButton("📂 Otevřít složku")
-        open_btn.clicked.connect(self.open_output)
-        open_btn.setObjectName("secondary")
-        action_layout.addWidget(open_btn)
-        main_layout.addLayout(action_layout)
-        
-        # Status section
-        status_lbl = QtWidgets.QLabel("📋 Stav:")
-        status_lbl.setObjectName("section_header")
-        main_layout.addWidget(status_lbl)
-        
-        self.status = QtWidgets.QTextEdit()
-        self.status.setReadOnly(True)
-        self.status.setMaximumHeight(120)  # Compact height
-        main_layout.addWidget(self.status)
-
-        # Apply modern effects to interactive elements
-        ModernEffects.add_hover_effect(gen_btn)
-        ModernEffects.add_click_effect(gen_btn)
-        ModernEffects.add_hover_effect(pick_btn)
-        ModernEffects.add_hover_effect(out_btn)
-        ModernEffects.add_hover_effect(open_btn)
-        ModernEffects.add_hover_effect(btn_all)
-        ModernEffects.add_hover_effect(btn_clear)
-        
-        self.append_status("Připraveno.")
-        self.append_status(f"XML soubory se ukládají do: {OUTPUT_DIR}")
-        self.append_status(f"Konfigurace a logy: {APP_DATA_DIR}")
-
-    def append_status(self, msg: str, status_type: str = "info"):
-        """Add status message with color coding"""
-        # Color-coded status messages
-        if "Chyba" in msg or "Error" in msg:
-            color = COLORS["error"]
-        elif "Hotovo" in msg or "vytvořeno" in msg:
-            color = COLORS["success"]
-        elif "Varování" in msg or "Warning" in msg:
-            color = COLORS["warning"]
+def format_batch_summary(report: dict) -> List[str]:
+    lines = []
+    for e in report["entries"]:
+        name = Path(e["file"]).name
+        if e["skipped"]:
+            lines.append(f"{name}: přeskočeno – {e['skipped']}")
         else:
-            color = COLORS["text_primary"]
-            
-        # Add with HTML formatting for color
-        self.status.append(f'<span style="color: {color};">• {msg}</span>')
-        write_log(msg)
-
-    def pick_file(self):
-        fn, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Vyber Excel", str(Path.home()), "Excel (*.xlsx)")
-        if fn:
-            self.on_file_selected(Path(fn))
-
-    def on_file_dropped(self, path: str):
-        p = Path(path)
-        if p.suffix.lower() != ".xlsx":
-            QtWidgets.QMessageBox.warning(self, APP_NAME, "Podporuji pouze .xlsx soubory.")
-            return
-        self.on_file_selected(p)
+            line = f"{e['outlet']} {e['month']:02d}/{e['year']} ({name}): {e['days']} dnů, {e['files']} souborů"
+            if e["kept"]:
+                line += f", ponecháno {e['kept']} existujících"
+            if e["up_to_date"]:
+                line += f", beze změny {e['up_to_date']} dnů"
+            if e["errors"]:
+                line += f", chyby: {', '.join(e['errors'])}"
+            lines.append(line)
+    lines.append(f"Celkem: {report['exports']} exportů, {report['files']} souborů, "
+                 + (f"ponecháno {report['kept']} existujících, " if report["kept"] else "")
+                 + (f"beze změny {report['up_to_date']} dnů, " if report["up_to_date"] else "")
+                 + f"přeskočeno {report['skipped']}, chybných dnů {report['day_errors']}")
+    return lines
 
-    def on_file_selected(self, p: Path):
-        self.xlsx_path = p
-        self.setWindowTitle(f"{APP_NAME} v{APP_VERSION} — {p.name}")
-        
-        # Try to detect month/year from Excel content first, then from filename
-        try:
-            my = self.adapter.detect_month_year_from_excel(p)
-            if not my:
-                my = parse_month_year_from_filename(p)
-            
-            if not my:
-                QtWidgets.QMessageBox.warning(self, APP_NAME, "Nelze odvodit měsíc/rok ani z obsahu Excelu ani z názvu souboru.\n\nUjisti se, že Excel obsahuje data ve formátu den.měsíc v prvním sloupci\nnebo má název ve formátu *_M_YYYY.xlsx")
-                return
-                
-            self.month_year = my
-            month, year = my
-            # Auto-set year spinner from detected year
-            self.year_spin.setValue(year)
-        except PermissionError:
-            QtWidgets.QMessageBox.warning(
-                self, APP_NAME,
-                "Soubor nelze otevřít (Permission denied).\n\nMožné příčiny:\n- Je otevřený v Excelu → zavřít\n- Je v OneDrive a není dostupný offline → v Průzkumníku zvol 'Vždy ponechat na tomto zařízení'\n- Zkopíruj soubor třeba do 'Dokumenty/' a načti znovu."
-            )
-            self.append_status(f"Permission denied: {p}")
-            return
-        except Exception as ex:
-            QtWidgets.QMessageBox.warning(self, APP_NAME, f"Chyba při čtení Excelu: {ex}")
-            self.append_status(f"Chyba při čtení: {ex}")
-            return
-        # Offer auto-switch of outlet if filename suggests a different one
-        suggested = suggest_outlet_from_filename(p.name)
-        if suggested and suggested != self.outlet.currentText():
-            reply = QtWidgets.QMessageBox.question(
-                self, APP_NAME,
-                f"Zdá se, že soubor patří k provozu ‘{suggested}’, ale vybrán je ‘{self.outlet.currentText()}’.\nPřepnout na ‘{suggested}’?",
-                QtWidgets.QMessageBox.Yes | QtWidgets.QMessageBox.No,
-                QtWidgets.QMessageBox.Yes,
-            )
-            if reply == QtWidgets.QMessageBox.Yes:
-                self.outlet.setCurrentText(suggested)
-        days = self.adapter.available_days(p, month, year)
-        self.picker.set_days(days)
-        self.day_info.setText(f"Detekováno: Měsíc/Rok = {month:02d}/{year} | Dny: {', '.join(map(str, days)) if days else '—'}")
-        self.append_status(f"Načten soubor: {p}")
-
-    def pick_output_dir(self):
-        d = QtWidgets.QFileDialog.getExistingDirectory(self, "Výstupní složka", self.out_dir.text())
-        if d:
-            self.out_dir.setText(d)
-            # Save the new output directory to config
-            self.cfg["output_dir"] = d
-            save_config(self.cfg)
-            self.append_status(f"Výstupní složka změněna na: {d}")
-
-    def open_output(self):
-        path = self.out_dir.text()
-        try:
-            os.startfile(path)  # Windows only
-        except Exception:
-            QtWidgets.QMessageBox.information(self, APP_NAME, f"Složku otevři ručně: {path}")
 
-    def mark_weekends(self):
-        if not self.month_year: return
-        m, y = self.month_year
-        self.picker.mark_weekends(m, y)
+# --------------------------------------------------------------------------------------
+# Command line (headless – never imports PySide6)
+# --------------------------------------------------------------------------------------
 
-    def mark_workdays(self):
-        if not self.month_year: return
-        m, y = self.month_year
-        self.picker.mark_workdays(m, y)
+CLI_COMMANDS = ("generate", "batch")
 
-    def generate(self):
-        # Always reload config to pick up edits (e.g., numberRequested) without restarting the app
-        self.cfg = load_config()
-        self.adapter = ExcelAdapter(self.cfg)
 
-        if not self.xlsx_path or not self.month_year:
-            QtWidgets.QMessageBox.warning(self, APP_NAME, "Nahraj nejprve Excel.")
-            return
-        sel = self.picker.selected_days()
-        if not sel:
-            QtWidgets.QMessageBox.information(self, APP_NAME, "Nevybral jsi žádné dny.")
-            return
-        outlet = self.outlet.currentText()
-        write_log(f"DEBUG: Selected outlet: {outlet}")
-        write_log(f"DEBUG: Available outlets in config: {list(self.cfg.get('outlets', {}).keys())}")
-        outlet_cfg = self.cfg["outlets"][outlet]
-        write_log(f"DEBUG: Outlet config loaded: {outlet_cfg.get('centre', 'MISSING')}")
-        out_dir = Path(self.out_dir.text()); out_dir.mkdir(parents=True, exist_ok=True)
-
-        # iterate days — use year from spinner (user can override for year-end edge cases)
-        month, _ = self.month_year
-        year = self.year_spin.value()
-        success = 0; files: List[str] = []
-        for d in sel:
-            day = date(year, month, d)
-            try:
-                write_log(f"DEBUG: Processing day {day}")
-                methods = self.adapter.read_day(self.xlsx_path, day)
-                write_log(f"DEBUG: Methods found: {list(methods.keys())}")
-                # CASH
-                cash_amounts = methods.get("cash", {})
-                write_log(f"DEBUG: Cash amounts: {cash_amounts}")
-                if any(cash_amounts.get(k, 0.0) for k in ["base_high","vat_high","base_low","vat_low","base_none","vat_none"]):
-                    tree = datapack_with(build_voucher(cash_amounts, day, outlet_cfg, outlet_name=outlet), day, outlet, doc_type="voucher")
-                    fname = format_filename("pokladna", day, outlet)
-                    fpath = out_dir / fname
-                    tree.write(str(fpath), encoding=DEFAULT_CONFIG["global_rules"]["encoding"], xml_declaration=True)
-                    files.append(fname); success += 1
-                # Invoice note format: "Zd.plnění = DD/MM/YYYY, Text = {outlet_note}"
-                outlet_note = self.cfg.get("note_text_by_outlet", {}).get(outlet, "")
-                inv_note = f"Uživatelský export, Zd.plnění = {day.strftime('%d/%m/%Y')}"
-                if outlet_note:
-                    inv_note += f", Text = {outlet_note}"
-
-                # CARD
-                card_amounts = methods.get("card", {})
-                if any(card_amounts.get(k, 0.0) for k in ["base_high","vat_high","base_low","vat_low","base_none","vat_none"]):
-                    tree = datapack_with(build_invoice("card", card_amounts, day, outlet_cfg), day, outlet, doc_type="invoice_card", note_override=inv_note)
-                    fname = format_filename("ostatni", day, outlet, method_label="kartou")
-                    fpath = out_dir / fname
-                    tree.write(str(fpath), encoding=DEFAULT_CONFIG["global_rules"]["encoding"], xml_declaration=True)
-                    files.append(fname); success += 1
-                # VOUCHER
-                voucher_amounts = methods.get("voucher", {})
-                if any(voucher_amounts.get(k, 0.0) for k in ["base_high","vat_high","base_low","vat_low","base_none","vat_none"]):
-                    tree = datapack_with(build_invoice("voucher", voucher_amounts, day, outlet_cfg), day, outlet, doc_type="invoice_voucher", note_override=inv_note)
-                    fname = format_filename("ostatni", day, outlet, method_label="voucherem")
-                    fpath = out_dir / fname
-                    tree.write(str(fpath), encoding=DEFAULT_CONFIG["global_rules"]["encoding"], xml_declaration=True)
-                    files.append(fname); success += 1
-                # CASHLESS
-                cashless_amounts = methods.get("cashless", {})
-                if any(cashless_amounts.get(k, 0.0) for k in ["base_high","vat_high","base_low","vat_low","base_none","vat_none"]):
-                    tree = datapack_with(build_invoice("cashless", cashless_amounts, day, outlet_cfg), day, outlet, doc_type="invoice_cashless", note_override=inv_note)
-                    fname = format_filename("ostatni", day, outlet, method_label="cashless")
-                    fpath = out_dir / fname
-                    tree.write(str(fpath), encoding=DEFAULT_CONFIG["global_rules"]["encoding"], xml_declaration=True)
-                    files.append(fname); success += 1
-
-                self.append_status(f"{day.strftime('%d.%m.%Y')}: vytvořeno {len(files)} soubor(ů) zatím…")
-            except Exception as ex:
-                tb = traceback.format_exc()
-                self.append_status(f"Chyba pro {day}: {ex}")
-                write_log(tb)
+def parse_day_spec(spec: str) -> Optional[List[int]]:
+    """'1-5,8,10' -> [1, 2, 3, 4, 5, 8, 10], 'all' -> None. argparse type for --days: malformed
+    parts and days outside 1–31 raise ArgumentTypeError (the month is checked in plan_batch())."""
+    if spec.strip().lower() == "all":
+        return None
+    days = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            if "-" in part:
+                lo, hi = (int(x) for x in part.split("-", 1))
+                if lo > hi:
+                    raise ValueError
+                days.update(range(lo, hi + 1))
+            else:
+                days.add(int(part))
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"neplatný den nebo rozsah '{part}'") from None
+    bad = [d for d in sorted(days) if not 1 <= d <= 31]
+    if bad:
+        raise argparse.ArgumentTypeError(f"dny mimo 1–31: {', '.join(map(str, bad))}")
+    if not days:
+        raise argparse.ArgumentTypeError("nezadán žádný den")
+    return sorted(days)
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="main.py", description=f"{APP_NAME} – generování Pohoda XML bez GUI")
+    sub = parser.add_subparsers(dest="command", required=True)
+    gen = sub.add_parser("generate", help="vygenerovat XML ze Storyous exportů")
+    gen.add_argument("-i", "--input", nargs="+", required=True, type=Path, help="Storyous export(y) .xlsx")
+    gen.add_argument("--outlet", help="provoz (výchozí: odhad z názvu souboru)")
+    gen.add_argument("--month", type=int, choices=range(1, 13), metavar="1-12", help="měsíc (výchozí: z obsahu Excelu / názvu souboru)")
+    gen.add_argument("--year", type=int, help="rok (výchozí: z názvu souboru / aktuální)")
+    gen.add_argument("--days", type=parse_day_spec, default="all", help="dny, např. '1-5,8' (výchozí: všechny nalezené)")
+    gen.add_argument("-o", "--out", type=Path, help="výstupní složka (výchozí: output_dir z configu)")
+
+    bat = sub.add_parser("batch", help="zpracovat složku/seznam exportů (všechny provozy × měsíce, všechny dny)")
+    bat.add_argument("inputs", nargs="+", type=Path, help="složky a/nebo .xlsx soubory")
+    bat.add_argument("--year", type=int, help="vynutit rok pro všechny soubory")
+    bat.add_argument("-o", "--out", type=Path, help="výstupní složka (výchozí: output_dir z configu)")
+    bat.add_argument("--report", type=Path, help="uložit souhrn jako JSON")
+    for p in (gen, bat):
+        p.add_argument("--datapack", choices=OUTPUT_MODES,
+                       help="dataPack na dokument / den / měsíc provozu (výchozí: output.datapack z configu)")
+        p.add_argument("--renderer", choices=RENDERERS, help="lxml / template (výchozí: output.renderer z configu)")
+        p.add_argument("--timing", action="store_true", help="vypsat časy jednotlivých fází (diagnostics.stage_timing)")
+        p.add_argument("--zip", nargs="?", const="file", choices=ZIP_MODES[1:],
+                       help="vše do jednoho .zip na provoz × měsíc; 'memory' = archiv v paměti (output.zip)")
+        p.add_argument("--incremental", action="store_true",
+                       help="přegenerovat jen dny se změněnými částkami/configem (output.incremental)")
+        p.add_argument("--sums", choices=SUM_CHECKS,
+                       help="kontrola součtů: warn = jen vypsat, skip = dny s chybou negenerovat (validation.sums)")
+
+    return parser
+
+
+def run_cli(argv: List[str]) -> int:
+    args = build_arg_parser().parse_args(argv)
+    ensure_dirs()
+    cfg = config_snapshot()
+    adapter = ExcelAdapter(cfg)
+    if args.datapack or args.renderer or args.incremental or args.zip:
+        cfg = cfg.with_options("output", **{k: v for k, v in (("datapack", args.datapack), ("renderer", args.renderer),
+                                                             ("incremental", args.incremental), ("zip", args.zip)) if v})
+    if args.timing:
+        cfg = cfg.with_options("diagnostics", stage_timing=True)
+    if args.sums:
+        cfg = cfg.with_options("validation", sums=args.sums)
+    out_dir = args.out or Path(cfg.get("output_dir", str(OUTPUT_DIR)))
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    def on_day(job: BatchJob, res: DayResult):
+        if res.error is not None:
+            print(f"{job.outlet} {res.day.strftime('%d.%m.%Y')}: chyba: {res.error}", file=sys.stderr)
+        elif res.up_to_date:
+            print(f"{job.outlet} {res.day.strftime('%d.%m.%Y')}: beze změny")
+        else:
+            print(f"{job.outlet} {res.day.strftime('%d.%m.%Y')}: {res.written} soubor(ů)"
+                  + (f", {len(res.kept)} již existuje" if res.kept else ""))
 
-        if success:
-            self.append_status(f"Hotovo. Vytvořeno {success} souborů. Poslední: {files[-1] if files else ''}")
-            QtWidgets.QMessageBox.information(self, APP_NAME, f"Hotovo. Vytvořeno {success} souborů.")
+    timer = new_stage_timer(cfg)
+    with timer.active() if timer is not None else nullcontext():
+        if args.command == "batch":
+            jobs = plan_batch(adapter, collect_exports(args.inputs), cfg, year=args.year)
         else:
-            self.append_status("Nic nebylo vygenerováno (součty nulové nebo nebyly vybrány dny).")
-            QtWidgets.QMessageBox.information(self, APP_NAME, "Nebyl vygenerován žádný soubor.")
+            jobs = plan_batch(adapter, list(args.input), cfg, outlet=args.outlet, month=args.month, year=args.year, days=args.days)
+        for job in jobs:
+            if job.error is not None:
+                print(f"{job.path.name}: {job.error}", file=sys.stderr)
+            elif sum_check(cfg) != "off":
+                job_days = [date(job.year, job.month, d) for d in job.days]
+                for issue in adapter.validate(job.workbook, job_days, rounding_tolerance(cfg)):
+                    print(f"{job.outlet} {issue.day.strftime('%d.%m.%Y')}: nesedí součty – {issue.describe()}", file=sys.stderr)
+        run_batch(adapter, jobs, out_dir, cfg, on_day=on_day)
+    for job in jobs:
+        for res in job.results:
+            if res.failed:
+                print(f"{job.outlet} {res.day.strftime('%d.%m.%Y')}: chyba: {res.error}", file=sys.stderr)
+    report = batch_report(jobs)
+    total, errors = report["files"], report["skipped"] + report["day_errors"]
+
+    if args.command == "batch":
+        for line in format_batch_summary(report):
+            print(line)
+            write_log(f"Batch: {line}")
+        if args.report:
+            args.report.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    if timer is not None:
+        for line in report_stages(timer):
+            print(line)
+    print(f"Hotovo. Vytvořeno {total} souborů v {out_dir}"
+          + (f", ponecháno {report['kept']} existujících" if report["kept"] else "")
+          + (f", beze změny {report['up_to_date']} dnů" if report["up_to_date"] else "")
+          + (f", chyb: {errors}" if errors else ""))
+    return 1 if errors else 0
+
 
  # --------------------------------------------------------------------------------------
  # Entry
  # --------------------------------------------------------------------------------------
 
-def main():
+def main(argv: Optional[List[str]] = None):
+    multiprocessing.freeze_support()  # process pool workers in the PyInstaller build
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and (argv[0] in CLI_COMMANDS or argv[0] in ("-h", "--help")):
+        sys.exit(run_cli(argv))
     ensure_dirs()
-    app = QtWidgets.QApplication(sys.argv)
-    w = MainWindow(); w.show()
-    sys.exit(app.exec())
+    # gui.py imports this module as "main"; reuse it instead of executing the file twice
+    sys.modules.setdefault("main", sys.modules[__name__])
+    from gui import run_gui
+    sys.exit(run_gui())
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,27 @@
+"""Shared fixtures: the built-in config (never config.json on disk) and synthetic Storyous exports."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import bench  # noqa: E402
+import main as M  # noqa: E402
+
+
+@pytest.fixture
+def cfg():
+    """DEFAULT_CONFIG as a snapshot, with the workbook cache off (nothing written to APP_DATA)."""
+    return M.ConfigSnapshot(M.DEFAULT_CONFIG).with_options("excel", cache=False)
+
+
+@pytest.fixture
+def make_export(tmp_path, cfg):
+    """make_export(n_days) -> path of a synthetic export (bench.make_workbook(), days from 1 January)."""
+    def make(n_days=31, seed=1):
+        path = tmp_path / f"Bistro_{n_days}_{seed}.xlsx"
+        bench.make_workbook(path, cfg, n_days, seed=seed)
+        return path
+    return make
@@ -0,0 +1,85 @@
+"""ExcelAdapter: every excel.reader backend sees the same workbook, sum checks included."""
+
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import main as M
+
+YEAR = 2024
+READERS = ("pandas", "openpyxl") + (("calamine",) if M.calamine_available() else ())
+
+
+def scalar_amount(x) -> float:
+    """Per-cell parsing and rounding as read_day() did before the vectorized SalesMatrix."""
+    if pd.isna(x):
+        return 0.0
+    s = str(x).replace("\u00A0", "").replace(" ", "").replace("Kč", "").replace("CZK", "").replace(",", ".")
+    try:
+        return round(float(s), 2)
+    except ValueError:
+        return 0.0
+
+
+def corrupt(path, header, row, delta):
+    """Add `delta` to the cell of column `header` in data row `row` (1-based) of the sales sheet."""
+    import openpyxl
+    wb = openpyxl.load_workbook(path)
+    ws = wb["Přehled tržeb"]
+    col = next(c.column for c in ws[1] if c.value == header)
+    cell = ws.cell(row=row + 1, column=col)
+    cell.value = float(cell.value) + delta
+    wb.save(path)
+
+
+@pytest.fixture(params=READERS)
+def adapter(request, cfg):
+    return M.ExcelAdapter(cfg.with_options("excel", reader=request.param))
+
+
+def test_readers_agree(cfg, adapter, make_export):
+    path = make_export(31)
+    ref = M.ExcelAdapter(cfg).extract(path)
+    got = adapter.extract(path)
+    assert got.index == ref.index
+    assert np.array_equal(got.values, ref.values)
+    assert np.array_equal(got.totals, ref.totals, equal_nan=True)
+    assert np.array_equal(got.ignored, ref.ignored, equal_nan=True)
+
+
+def test_validate_clean_export(adapter, make_export):
+    # invoice/bank transfer sales are part of "Celkem": without their columns every day would fail
+    days = [date(YEAR, 1, d) for d in range(1, 11)]
+    assert adapter.validate(make_export(10), days, 0.01) == []
+
+
+def test_validate_finds_wrong_total(adapter, make_export):
+    path = make_export(10)
+    corrupt(path, "Tržby s DPH Celkem", 2, 100.0)
+    days = [date(YEAR, 1, d) for d in range(1, 11)]
+    assert [(i.day.day, i.field) for i in adapter.validate(path, days, 0.01)] == [(2, "gross")]
+
+
+def test_half_cent_ties_round_like_python(cfg, adapter, make_export):
+    """Storyous exports with 3 decimals: 1234.565 is 1234.57 (round()), not 1234.56 (np.round)."""
+    import openpyxl
+    path = make_export(5)
+    ties = (1234.565, 2.675, 0.125, 1.005, 99999.995, "1 234,565 Kč", "0,285")
+    wb = openpyxl.load_workbook(path)
+    ws = wb["Přehled tržeb"]
+    amount_cols = [c.column for c in ws[1] if c.value and ("(Hotově)" in c.value or "(Kartou)" in c.value)]
+    for i, col in enumerate(amount_cols):
+        for row in range(2, 7):
+            ws.cell(row=row, column=col).value = ties[(i + row) % len(ties)]
+    wb.save(path)
+
+    df = pd.read_excel(path, sheet_name="Přehled tržeb")
+    sections = cfg["header_map"]["sections"]
+    for r, d in enumerate(range(1, 6)):
+        got = adapter.read_day(path, date(YEAR, 1, d))
+        for method in ("cash", "card"):
+            for key, pattern in sections[method].items():
+                col = next(c for c in df.columns if M._compile(pattern).fullmatch(str(c).strip()))
+                assert got[method][key] == scalar_amount(df[col].iloc[r]), (d, method, key)
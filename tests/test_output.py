@@ -0,0 +1,188 @@
+"""OutputBatch: files appear only on commit, and files that cannot be put in place become day errors."""
+
+import os
+from datetime import date
+
+import pytest
+
+import main as M
+
+YEAR = 2024
+
+
+@pytest.fixture
+def export(cfg, make_export):
+    adapter = M.ExcelAdapter(cfg)
+    workbook = adapter.open(make_export(5))
+    return adapter, workbook, [date(YEAR, 1, d) for d in range(1, 6)]
+
+
+def run(cfg, export, out_dir, **output):
+    adapter, workbook, days = export
+    cfg = cfg.with_options("output", **output) if output else cfg
+    out_dir.mkdir()
+    return list(M.generate_days(adapter, workbook, days, "Bistro", out_dir, cfg))
+
+
+def change_cash(path, row, delta):
+    """Add `delta` to the 21% cash base of data row `row` (1-based) of a synthetic export."""
+    import openpyxl
+    wb = openpyxl.load_workbook(path)
+    ws = wb["Přehled tržeb"]
+    col = next(c.column for c in ws[1] if c.value == "Základ 21% (Hotově)")
+    cell = ws.cell(row=row + 1, column=col)
+    cell.value = M.norm_numbers(M.pd.Series([cell.value]))[0] + delta
+    wb.save(path)
+
+
+def fail_replace(monkeypatch, predicate):
+    real = os.replace
+
+    def replace(src, dst):
+        if predicate(os.path.basename(dst)):
+            raise PermissionError(13, "Permission denied", str(dst))
+        return real(src, dst)
+    monkeypatch.setattr(M.os, "replace", replace)
+
+
+def test_commit_failure_becomes_day_error(cfg, export, tmp_path, monkeypatch):
+    ref = run(cfg, export, tmp_path / "ref")
+    victim = ref[2].files[0]
+    fail_replace(monkeypatch, lambda name: name == victim)
+    results = run(cfg, export, tmp_path / "out")
+    assert [r.files for r in results[:2]] == [r.files for r in ref[:2]]
+    assert results[2].failed == [victim]
+    assert victim not in results[2].files
+    assert victim in results[2].error
+    assert not (tmp_path / "out" / victim).exists()
+    assert all(r.error is None for i, r in enumerate(results) if i != 2)
+    report = M.batch_report([M.BatchJob(export[1].path, "Bistro", 1, YEAR, results=results)])
+    assert report["day_errors"] == 1
+    assert report["files"] == sum(len(r.files) for r in ref) - 1
+
+
+def test_failed_month_pack_fails_every_day(cfg, export, tmp_path, monkeypatch):
+    fail_replace(monkeypatch, lambda name: True)
+    results = run(cfg, export, tmp_path / "out", datapack="month")
+    pack = results[0].pack
+    assert all(r.failed == [pack] and r.error for r in results)
+    assert not any(r.files for r in results)
+    # the data stays in its temp file (removed by a later run after OutputBatch.STALE_SECONDS)
+    assert all(p.name.startswith("~$") for p in (tmp_path / "out").iterdir())
+
+
+@pytest.mark.parametrize("datapack", M.OUTPUT_MODES)
+def test_abandoned_generator_leaves_nothing(cfg, export, tmp_path, datapack):
+    adapter, workbook, days = export
+    (tmp_path / "out").mkdir()
+    gen = M.generate_days(adapter, workbook, days, "Bistro", tmp_path / "out",
+                          cfg.with_options("output", datapack=datapack))
+    next(gen)
+    gen.close()
+    assert list((tmp_path / "out").iterdir()) == []
+
+
+def test_interrupted_batch_leaves_nothing(cfg, export, tmp_path):
+    adapter, workbook, _ = export
+    job = M.BatchJob(workbook.path, "Bistro", 1, YEAR, days=[1, 2, 3], workbook=workbook)
+
+    def on_day(job, res):
+        if res.day.day == 2:
+            raise KeyboardInterrupt
+    with pytest.raises(KeyboardInterrupt):
+        M.run_batch(adapter, [job], tmp_path, cfg, on_day=on_day)
+    assert [p.name for p in tmp_path.iterdir()] == [workbook.path.name]
+
+
+def test_cancel_keeps_finished_days(cfg, export, tmp_path):
+    adapter, workbook, days = export
+    cancel = M.threading.Event()
+    results = []
+    (tmp_path / "out").mkdir()
+    for res in M.generate_days(adapter, workbook, days, "Bistro", tmp_path / "out", cfg, cancel=cancel):
+        results.append(res)
+        cancel.set()
+    assert len(results) == 1
+    assert sorted(p.name for p in (tmp_path / "out").iterdir()) == sorted(results[0].files)
+
+
+def test_manifest_skips_days_not_put_in_place(cfg, make_export, tmp_path, monkeypatch):
+    """A day whose file could not be renamed must not count as up to date in the next run."""
+    cfg = cfg.with_options("output", incremental=True).with_options("naming", id_format="key")
+    path = make_export(5)
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    days = [date(YEAR, 1, d) for d in range(1, 6)]
+
+    def run_once():
+        adapter = M.ExcelAdapter(cfg)
+        return list(M.generate_days(adapter, adapter.open(path), days, "Bistro", out_dir, cfg))
+
+    run_once()
+    change_cash(path, 2, 100.0)
+    with monkeypatch.context() as m:
+        fail_replace(m, lambda name: " 2.1.2024 " in name)
+        second = run_once()
+    assert second[1].failed and not second[1].up_to_date
+    assert [r.up_to_date for r in second] == [True, False, True, True, True]
+    third = run_once()
+    assert not third[1].up_to_date and third[1].error is None
+    assert [r.up_to_date for r in run_once()] == [True] * 5
+
+
+def test_manifest_not_saved_on_rollback(cfg, export, tmp_path):
+    adapter, workbook, days = export
+    cfg = cfg.with_options("output", incremental=True)
+    (tmp_path / "out").mkdir()
+    gen = M.generate_days(adapter, workbook, days, "Bistro", tmp_path / "out", cfg)
+    next(gen)
+    gen.close()
+    assert list((tmp_path / "out").iterdir()) == []
+
+
+def fail_write(monkeypatch, predicate):
+    real = M._write_file
+
+    def write(path, data, fsync=False):
+        if predicate(path.name):
+            raise OSError(28, "No space left on device", str(path))
+        return real(path, data, fsync)
+    monkeypatch.setattr(M, "_write_file", write)
+
+
+@pytest.mark.parametrize("flush_bytes", [1, M.OutputBatch.FLUSH_BYTES])
+def test_write_failure_becomes_error_of_its_day(cfg, export, tmp_path, monkeypatch, flush_bytes):
+    # flush_bytes=1: every day is flushed while the next ones are still being added
+    monkeypatch.setattr(M.OutputBatch, "FLUSH_BYTES", flush_bytes)
+    fail_write(monkeypatch, lambda name: name.startswith("~$Pokladna 3.1.2024"))
+    results = run(cfg, export, tmp_path / "out")
+    victim = results[2].failed[0]
+    assert victim.startswith("Pokladna 3.1.2024") and victim in results[2].error
+    assert all(r.error is None for i, r in enumerate(results) if i != 2)
+    on_disk = sorted(p.name for p in (tmp_path / "out").iterdir())
+    assert on_disk == sorted(f for r in results for f in r.files)
+
+
+def test_failed_memory_zip_fails_every_day(cfg, export, tmp_path, monkeypatch):
+    fail_write(monkeypatch, lambda name: name.endswith(".zip"))
+    results = run(cfg, export, tmp_path / "out", zip="memory")
+    assert all(r.failed == [results[0].pack] and r.error for r in results)
+    assert not any(r.files for r in results)
+
+
+@pytest.mark.parametrize("datapack", ["document", "month"])
+@pytest.mark.parametrize("zip_mode", ["file", "memory"])
+def test_existing_archive_is_kept(cfg, export, tmp_path, datapack, zip_mode):
+    """naming.existing = "skip": rerunning a few days must not replace a full-month archive."""
+    adapter, workbook, days = export
+    cfg = cfg.with_options("naming", id_format="key", existing="skip").with_options("output", zip=zip_mode, datapack=datapack)
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    first = list(M.generate_days(adapter, workbook, days, "Bistro", out_dir, cfg))
+    archive = out_dir / first[0].pack
+    before = archive.read_bytes()
+    again = list(M.generate_days(adapter, workbook, days[:2], "Bistro", out_dir, cfg))
+    assert archive.read_bytes() == before
+    assert [p.name for p in out_dir.iterdir()] == [archive.name]
+    assert all(r.pack == archive.name and r.error is None and r.written == 0 for r in again)
+    assert all(r.kept for r in again[-1:])
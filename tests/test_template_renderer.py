@@ -0,0 +1,116 @@
+"""Template renderer ≡ lxml builders, byte for byte (output.renderer = "template" vs "lxml").
+
+Every change of the builders must keep these green – otherwise compiled templates and lxml drift
+apart. File names are not compared (they contain the current time).
+"""
+
+import random
+from datetime import date, timedelta
+
+import pytest
+
+import main as M
+
+YEAR = 2024  # leap year: 29 February is covered too
+OUTLETS = tuple(M.DEFAULT_CONFIG["outlets"])
+# attribute/text escaping and characters windows-1250 cannot encode (written as character references)
+TRICKY_TEXTS = ('A & B <bar> "x"', "tab\there\nline\rend", "→ kavárna ☕ 😀", "Ř ž ů € ß")
+
+
+def synthetic_methods(rnd):
+    """Random day amounts: whole, fractional and zero values, sometimes a method with no sales at all."""
+    methods = {}
+    for method in M.METHOD_KEYS:
+        amounts = {}
+        if rnd.random() >= 0.15:
+            for rk, rate in (("high", 0.21), ("low", 0.12), ("none", 0.0)):
+                base = rnd.choice((0.0, float(rnd.randint(1, 5000)), round(rnd.uniform(0.01, 99999.99), 2)))
+                amounts[f"base_{rk}"] = base
+                amounts[f"vat_{rk}"] = round(base * rate, 2)
+        methods[method] = amounts
+    return methods
+
+
+def synthetic_cases(outlets, step=1, seed=2025):
+    """(day, outlet, amounts) for every `step`-th day of YEAR (plus its last day) and every outlet."""
+    rnd = random.Random(seed)
+    days = [date(YEAR, 1, 1) + timedelta(days=i) for i in range(0, 366, step)] + [date(YEAR, 12, 31)]
+    return [(day, outlet, synthetic_methods(rnd)) for outlet in outlets for day in days]
+
+
+def renderers(cfg, mode):
+    return (cfg.with_options("output", renderer="lxml", datapack=mode),
+            cfg.with_options("output", renderer="template", datapack=mode))
+
+
+def assert_same_output(cfg, cases):
+    for mode in M.OUTPUT_MODES:
+        ref_cfg, tpl_cfg = renderers(cfg, mode)
+        for day, outlet, methods in cases:
+            ref = [data for _, data in M._build_day_job(day, methods, outlet, ref_cfg)]
+            got = [data for _, data in M._build_day_job(day, methods, outlet, tpl_cfg)]
+            assert got == ref, f"{outlet} {day.isoformat()} ({mode})"
+
+
+def tricky_config(cfg):
+    """Outlets named and noted with TRICKY_TEXTS (copies of the first configured outlet)."""
+    data = cfg.to_dict()
+    template = data["outlets"][OUTLETS[0]]
+    for text in TRICKY_TEXTS:
+        data["outlets"][text] = dict(template)
+    data["note_text_by_outlet"] = {text: text for text in TRICKY_TEXTS}
+    return M.ConfigSnapshot(data)
+
+
+def test_every_day_of_a_year(cfg):
+    assert_same_output(cfg, synthetic_cases(OUTLETS[:1]))
+
+
+def test_every_outlet(cfg):
+    assert_same_output(cfg, synthetic_cases(OUTLETS, step=29))
+
+
+@pytest.mark.parametrize("method", M.METHOD_KEYS)
+def test_single_method_days(cfg, method):
+    rnd = random.Random(method)
+    cases = []
+    for outlet in OUTLETS:
+        methods = synthetic_methods(rnd)
+        methods[method] = methods[method] or {"base_high": 1.0, "vat_high": 0.21}
+        cases.append((date(YEAR, 2, 29), outlet, {method: methods[method]}))
+    assert_same_output(cfg, cases)
+
+
+def test_day_without_sales(cfg):
+    for mode in M.OUTPUT_MODES:
+        for c in renderers(cfg, mode):
+            assert M._build_day_job(date(YEAR, 3, 1), {m: {} for m in M.METHOD_KEYS}, OUTLETS[0], c) == []
+
+
+def test_escaped_outlet_names_and_notes(cfg):
+    assert_same_output(tricky_config(cfg), synthetic_cases(TRICKY_TEXTS, step=61))
+
+
+def test_exported_days(cfg, make_export):
+    adapter = M.ExcelAdapter(cfg)
+    workbook = adapter.open(make_export(40))
+    days = [date(YEAR, m, d) for m in sorted(workbook.month_days) for d in workbook.month_days[m]]
+    assert len(days) == 40
+    assert_same_output(cfg, [(day, OUTLETS[0], adapter.read_day(workbook, day)) for day in days])
+
+
+@pytest.mark.parametrize("text", TRICKY_TEXTS)
+def test_month_pack_item_notes(cfg, text):
+    """datapack_bytes() with per-item notes ≡ serialize_tree(datapack_with_items(...))."""
+    cfg = tricky_config(cfg)
+    day = date(YEAR, 6, 1)
+    items = [(child, M.document_note(note, day, text, cfg))
+             for _, child, note in M.build_day_items(day, synthetic_methods(random.Random(7)), text, cfg)]
+    children = [child for child, _ in items]
+    notes = [note for _, note in items]
+    # serialized while still standalone, the way day_document_bytes() does it
+    docs = [M.ET.tostring(child, encoding=M.XML_ENCODING, xml_declaration=False) for child in children]
+    pack_note = M.datapack_note(day, text, cfg, whole_month=True)
+    ref = M.serialize_tree(M.datapack_with_items(children, day, text, "month", note_override=pack_note,
+                                                 cfg=cfg, item_notes=notes))
+    assert M.datapack_bytes(docs, day, text, "month", note_override=pack_note, cfg=cfg, item_notes=notes) == ref